@@ -0,0 +1,129 @@
+"""
+benchmarks.memory
+
+Memory footprint of the per-parse objects: the links of an input chain with their matches, the match results, and
+the argument mediators and parameter descriptions built at decoration time.
+
+Python 2 has no ``tracemalloc``, so sizes are measured with ``sys.getsizeof`` over each object and the containers it
+holds, the number of objects tracked by the garbage collector, and the growth of the peak resident set size.
+
+Run from the root of the repository with ``python -m benchmarks.memory``. To measure another revision, put its tree
+first on the path, ie. ``PYTHONPATH=/path/to/checkout python benchmarks/memory.py``.
+
+Measured with Python 2.7.18 on Linux x86-64, for a 22-token line matched by two arguments, before the slotted
+representations (2dfed46), with them (84a08c7) and at the time of writing:
+
+    =================================== ========== ========== ==========
+    Measure                             2dfed46    84a08c7    current
+    =================================== ========== ========== ==========
+    chain links incl. matches           16368 B    6336 B     6512 B
+    2 match results                     688 B      176 B      176 B
+    argument mediator                   1112 B     112 B      144 B
+    parameter description               1120 B     112 B      112 B
+    gc-tracked objects, 2000 chains     88001      44087      44093
+    peak RSS growth, 20000 chains       310.3 MiB  138.6 MiB  138.4 MiB
+    =================================== ========== ========== ==========
+"""
+
+from __future__ import absolute_import, print_function
+
+import gc
+import resource
+import sys
+
+import hoomanlogic
+
+
+LINE = ' '.join(['tag{}'.format(i) if i % 2 else 'word{}'.format(i) for i in range(22)])
+
+
+#=======================================================================================================================
+# Measurement
+#=======================================================================================================================
+def container_size(value):
+    """Returns the size of a tuple, list or dictionary and the containers in it, not counting the values they hold."""
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(container_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(container_size(item) for item in value.values())
+    return 0
+
+
+def object_size(obj):
+    """Returns the size of an object and its attribute dictionary, if it has one."""
+    size = sys.getsizeof(obj)
+    # the __dict__ of a namedtuple is a property building a new dictionary
+    if hasattr(obj, '__dict__') and not isinstance(obj, tuple):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def link_size(link):
+    """Returns the size of a link of an input chain and of the containers holding its matches."""
+    matches = link.matches if hasattr(link, 'matches') else link.matched_by
+    return object_size(link) + container_size(matches)
+
+
+def new_mediators():
+    return [hoomanlogic.ArgumentMediator('tags', max_count=None,
+                                         rules=(lambda text, context=None: (text.startswith('tag'), text), '', None)),
+            hoomanlogic.ArgumentMediator('words', max_count=None)]
+
+
+def match_line(line, arg_mediators):
+    """Returns the input chain of the line, with every link matched against every argument."""
+    input_chain = hoomanlogic.InputChain.convert_to_chain(line)
+    link = input_chain
+    while link is not None:
+        for arg_mediator in arg_mediators:
+            arg_mediator.try_match(link)
+        link = link.read()
+    return input_chain
+
+
+def measure():
+    """Returns a list of tuples (measure, value, unit)."""
+    arg_mediators = new_mediators()
+    input_chain = match_line(LINE, arg_mediators)
+
+    links_size = 0
+    link = input_chain
+    while link is not None:
+        links_size += link_size(link)
+        link = link.read()
+
+    results = input_chain.get_match_results()['words'][:2]
+    results_size = sum(object_size(result) for result in results)
+
+    parameter = hoomanlogic.ParameterInfo('tags', 0)
+
+    gc.collect()
+    before = len(gc.get_objects())
+    chains = [match_line(LINE, arg_mediators) for i in range(2000)]
+    gc.collect()
+    tracked = len(gc.get_objects()) - before
+    del chains
+
+    # the peak only grows, so this is measured last, with more chains than before
+    gc.collect()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    chains = [match_line(LINE, arg_mediators) for i in range(20000)]
+    growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - peak
+    del chains
+
+    return [('chain links incl. matches', links_size, 'B'),
+            ('2 match results', results_size, 'B'),
+            ('argument mediator', object_size(arg_mediators[0]), 'B'),
+            ('parameter description', object_size(parameter), 'B'),
+            ('gc-tracked objects, 2000 chains', tracked, ''),
+            # ru_maxrss is in KiB on Linux
+            ('peak RSS growth, 20000 chains', round(growth / 1024.0, 1), 'MiB')]
+
+
+def main():
+    for name, value, unit in measure():
+        print('{:<35} {} {}'.format(name, value, unit).rstrip())
+
+
+if __name__ == '__main__':
+    main()
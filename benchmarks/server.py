@@ -0,0 +1,105 @@
+"""
+benchmarks.server
+
+Load test of a local ``DispatchServer``: client processes, each with a session of its own, send the same lines and
+the throughput and latency are reported for one worker and for a worker per CPU.
+
+Run from the root of the repository with ``python -m benchmarks.server``.
+"""
+
+from __future__ import absolute_import, print_function
+
+import multiprocessing
+import os
+from timeit import default_timer as timer
+
+from hoomanlogic.server import Client, DispatchServer
+
+
+#=======================================================================================================================
+# Load Test
+#=======================================================================================================================
+def run_load_test_client(args):
+    """Send lines as one session and return the latency of each request in seconds."""
+    address, lines, requests = args
+    client = Client(address)
+    latencies = []
+    try:
+        for i in range(requests):
+            started = timer()
+            response = client.says(lines[i % len(lines)])
+            latencies.append(timer() - started)
+            if 'error' in response:
+                raise RuntimeError(response['error'])
+    finally:
+        client.close()
+    return latencies
+
+
+def load_test(address, lines, clients=8, requests=500):
+    """Send lines to a server from several client processes and return a dictionary of throughput and latency.
+
+    :param address: Address of the server.
+    :type address: str|tuple
+    :param lines: Human-language input to send, in turn.
+    :type lines: list<str>
+    :param clients: Number of client processes, each with its own session.
+    :type clients: int
+    :param requests: Number of requests sent by each client.
+    :type requests: int
+    :rtype: dict
+    """
+    pool = multiprocessing.Pool(clients)
+    try:
+        started = timer()
+        results = pool.map(run_load_test_client, [(address, lines, requests)] * clients)
+        seconds = timer() - started
+    finally:
+        pool.close()
+        pool.join()
+
+    latencies = sorted(latency for result in results for latency in result)
+    return {'requests': len(latencies),
+            'seconds': seconds,
+            'throughput': len(latencies) / seconds,
+            'p50': latencies[len(latencies) // 2],
+            'p99': latencies[min(len(latencies) - 1, int(len(latencies) * .99))]}
+
+
+def setup_load_test(operator):
+    """Register the interface of the load test."""
+    import hoomanlogic
+    from hoomanlogic import translation
+
+    @hoomanlogic.interface
+    class LoadTestInterface(object):
+
+        @hoomanlogic.translator(arg_mediators=[
+            hoomanlogic.ArgumentMediator('priority', rules=((translation.translate_to_first_type, 'int', ['int']),
+                                                            (translation.validate_int_is_in_range, '1-5', (1, 5)))),
+            hoomanlogic.ArgumentMediator('minutes', rules=(translation.translate_duration_to_minutes, 'minutes',
+                                                           None)),
+            hoomanlogic.ArgumentMediator('tags', max_count=None, argument_prefixer=['-t', '--tags']),
+            hoomanlogic.ArgumentMediator('name', required=True),
+        ], synonyms={'add': ['add', 'new', 'a']})
+        def add(self, name, priority=None, minutes=None, tags=None):
+            """Add a task."""
+            return name
+
+    operator.register_interface(LoadTestInterface())
+
+
+if __name__ == '__main__':
+    import tempfile
+
+    lines = ['add "buy milk" 3 45m -t errands', 'new "call mom" 1 -t family home', 'a report 2h 5']
+    path = os.path.join(tempfile.mkdtemp(), 'hoomanlogic.sock')
+    for workers in sorted(set([1, multiprocessing.cpu_count()])):
+        server = DispatchServer(setup_load_test, path, workers=workers)
+        server.start()
+        try:
+            stats = load_test(path, lines, clients=max(4, workers * 2), requests=500)
+        finally:
+            server.stop()
+        print('{} worker(s): {requests} requests in {seconds:.2f}s, {throughput:.0f}/s, p50 {p50:.4f}s, '
+              'p99 {p99:.4f}s'.format(workers, **stats))
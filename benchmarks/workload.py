@@ -0,0 +1,374 @@
+"""
+benchmarks.workload
+
+Deterministic synthetic interfaces and input lines, and a harness that measures how dispatch time grows with each
+knob of the workload, so quadratic stages are caught before production traffic finds them.
+
+Run the scaling checks from the root of the repository with ``python -m benchmarks.workload``, which exits with a
+non-zero status when a stage grows faster than its budget. ``python -m benchmarks.workload --stress`` instead
+dispatches a workload from several threads through the same translators, and exits with a non-zero status when a
+result differs from a serial run.
+"""
+
+from __future__ import absolute_import, print_function
+
+import math
+import random
+import sys
+import threading
+from timeit import default_timer as timer
+
+
+#=======================================================================================================================
+# Workload Generation
+#=======================================================================================================================
+WORDS = ('alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot', 'golf', 'hotel', 'india', 'juliet', 'kilo', 'lima',
+         'mike', 'november', 'oscar', 'papa', 'quebec', 'romeo', 'sierra', 'tango')
+
+
+class WorkloadSpec(object):
+
+    """The knobs of a synthetic workload.
+
+    :ivar commands: Number of commands of the interface.
+    :type commands: int
+    :ivar synonyms: Number of synonyms of each command.
+    :type synonyms: int
+    :ivar mediators: Number of argument mediators of each translator.
+    :type mediators: int
+    :ivar tokens: Number of argument tokens of each input line.
+    :type tokens: int
+    :ivar rule_cost: Number of loop iterations spent by the synthetic rule that starts every rule pipeline.
+    :type rule_cost: int
+    :ivar seed: Seed of the random generator, the same spec always generates the same workload.
+    :type seed: int
+    """
+
+    KNOBS = ('commands', 'synonyms', 'mediators', 'tokens', 'rule_cost')
+
+    def __init__(self, commands=20, synonyms=3, mediators=3, tokens=4, rule_cost=1, seed=0):
+        self.commands = commands
+        self.synonyms = synonyms
+        self.mediators = mediators
+        self.tokens = tokens
+        self.rule_cost = rule_cost
+        self.seed = seed
+
+    def replace(self, **knobs):
+        """Returns a copy of the spec with some knobs changed."""
+        values = dict((knob, getattr(self, knob)) for knob in WorkloadSpec.KNOBS + ('seed',))
+        values.update(knobs)
+        return WorkloadSpec(**values)
+
+    def __repr__(self):
+        return 'WorkloadSpec({})'.format(', '.join('{}={}'.format(knob, getattr(self, knob))
+                                                  for knob in WorkloadSpec.KNOBS + ('seed',)))
+
+
+def spend(text, context):
+    """Synthetic rule that spends ``context`` loop iterations and accepts any input."""
+    for i in range(context):
+        pass
+    return True, text
+
+
+def get_command_words(spec, i):
+    """Returns the synonyms of the i-th command of a workload."""
+    return ['cmd{}'.format(i)] + ['c{}s{}'.format(i, j) for j in range(1, spec.synonyms)]
+
+
+def generate_mediators(spec):
+    """Returns a list of new argument mediators of a workload, of a few kinds in turn."""
+    import hoomanlogic
+    from hoomanlogic import translation
+
+    cost_rule = (spend, 'Spends time.', spec.rule_cost)
+    arg_mediators = []
+    for j in range(spec.mediators):
+        kind = j % 4
+        if kind == 0:
+            rules = (cost_rule,
+                     (translation.translate_to_first_type, 'Value must be a whole number.', ['int']),
+                     (translation.validate_int_is_in_range, 'Value must be from 1 to 100.', (1, 100)))
+            arg_mediator = hoomanlogic.ArgumentMediator('arg{}'.format(j), rules=rules)
+        elif kind == 1:
+            arg_mediator = hoomanlogic.ArgumentMediator('arg{}'.format(j), rules=(cost_rule,), max_count=None,
+                                                        argument_prefixer=['-o{}'.format(j), '--opt{}'.format(j)])
+        elif kind == 2:
+            rules = (cost_rule,
+                     (translation.validate_lcase_is_in_list, 'Value must be a known word.', list(WORDS[:10])))
+            arg_mediator = hoomanlogic.ArgumentMediator('arg{}'.format(j), rules=rules, max_count=None)
+        else:
+            rules = (cost_rule,
+                     (translation.translate_to_first_type, 'Value must be a number.', ['float']))
+            arg_mediator = hoomanlogic.ArgumentMediator('arg{}'.format(j), rules=rules)
+        arg_mediators.append(arg_mediator)
+    return arg_mediators
+
+
+def generate_interface(spec):
+    """Returns an instance of a new synthetic interface class of a workload."""
+    import hoomanlogic
+
+    def make_command(name):
+        def command(self, **kwargs):
+            return kwargs
+        command.__name__ = name
+        return command
+
+    attrs = {}
+    for i in range(spec.commands):
+        name = 'cmd{}'.format(i)
+        attrs[name] = hoomanlogic.translator(synonyms={name: get_command_words(spec, i)},
+                                             arg_mediators=generate_mediators(spec))(make_command(name))
+
+    return hoomanlogic.interface(type('SyntheticInterface', (object,), attrs))()
+
+
+def generate_lines(spec, count):
+    """Returns a list of input lines of a workload, each a command synonym followed by ``tokens`` arguments."""
+    rng = random.Random(spec.seed)
+    lines = []
+    for n in range(count):
+        i = rng.randrange(spec.commands)
+        words = [rng.choice(get_command_words(spec, i))]
+        while len(words) <= spec.tokens:
+            kind = rng.randrange(4)
+            if kind == 0:
+                words.append(str(rng.randint(1, 100)))
+            elif kind == 1 and spec.mediators > 1:
+                words.extend(['-o1', rng.choice(WORDS)])
+            elif kind == 2:
+                words.append(rng.choice(WORDS))
+            else:
+                words.append('{:.1f}'.format(rng.uniform(0, 1000)))
+        lines.append(' '.join(words[:spec.tokens + 1]))
+    return lines
+
+
+#=======================================================================================================================
+# Measurement
+#=======================================================================================================================
+STAGES = ('lookup', 'tokenize', 'match', 'assign', 'dispatch')
+
+
+def measure(spec, lines=200, repeat=3):
+    """Dispatch the lines of a workload and return the mean seconds per line of each stage.
+
+    :param spec: The workload.
+    :type spec: WorkloadSpec
+    :param lines: Number of lines to dispatch.
+    :type lines: int
+    :param repeat: Number of times to dispatch the lines, the fastest run is kept.
+    :type repeat: int
+    :return: Returns the mean seconds by stage, ``dispatch`` being the whole of ``listen_and_respond``.
+    :rtype: dict<str,float>
+    """
+    import hoomanlogic
+    from hoomanlogic.metrics import Metrics
+
+    interface = generate_interface(spec)
+    inputs = generate_lines(spec, lines)
+    best = None
+    for r in range(repeat):
+        metrics = Metrics()
+        operator = hoomanlogic.Operator(headless=True, metrics=metrics)
+        operator.register_interface(interface)
+        started = timer()
+        for line in inputs:
+            operator.listen_and_respond(line)
+        seconds = {'dispatch': (timer() - started) / len(inputs)}
+
+        for stage in STAGES[:-1]:
+            total = 0.0
+            for labels, counts in metrics.stage_seconds.values.items():
+                if labels[1] == stage:
+                    total += counts[-1]
+            seconds[stage] = total / len(inputs)
+
+        if best is None or seconds['dispatch'] < best['dispatch']:
+            best = seconds
+    return best
+
+
+def fit_exponent(xs, ys):
+    """Returns the least-squares slope of log(y) over log(x), ie. k for y growing as x ** k."""
+    points = [(math.log(x), math.log(y)) for x, y in zip(xs, ys) if x > 0 and y > 0]
+    if len(points) < 2:
+        return 0.0
+    mean_x = sum(x for x, y in points) / len(points)
+    mean_y = sum(y for x, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, y in points)
+    if variance == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+
+# the values each knob is swept over, and the max growth exponent of each stage along the knob
+GRID = {
+    'commands': (10, 40, 160, 640),
+    'synonyms': (2, 8, 32, 128),
+    'mediators': (2, 4, 8, 16),
+    'tokens': (4, 16, 64, 256),
+    'rule_cost': (1, 100, 1000, 10000),
+}
+
+BUDGETS = {
+    ('commands', 'lookup'): 0.5,
+    ('commands', 'dispatch'): 0.5,
+    ('synonyms', 'lookup'): 0.5,
+    ('synonyms', 'dispatch'): 0.5,
+    ('mediators', 'match'): 1.3,
+    ('mediators', 'assign'): 1.3,
+    ('tokens', 'tokenize'): 1.3,
+    ('tokens', 'match'): 1.3,
+    ('tokens', 'assign'): 1.3,
+    ('tokens', 'dispatch'): 1.3,
+    ('rule_cost', 'match'): 1.3,
+}
+
+
+def run_grid(base=None, grid=None, lines=200, repeat=3):
+    """Sweep each knob of the grid, the others fixed at the base spec, and fit the growth exponent of each stage.
+
+    :param base: The spec of the knobs that aren't swept.
+    :type base: WorkloadSpec|None
+    :param grid: The values each knob is swept over, ``GRID`` by default.
+    :type grid: dict<str,tuple>|None
+    :return: Returns a dictionary of {(knob, stage): (exponent, list of seconds per line)}.
+    :rtype: dict
+    """
+    base = base if base is not None else WorkloadSpec()
+    grid = grid if grid is not None else GRID
+    results = {}
+    for knob, values in sorted(grid.items()):
+        timings = [measure(base.replace(**{knob: value}), lines, repeat) for value in values]
+        for stage in STAGES:
+            seconds = [timing[stage] for timing in timings]
+            results[(knob, stage)] = (fit_exponent(values, seconds), seconds)
+    return results
+
+
+def check_budgets(results, budgets=None):
+    """Returns a list of (knob, stage, exponent, budget) of the stages growing faster than their budget."""
+    budgets = budgets if budgets is not None else BUDGETS
+    failures = []
+    for key, budget in sorted(budgets.items()):
+        if key in results and results[key][0] > budget:
+            failures.append(key + (results[key][0], budget))
+    return failures
+
+
+#=======================================================================================================================
+# Concurrency
+#=======================================================================================================================
+def stress(spec=None, threads=8, lines=200, rounds=5, learn_interval=50):
+    """Dispatch the lines of a workload from several threads at once and compare the results with a serial run.
+
+    Every thread has an operator of its own, with an instance of the same interface class, so all the threads share
+    the same translators and argument mediators. Adaptive mode is enabled with a short interval, so the learned
+    orders are swapped while other threads are matching.
+
+    :param spec: The workload, the default spec if None.
+    :type spec: WorkloadSpec|None
+    :param threads: Number of threads dispatching at once.
+    :type threads: int
+    :param lines: Number of distinct lines of the workload.
+    :type lines: int
+    :param rounds: Number of times each thread dispatches the lines, in an order of its own.
+    :type rounds: int
+    :param learn_interval: Number of translations between reordering in adaptive mode.
+    :type learn_interval: int
+    :return: Returns a dictionary of the number of dispatches, the lines whose result differed from the serial run,
+             the tracebacks of the errors raised and the seconds taken.
+    :rtype: dict
+    """
+    import traceback
+    import hoomanlogic
+
+    spec = spec if spec is not None else WorkloadSpec()
+    interface_class = type(generate_interface(spec))
+    inputs = generate_lines(spec, lines)
+
+    def new_operator():
+        operator = hoomanlogic.Operator(headless=True)
+        operator.register_interface(interface_class())
+        return operator
+
+    def get_result(resolution):
+        return resolution.status, resolution.managed_args, resolution.unrecognized
+
+    operator = new_operator()
+    expected = dict((line, get_result(operator.listen_and_respond(line))) for line in inputs)
+
+    for attr in dir(interface_class):
+        translator = getattr(getattr(interface_class, attr), 'translator', None)
+        if translator is not None:
+            translator.enable_adaptive(learn_interval)
+
+    mismatches = []
+    errors = []
+    start = threading.Event()
+
+    def run(n):
+        rng = random.Random(spec.seed + n)
+        operator = new_operator()
+        order = list(inputs)
+        start.wait()
+        try:
+            for r in range(rounds):
+                rng.shuffle(order)
+                for line in order:
+                    if get_result(operator.listen_and_respond(line)) != expected[line]:
+                        mismatches.append(line)
+        except Exception:
+            errors.append(traceback.format_exc())
+
+    # switch threads as often as possible, to interleave the dispatches finely
+    if hasattr(sys, 'setswitchinterval'):
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+    else:
+        interval = sys.getcheckinterval()
+        sys.setcheckinterval(1)
+    try:
+        workers = [threading.Thread(target=run, args=(n,)) for n in range(threads)]
+        for worker in workers:
+            worker.start()
+        started = timer()
+        start.set()
+        for worker in workers:
+            worker.join()
+        seconds = timer() - started
+    finally:
+        if hasattr(sys, 'setswitchinterval'):
+            sys.setswitchinterval(interval)
+        else:
+            sys.setcheckinterval(interval)
+
+    return {'dispatches': threads * rounds * len(inputs), 'mismatches': sorted(set(mismatches)), 'errors': errors,
+            'seconds': seconds}
+
+
+if __name__ == '__main__':
+    if '--stress' in sys.argv:
+        result = stress()
+        print('{} dispatches in {:.2f}s, {} mismatched lines, {} errors'.format(
+            result['dispatches'], result['seconds'], len(result['mismatches']), len(result['errors'])))
+        for line in result['mismatches'][:10]:
+            print('MISMATCH: {}'.format(line))
+        for error in result['errors'][:3]:
+            print(error)
+        sys.exit(1 if result['mismatches'] or result['errors'] else 0)
+
+    results = run_grid()
+    for (knob, stage), (exponent, seconds) in sorted(results.items()):
+        budget = BUDGETS.get((knob, stage))
+        print('{:<10} {:<9} k={:5.2f}{}  {}'.format(knob, stage, exponent,
+                                                     ' (budget {})'.format(budget) if budget is not None else '',
+                                                     ' '.join('{:.1e}'.format(s) for s in seconds)))
+
+    failures = check_budgets(results)
+    for knob, stage, exponent, budget in failures:
+        print('FAIL: {} grows as {}^{:.2f}, over its budget of {}'.format(stage, knob, exponent, budget))
+    sys.exit(1 if failures else 0)
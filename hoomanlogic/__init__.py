@@ -9,11 +9,30 @@ mind, and as the framework becomes more 'intelligent', projects that implement t
 changes to their code.
 """
 
+import cache
 import translation
+import validation
+import os
+import re
 import string
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+from itertools import count, islice, product
+from multiprocessing import TimeoutError
+from timeit import default_timer as timer
 
 IDENTCHARS = string.ascii_letters + string.digits + '_'
 
+# inputs of rule functions that are memoized for the dispatch, see ``ArgumentMediator.evaluate``
+_MEMO_INPUT_TYPES = (basestring, int, long, float)
+
+# threads shared by the rules that may block, see ``get_rule_pool``
+RULE_POOL_SIZE = 8
+_rule_pool = None
+_rule_pool_pid = None
+_rule_pool_lock = threading.Lock()
+
 
 #=======================================================================================================================
 # Operator
@@ -46,11 +65,28 @@ class Operator(object):
     :ivar last_suggestion_was_accepted: The user's decision for the last suggestion for a user-input command
                                         that wasn't found in the list of command synonyms.
     :type last_suggestion_was_accepted: bool
+    :ivar headless: Never prompt the user. Commands return a ``Resolution`` that can be resumed with the missing
+                    input or confirmation instead of blocking on ``raw_input``.
+    :type headless: bool
+    :ivar last_resolution: The ``Resolution`` of the last translated command.
+    :type last_resolution: Resolution|None
+    :ivar parse_cache: Opt-in cache of resolved arguments for repeated input, see ``cache.ParseCache``.
+    :type parse_cache: ParseCache|None
+    :ivar metrics: Opt-in counters and latency histograms of the operator and its translators, see
+                   ``metrics.Metrics``.
+    :type metrics: Metrics|None
+    :ivar help_page_size: Number of commands listed per page of help.
+    :type help_page_size: int
+    :ivar conflict_index: Ambiguous and shadowed synonyms of the registered interfaces, kept up to date on
+                          registration.
+    :type conflict_index: ConflictIndex
+    :ivar profiler: Opt-in profiling of the slow and sampled dispatches, see ``profiling.DispatchProfiler``.
+    :type profiler: DispatchProfiler|None
     """
 
     identchars = IDENTCHARS
 
-    def __init__(self, message_user_func=None):
+    def __init__(self, message_user_func=None, headless=False, parse_cache=None, metrics=None, profiler=None):
 
         self.root_scope = None
         self.interfaces = []
@@ -60,6 +96,13 @@ class Operator(object):
         self.last_suggestion = None
         self.last_suggestion_argline = None
         self.last_suggestion_was_accepted = False
+        self.headless = headless
+        self.last_resolution = None
+        self.parse_cache = parse_cache
+        self.metrics = metrics
+        self.profiler = profiler
+        self.help_page_size = 20
+        self.conflict_index = validation.ConflictIndex()
 
     def register_interface(self, interface, child_of=None):
         self.interfaces.append(interface)
@@ -80,16 +123,177 @@ class Operator(object):
         if hasattr(interface, 'register_hli'):
             getattr(interface, 'register_hli')()
 
-        # compile a full listing of the command thesaurus
+        self.index_interface(interface)
+
+        # the commands are visible from the interface and its descendants
+        self.invalidate_scope_index(interface)
+        if self.parse_cache is not None:
+            self.parse_cache.clear()
+
+    def index_interface(self, interface):
+        """Add the commands of an interface to its command indexes and the conflict index."""
+        # compile a full listing of the command thesaurus, and render the help text once
+        help_entries = []
         for attr in dir(interface.__class__):
             if hasattr(getattr(interface, attr), 'translator'):
-                for key, value in getattr(interface, attr).translator.synonyms.iteritems():
+                translator = getattr(interface, attr).translator
+                translator.render_usage()
+                for key, value in translator.synonyms.iteritems():
                     interface.command_dictionary[key] = value
+                    interface.command_index.add(key, value)
+                    help_entries.append((key, value))
+                    self.conflict_index.add(interface, key, value)
+        interface.help_index.add_all(help_entries)
+
+    def unregister_interface(self, interface):
+        """Remove a registered interface and its descendants.
+
+        Only the indexes of the removed interfaces are touched: the scope indexes of the other interfaces don't
+        include the commands of their descendants, and only the parse cache entries of the removed interfaces are
+        discarded. The interface is detached from its parent, its ``parent_interface`` reset to None, so it can be
+        registered again. Its descendants stay attached to it, and the operator, translators and indexes of the
+        removed interfaces are left as they are, so a dispatch already running one of their commands finishes
+        undisturbed. If the current scope is removed, the parent of the interface becomes the current scope.
+
+        :param interface: The interface to remove.
+        :type interface: object
+        """
+        if interface not in self.interfaces:
+            raise ValueError("The interface isn't registered with this operator!")
+
+        removed = set(self.iter_scopes(interface))
+        parent = interface.parent_interface
+        for scope in removed:
+            self.conflict_index.remove(scope)
+
+        # new lists rather than changes in place, for anything iterating the old ones
+        if parent is not None:
+            parent.interfaces = [child for child in parent.interfaces if child is not interface]
+        interface.parent_interface = None
+        self.interfaces = [scope for scope in self.interfaces if scope not in removed]
+
+        if self.root_scope in removed:
+            self.root_scope = None
+            for scope in self.interfaces:
+                if scope.parent_interface is None:
+                    self.root_scope = scope
+                    break
+        if self.current_scope in removed:
+            self.current_scope = parent if parent is not None else self.root_scope
+        if self.last_scope in removed:
+            self.last_scope = None
+        if self.parse_cache is not None:
+            self.parse_cache.discard(removed)
+
+    def replace_interface(self, old_interface, new_interface):
+        """Put a new interface in the place of a registered one, such as an instance of a class that was changed.
+
+        The new interface takes over the parent and children of the old one. Only the indexes of the new interface
+        and its descendants are rebuilt, and only their parse cache entries discarded. The translators of the new
+        interface's commands carry over the order learned by the old ones with the same name, where it still fits.
+        The old interface is detached from the tree, its ``parent_interface`` reset to None and its ``interfaces``
+        emptied, as its children now belong to the new interface. Its operator, translators and indexes are left as
+        they are, so a dispatch already running one of its commands finishes undisturbed.
+
+        :param old_interface: The registered interface.
+        :type old_interface: object
+        :param new_interface: The interface replacing it.
+        :type new_interface: object
+        """
+        if old_interface not in self.interfaces:
+            raise ValueError("The interface isn't registered with this operator!")
+
+        parent = old_interface.parent_interface
+        self.conflict_index.remove(old_interface)
+
+        new_interface.operator = self
+        new_interface.parent_interface = parent
+        new_interface.interfaces = list(old_interface.interfaces)
+        for child in new_interface.interfaces:
+            child.parent_interface = new_interface
+        if parent is not None:
+            parent.interfaces = [new_interface if child is old_interface else child for child in parent.interfaces]
+        old_interface.parent_interface = None
+        old_interface.interfaces = []
+        self.interfaces = [new_interface if scope is old_interface else scope for scope in self.interfaces]
+
+        if self.root_scope is old_interface:
+            self.root_scope = new_interface
+        if self.current_scope is old_interface:
+            self.current_scope = new_interface
+        if self.last_scope is old_interface:
+            self.last_scope = None
+
+        if hasattr(new_interface, 'register_hli'):
+            getattr(new_interface, 'register_hli')()
+        self.index_interface(new_interface)
+
+        for attr in dir(new_interface.__class__):
+            translator = getattr(getattr(new_interface, attr), 'translator', None)
+            old_translator = getattr(getattr(old_interface, attr, None), 'translator', None)
+            if translator is None or old_translator is None or old_translator is translator:
+                continue
+            if old_translator.mediator_stats is not None and translator.mediator_stats is None:
+                translator.enable_adaptive(old_translator.learn_interval)
+            translator.set_learned_order(old_translator.get_learned_order())
+
+        # the commands of the old interface were visible from its descendants
+        self.invalidate_scope_index(new_interface)
+        if self.parse_cache is not None:
+            self.parse_cache.discard(set(self.iter_scopes(new_interface)) | set([old_interface]))
+
+    def reload_interface(self, interface, factory=None):
+        """Reload the module of an interface's class and replace the interface with an instance of the new class.
+
+        Only the interface itself is replaced: its descendants keep their instances, even if their classes are
+        defined in the same module.
+
+        :param interface: The registered interface.
+        :type interface: object
+        :param factory: Function returning the new interface given the reloaded class, ie. to pass arguments to its
+                        constructor. The class is called without arguments by default.
+        :type factory: func|None
+        :return: Returns the new interface.
+        :rtype: object
+        """
+        import sys
+        try:
+            reload_module = reload
+        except NameError:
+            from importlib import reload as reload_module
+
+        cls = interface.__class__
+        module = reload_module(sys.modules[cls.__module__])
+        cls = getattr(module, cls.__name__)
+        new_interface = factory(cls) if factory is not None else cls()
+        self.replace_interface(interface, new_interface)
+        return new_interface
 
     def listen_and_respond(self, says):
+        """Find the command in the current scope and run it with the rest of the input as arguments.
+
+        :returns: Returns a bool indicating whether the input was handled. In headless mode, the ``Resolution`` of a
+                  translated command is returned instead, which may be pending further input or confirmation.
+        :rtype: bool|Resolution
+        """
+
+        if self.profiler is not None and not self.profiler.is_profiling():
+            return self.profiler.profile(self, says)
+
+        if self.metrics is not None:
+            started = timer()
+
+        if self.parse_cache is not None:
+            entry = self.parse_cache.get(self.current_scope, says)
+            if self.metrics is not None:
+                self.metrics.parse_cache_lookups.inc((self.current_scope.__class__.__name__,
+                                                      'hit' if entry is not None else 'miss'))
+            if entry is not None:
+                return self.run_cached(entry, started if self.metrics is not None else None)
 
         cmd, arg, says = self.parseline(says)
         get_help = False
+        found = False
 
         if cmd is not None:
             # search command word
@@ -98,32 +302,48 @@ class Operator(object):
                 # do we want a general listing of everything or just
                 # help with a specific command?
 
+                # a trailing number is the page of the listing
+                help_args = arg.split() if arg is not None else []
+                help_page = 1
+                if len(help_args) > 0 and help_args[-1].isdigit():
+                    help_page = int(help_args.pop())
+
                 # first part of argument is the command, if any, to get help on. Ignore the rest.
-                if arg is not None and arg != '':
-                    cmd = arg.split()[0]
+                if len(help_args) > 0:
+                    cmd = help_args[0]
                     arg = ''
                 else:
                     cmd = ''
                     arg = ''
 
-            # if there is a command, lets make sure the interface recognizes it
+            # if there is a command, lets make sure the interface or one of its ancestors recognizes it
+            owner = None
             if cmd != '':
-                found, newcmd, argprefix = self.search_interface_dictionary(self.current_scope, cmd)
+                owner, newcmd, argprefix = self.find_command(self.current_scope, cmd)
+                found = owner is not None
                 if found:
                     cmd = newcmd
 
-        if get_help and cmd is not None and cmd != '':
-            func = getattr(self.current_scope, cmd)
+                if self.metrics is not None:
+                    self.metrics.command_lookups.inc((self.current_scope.__class__.__name__,
+                                                      'hit' if found else 'miss'))
+                    self.metrics.time_stage('', 'lookup', started)
+
+        if get_help and found:
+            func = getattr(owner, cmd)
             self.tell_func_usage(func)
             return True
 
         elif get_help:
-            for key, value in self.current_scope.command_dictionary.iteritems():
-                print('Command: ' + key + '  ::  Synonyms: ' + str(value))
+            # list the commands, filtered by synonym prefix if the command wasn't found
+            self.tell_help_page(page=help_page, query=cmd if cmd != '' else None)
+            return True
 
         elif cmd is not None:
+            if owner is None:
+                owner = self.current_scope
             try:
-                func = getattr(self.current_scope, cmd)
+                func = getattr(owner, cmd)
             except AttributeError:
                 return False
             if hasattr(func, 'translator'):
@@ -137,39 +357,156 @@ class Operator(object):
                             args_required = True
                             break
 
-                if args_required == False and argprefix + arg == '':
+                if args_required == False and argprefix + arg == '' and not self.headless:
                     function_return = func()
+                    if self.parse_cache is not None:
+                        self.parse_cache.put(self.current_scope, says, cmd, func.translator, {}, owner)
                 else:
-                    success, function_return = func(HumanLanguageInput(' '.join([argprefix, arg])))
+                    hli = HumanLanguageInput(' '.join([argprefix, arg]), headless=self.headless,
+                                             metrics=self.metrics)
+                    success, function_return = func(hli)
                     # todo: Handle failed in cases where the user needs to be aware
                     #       but for now the only 'failure' is user cancelling the command.
                     #       Might also need to handle function returns, but interface methods should
                     #       be talking directly to the UI to return whatever need be.
+                    self.last_resolution = hli.resolution
+                    if self.parse_cache is not None and hli.resolution.is_reusable():
+                        self.parse_cache.put(self.current_scope, says, cmd, func.translator,
+                                             hli.resolution.managed_args, owner)
+                    if self.headless:
+                        return hli.resolution
                 return True
             else:
                 return False
 
         return False
 
-    def search_interface_dictionary(self, interface, cmd):
-        found_command = False
-        argprefix = ''
-        for key, value in interface.command_dictionary.iteritems():
-            if cmd in value:
-                found_command = True
-                cmd = key
+    def get_conflicts(self, kind=None):
+        """Returns the ambiguous and shadowed synonyms of the registered interfaces.
 
-                if len(cmd.split()) > 1:
-                    argprefix = ' '.join(cmd.split()[1:])
-                    cmd = cmd.split()[0]
+        :param kind: ``ConflictIndex.AMBIGUOUS`` or ``ConflictIndex.SHADOWED`` to only return one kind.
+        :type kind: str|None
+        :rtype: list<Conflict>
+        """
+        return self.conflict_index.get_conflicts(kind)
 
-                break
+    def iter_translators(self):
+        """Yields tuples of ('InterfaceClass.function', translator) for the registered interfaces."""
+        for interface in self.interfaces:
+            for attr in dir(interface.__class__):
+                if hasattr(getattr(interface, attr), 'translator'):
+                    yield '{}.{}'.format(interface.__class__.__name__, attr), getattr(interface, attr).translator
 
-        if found_command:
-            return True, cmd, argprefix
-        else:
+    def enable_adaptive_ordering(self, learn_interval=1000):
+        """Let the translators of all registered interfaces learn the cheapest order to evaluate rules in.
+
+        See ``Translator.enable_adaptive``.
+        """
+        for key, translator in self.iter_translators():
+            translator.enable_adaptive(learn_interval)
+
+    def save_learned_order(self, path):
+        """Write the learned order of the translators to a JSON file, so it can be loaded after a restart."""
+        import json
+        orders = {}
+        for key, translator in self.iter_translators():
+            orders[key] = translator.get_learned_order()
+        with open(path, 'w') as f:
+            json.dump(orders, f, indent=2, sort_keys=True)
+
+    def load_learned_order(self, path):
+        """Apply the learned order of the translators from a JSON file written by ``save_learned_order``."""
+        import json
+        with open(path) as f:
+            orders = json.load(f)
+        for key, translator in self.iter_translators():
+            if key in orders:
+                translator.set_learned_order(orders[key])
+
+    def run_cached(self, entry, started=None):
+        """Run the function of a parse cache entry with its resolved arguments.
+
+        :param entry: The parse cache entry.
+        :type entry: ParseCacheEntry
+        :param started: Timer value when the input was received, to time the ``cached`` stage in the metrics.
+        :type started: float|None
+        """
+        obj = entry.obj if entry.obj is not None else self.current_scope
+        result = entry.translator.fn(obj, **entry.copy_args())
+        if self.metrics is not None and started is not None:
+            self.metrics.time_stage(entry.translator.fn.func_name, 'cached', started)
+        if not self.headless:
+            return True
+
+        # a copy of its own, so the caller can't change the cached arguments
+        resolution = Resolution(entry.translator, obj, headless=True)
+        resolution.managed_args = entry.copy_args()
+        resolution.status = Resolution.COMPLETE
+        resolution.result = result
+        self.last_resolution = resolution
+        return resolution
+
+    def get_scope_index(self, scope):
+        """Returns the merged command index of a scope and its ancestors, building it on first use."""
+        scope_index = scope.scope_index
+        if scope_index is None:
+            parent_index = None
+            if scope.parent_interface is not None:
+                parent_index = self.get_scope_index(scope.parent_interface)
+            scope_index = scope.scope_index = ScopeIndex(scope, parent_index)
+        return scope_index
+
+    @staticmethod
+    def iter_scopes(scope):
+        """Yields an interface followed by its descendants."""
+        yield scope
+        for child in scope.interfaces:
+            for descendant in Operator.iter_scopes(child):
+                yield descendant
+
+    def invalidate_scope_index(self, scope):
+        """Discard the merged command index of a scope and its descendants, after their commands have changed."""
+        scope.scope_index = None
+        for child in scope.interfaces:
+            self.invalidate_scope_index(child)
+
+    def find_command(self, scope, cmd):
+        """Find a command word in a scope, falling through to its ancestors.
+
+        A command of a scope shadows the commands of its ancestors with the same command word.
+
+        :param scope: The interface to start from.
+        :type scope: object
+        :param cmd: The command word.
+        :type cmd: str
+        :return: Returns a tuple of (interface the command belongs to, command name, argument prefix), or
+                 (None, None, None) if the command word isn't recognized.
+        :rtype: tuple
+        """
+        owner, key = self.get_scope_index(scope).find(cmd)
+        if owner is None:
+            return None, None, None
+
+        argprefix = ''
+        if len(key.split()) > 1:
+            argprefix = ' '.join(key.split()[1:])
+            key = key.split()[0]
+
+        return owner, key, argprefix
+
+    def search_interface_dictionary(self, interface, cmd):
+        argprefix = ''
+        key = interface.command_index.find(cmd)
+        if key is None:
             return False, None, None
 
+        cmd = key
+        if len(cmd.split()) > 1:
+            argprefix = ' '.join(cmd.split()[1:])
+            cmd = cmd.split()[0]
+
+        return True, cmd, argprefix
+
     def tell(self, message, *args, **kwargs):
         if self.message_user_func is not None:
             self.message_user_func(message, *args, **kwargs)
@@ -202,30 +539,59 @@ class Operator(object):
         return cmd, arg, line
 
     def tell_func_usage(self, func):
-        message = None
-
         if hasattr(func, 'translator'):
-            message = "{}: {}\n".format(func.translator.fn.func_name, func.translator.description)
+            self.tell(func.translator.render_usage())
 
-            if len(func.translator.arg_mediators) > 0:
-                message += "\nCommand Arguments:"
-            for arg_mediator in func.translator.arg_mediators:
-                required = ' (required)'
-                max_count = ''
+    def iter_help(self, query=None, scope=None):
+        """Yields the help entries of a scope lazily, in command order or in order of the matching synonyms.
 
-                if not arg_mediator.required:
-                    required = ' (optional)'
-                if arg_mediator.max_count is None:
-                    max_count = ' There is no limit to the number of times this argument can be used.'
-                elif arg_mediator.max_count == 1:
-                    max_count = ' It can only be used once.'
-                else:
-                    max_count = ' It can only be used up to ' + str(arg_mediator.max_count) + ' times.'
+        The commands of the scope are followed by the commands of its ancestors that it doesn't shadow.
 
-                message += "  {}{}: {}{}\n".format(arg_mediator.name, required, arg_mediator.description, max_count)
-
-        if message is not None:
-            self.tell(message)
+        :param query: Only yield commands with a synonym starting with the query.
+        :type query: str|None
+        :param scope: The interface to list the commands of, the current scope by default.
+        :type scope: object|None
+        :rtype: generator<HelpEntry>
+        """
+        if scope is None:
+            scope = self.current_scope
+        yielded = set()
+        while scope is not None:
+            for entry in scope.help_index.iter_entries(query):
+                if entry.command not in yielded:
+                    yielded.add(entry.command)
+                    yield entry
+            scope = scope.parent_interface
+
+    def get_help_page(self, page=1, page_size=None, query=None, scope=None):
+        """Returns a page of help entries and whether there are more pages.
+
+        :param page: One-based page number.
+        :type page: int
+        :param page_size: Number of entries per page, ``help_page_size`` by default.
+        :type page_size: int|None
+        :param query: Only list commands with a synonym starting with the query.
+        :type query: str|None
+        :param scope: The interface to list the commands of, the current scope by default.
+        :type scope: object|None
+        :return: Returns a tuple of (list of entries, has more pages).
+        :rtype: tuple
+        """
+        if page_size is None:
+            page_size = self.help_page_size
+        start = (max(page, 1) - 1) * page_size
+        entries = list(islice(self.iter_help(query, scope), start, start + page_size + 1))
+        return entries[:page_size], len(entries) > page_size
+
+    def tell_help_page(self, page=1, query=None, scope=None):
+        """Tell the user a page of the command listing."""
+        entries, has_more = self.get_help_page(page, query=query, scope=scope)
+        lines = [entry.text for entry in entries]
+        if len(lines) == 0:
+            lines.append('No commands found.')
+        if has_more:
+            lines.append("Type 'help {}{}' for more.".format(query + ' ' if query else '', page + 1))
+        self.tell('\n'.join(lines))
 
 
 #=======================================================================================================================
@@ -233,10 +599,25 @@ class Operator(object):
 #=======================================================================================================================
 class HumanLanguageInput(object):
 
-    """Used to trigger the human-language interface, instead of passing a str to the actual function."""
+    """Used to trigger the human-language interface, instead of passing a str to the actual function.
+
+    :ivar input: The human-language input.
+    :type input: str
+    :ivar headless: Return a ``Resolution`` instead of prompting the user for missing input or confirmation.
+    :type headless: bool
+    :ivar metrics: Metrics to record the translation in, if any.
+    :type metrics: Metrics|None
+    :ivar resolution: The resolution of the translated input, set once the input is handled by a translator.
+    :type resolution: Resolution|None
+    """
+
+    __slots__ = ('input', 'headless', 'metrics', 'resolution')
 
-    def __init__(self, input):
+    def __init__(self, input, headless=False, metrics=None):
         self.input = input
+        self.headless = headless
+        self.metrics = metrics
+        self.resolution = None
 
 
 class InputChain(object):
@@ -245,17 +626,22 @@ class InputChain(object):
 
     :ivar input: The portion of human-language input that the chain-link represents.
     :type input: str
-    :ivar matched_by: A dictionary of argument names that matched the input containing tuples (output, is_prefix,
-                      certainty).
-    :type matched_by: dict
+    :ivar matches: Tuples (argument name, output, is_prefix, certainty) of the arguments that matched the input.
+                   Kept as a tuple rather than a dictionary, since a link is only matched by a few arguments.
+    :type matches: tuple
     :ivar position: The position of the input part in relation to the rest of the chain
     :type position: int
     :ivar previous_link: Previous input part.
     :type previous_link: Input|None
     :ivar next_link: Next input part.
     :type next_link: Input|None
+    :ivar prefix_owners: Names of the arguments the input is an argument prefixer of, or None if the chain was not
+                         labeled by ``label_prefixers()``.
+    :type prefix_owners: tuple<str>|None
     """
 
+    __slots__ = ('previous_link', 'next_link', 'position', 'input', 'matches', 'prefix_owners')
+
     @staticmethod
     def convert_to_chain(input_str):
         """Convert human-language input to chain of inputs.
@@ -316,6 +702,46 @@ class InputChain(object):
 
         return first_link
 
+    @staticmethod
+    def label_prefixers(first_link, prefixers):
+        """Label each link of the chain with the arguments it is a prefixer of, in a single scan of the chain.
+
+        A link of the form ``--tags=value``, where ``--tags`` is a prefixer, is split into the prefixer and the value,
+        and ``--tags=`` is read as the prefixer alone.
+
+        :param first_link: The first link of the chain.
+        :type first_link: InputChain
+        :param prefixers: The names of the arguments of each argument prefixer, see ``Translator.get_prefixers()``.
+        :type prefixers: dict<str,tuple<str>>
+        :return: Returns the first link of the chain.
+        :rtype: InputChain
+        """
+        link = first_link
+        shift = 0
+        while link is not None:
+            link.position += shift
+            owners = prefixers.get(link.input)
+            if owners is None and '=' in link.input:
+                prefixer, value = link.input.split('=', 1)
+                owners = prefixers.get(prefixer)
+                if owners is not None and value == '':
+                    link.input = prefixer
+                elif owners is not None:
+                    value_link = InputChain(value, link, hooman_says=True)
+                    value_link.prefix_owners = ()
+                    value_link.next_link = link.next_link
+                    if link.next_link is not None:
+                        link.next_link.previous_link = value_link
+                    link.next_link = value_link
+                    link.input = prefixer
+                    link.prefix_owners = owners
+                    shift += 1
+                    link = value_link.next_link
+                    continue
+            link.prefix_owners = owners if owners is not None else ()
+            link = link.next_link
+        return first_link
+
     def __init__(self, input, previous_link=None, **kwargs):
 
         if 'hooman_says' not in kwargs:
@@ -329,7 +755,13 @@ class InputChain(object):
             position = 1
         self.position = position
         self.input = input
-        self.matched_by = {}
+        self.matches = ()
+        self.prefix_owners = None
+
+    @property
+    def matched_by(self):
+        """A dictionary of argument names that matched the input containing tuples (output, is_prefix, certainty)."""
+        return dict((match[0], match[1:]) for match in self.matches)
 
     def read(self):
         """Returns the next link in the chain (or None if at the end of the chain)."""
@@ -341,7 +773,14 @@ class InputChain(object):
 
     def is_matched(self):
         """Returns whether the current link has been matched."""
-        return len(self.matched_by) > 0
+        return len(self.matches) > 0
+
+    def is_matched_by(self, arg_mediator_name):
+        """Returns whether the current link has been matched by the named argument mediator."""
+        for match in self.matches:
+            if match[0] == arg_mediator_name:
+                return True
+        return False
 
     def first(self):
         """Returns the first link in the chain."""
@@ -360,7 +799,7 @@ class InputChain(object):
         self = self.first()
         list_ = []
         while self is not None:
-            if arg_mediator_name in self.matched_by:
+            if self.is_matched_by(arg_mediator_name):
                 list_.append(self)
             self = self.read()
         return list_
@@ -370,10 +809,17 @@ class InputChain(object):
         return self.last().position
 
     def add_match(self, arg_mediator_name, translation, is_prefix, certainty):
-        self.matched_by[arg_mediator_name] = (translation, is_prefix, certainty)
+        matches = tuple(match for match in self.matches if match[0] != arg_mediator_name)
+        self.matches = matches + ((arg_mediator_name, translation, is_prefix, certainty),)
+
+    def remove_match(self, arg_mediator_name):
+        self.matches = tuple(match for match in self.matches if match[0] != arg_mediator_name)
 
     def get_output(self, arg_mediator_name):
-        return self.matched_by.get(arg_mediator_name, (None, None, None))
+        for match in self.matches:
+            if match[0] == arg_mediator_name:
+                return match[1:]
+        return None, None, None
 
     def accept_input(self):
         to_return = None
@@ -406,23 +852,361 @@ class InputChain(object):
         link = self.first()
         match_results = {}
         while link is not None:
-            for key, value in link.matched_by.iteritems():
+            for key, translation, is_prefix, certainty in link.matches:
                 if key not in match_results:
                     match_results[key] = []
-                match_results[key].append(InputMatchResult(link, value[0], value[1], value[2]))
+                match_results[key].append(InputMatchResult(link, translation, is_prefix, certainty))
             link = link.read()
         return match_results
 
 
-class InputMatchResult(object):
+class InputMatchResult(namedtuple('InputMatchResult', 'link translation is_prefix certainty')):
 
     """Input match result object."""
 
-    def __init__(self, link, translation, is_prefix, certainty):
-        self.link = link
-        self.translation = translation
-        self.is_prefix = is_prefix
-        self.certainty = certainty
+    __slots__ = ()
+
+
+class DeferredTranslation(namedtuple('DeferredTranslation', 'rule context value')):
+
+    """The output of an argument whose last rule only recognized the input while matching, see the ``recognize``
+    rule trait. The rule is called by ``ArgumentMediator.complete_translation()`` once the input is assigned.
+
+    :ivar rule: The rule function left to call.
+    :type rule: func
+    :ivar context: The resolved context of the rule.
+    :type context: object
+    :ivar value: The input to the rule.
+    :type value: object
+    """
+
+    __slots__ = ()
+
+
+class RuleFailure(namedtuple('RuleFailure', 'argument rule reason detail')):
+
+    """A rule call that counted as not recognizing the input because it failed, rather than evaluated to a reject.
+
+    :ivar argument: Name of the argument the rule was evaluated for.
+    :type argument: str
+    :ivar rule: Name of the rule function.
+    :type rule: str
+    :ivar reason: ``TIMEOUT`` when the rule ran past its timeout, ``DEADLINE`` when the dispatch ran out of time,
+                  or ``ERROR`` when the rule raised.
+    :type reason: str
+    :ivar detail: The exception raised by the rule, or ''.
+    :type detail: str
+    """
+
+    TIMEOUT = 'timeout'
+    DEADLINE = 'deadline'
+    ERROR = 'error'
+
+    __slots__ = ()
+
+
+class SpanChart(object):
+
+    """Matches argument mediators that can claim several consecutive input parts, such as 'next tuesday at 5pm'.
+
+    Each span mediator (``max_span > 1``) is evaluated once for every span of up to ``max_span`` links, and the
+    result of the first rule of a mediator, which reads the text of the span, is memoized per (rule, context, start,
+    end) so mediators sharing a rule don't parse the same span twice. The spans that explain the most input, with the
+    fewest spans, are then chosen by dynamic programming and each is merged into a single link. Rule calls grow
+    linearly with the length of the input, rather than with every span at every start position.
+
+    :ivar links: The links of the chain, in order.
+    :type links: list<InputChain>
+    :ivar memo: Results of rule calls, by (rule, id(context), start, end).
+    :type memo: dict
+    :ivar spans: Tuples (argument mediator, output) of the mediators that matched each span, by (start, end).
+    :type spans: dict<tuple,list<tuple>>
+    """
+
+    __slots__ = ('links', 'memo', 'spans')
+
+    def __init__(self, first_link):
+        self.links = []
+        link = first_link
+        while link is not None:
+            self.links.append(link)
+            link = link.read()
+        self.memo = {}
+        self.spans = {}
+
+    def get_text(self, start, end):
+        """Returns the input of the links of a span, joined by spaces."""
+        return ' '.join(link.input for link in self.links[start:end])
+
+    def evaluate(self, rule, context, start, end, arg_mediator, resolution=None):
+        """Returns the result of a rule for the text of a span, calling the rule only once per span."""
+        key = (rule, id(context), start, end)
+        result = self.memo.get(key)
+        if result is None:
+            result = self.memo[key] = arg_mediator.call_rule(rule, self.get_text(start, end), context, resolution)
+        return result
+
+    def parse(self, arg_mediators, resolution=None):
+        """Match the span mediators, merge the chosen spans and return the first link of the chain.
+
+        :param arg_mediators: The argument mediators that can claim spans.
+        :type arg_mediators: list<ArgumentMediator>
+        :param resolution: The resolution of the command being translated, if any.
+        :type resolution: Resolution|None
+        :rtype: InputChain
+        """
+        count = len(self.links)
+        for arg_mediator in arg_mediators:
+            # a prefixed argument may also continue right after one of its own spans, as it does for single links
+            continues = set()
+            for start in range(count):
+                if arg_mediator.argument_prefixer is not None and start not in continues and \
+                        not arg_mediator.is_prefixed(self.links[start]):
+                    continue
+                for end in range(start + 1, min(count, start + arg_mediator.max_span) + 1):
+                    recognized, output = arg_mediator.evaluate(self.get_text(start, end), resolution, self, start, end)
+                    if recognized:
+                        self.spans.setdefault((start, end), []).append((arg_mediator, output))
+                        if arg_mediator.max_count is None or arg_mediator.max_count > 1:
+                            continues.add(end)
+
+        return self.merge(self.get_best_cover())
+
+    def get_best_cover(self):
+        """Returns a list of the non-overlapping (start, end) spans that match the most input with the fewest spans."""
+        count = len(self.links)
+        starts = {}
+        for start, end in self.spans:
+            starts.setdefault(start, []).append(end)
+
+        # best[i] is the (links matched, -spans used) of the input from link i onward, and choice[i] the chosen span end
+        best = [(0, 0)] * (count + 1)
+        choice = [None] * (count + 1)
+        for i in range(count - 1, -1, -1):
+            best[i] = best[i + 1]
+            for end in starts.get(i, ()):
+                score = (best[end][0] + end - i, best[end][1] - 1)
+                if score > best[i]:
+                    best[i] = score
+                    choice[i] = end
+
+        cover = []
+        i = 0
+        while i < count:
+            if choice[i] is None:
+                i += 1
+            else:
+                cover.append((i, choice[i]))
+                i = choice[i]
+        return cover
+
+    def merge(self, cover):
+        """Merge the links of each span of the cover into its first link, record the matches and return the first link."""
+        for start, end in cover:
+            link = self.links[start]
+            if end - start > 1:
+                link.input = self.get_text(start, end)
+                link.next_link = self.links[end - 1].next_link
+                if link.next_link is not None:
+                    link.next_link.previous_link = link
+            for arg_mediator, output in self.spans[(start, end)]:
+                link.add_match(arg_mediator.name, output, False, 1)
+                if arg_mediator.argument_prefixer is not None and arg_mediator.is_prefixed(link):
+                    link.previous_link.add_match(arg_mediator.name, output, True, 1)
+
+        first_link = self.links[0]
+        position = 1
+        link = first_link
+        while link is not None:
+            link.position = position
+            position += 1
+            link = link.read()
+        return first_link
+
+
+#=======================================================================================================================
+# Resolution
+#=======================================================================================================================
+class Resolution(object):
+
+    """Structured, resumable state of a single translated command.
+
+    In headless mode the translator never prompts. When required arguments are missing or the command needs to be
+    confirmed, the resolution is returned pending and can be resumed later with ``resume()``, without tokenizing or
+    matching the original input again.
+
+    :ivar translator: The translator that produced the resolution.
+    :type translator: Translator
+    :ivar obj: The interface instance the command is run against.
+    :type obj: object
+    :ivar headless: Whether the user may be prompted for missing input or confirmation.
+    :type headless: bool
+    :ivar managed_args: Arguments assigned so far, by argument name.
+    :type managed_args: dict
+    :ivar missing: Names of the required arguments that have not been supplied yet.
+    :type missing: list<str>
+    :ivar unrecognized: Parts of the input that were not matched to any argument.
+    :type unrecognized: list<str>
+    :ivar needs_confirmation: Whether the command must be confirmed before it runs.
+    :type needs_confirmation: bool
+    :ivar confirmed: Whether the command has been confirmed.
+    :type confirmed: bool
+    :ivar supplied: Names of the arguments supplied after the original input, by prompt or ``resume()``.
+    :type supplied: list<str>
+    :ivar rejected: Answers supplied to ``resume()`` that could not be matched, by argument name.
+    :type rejected: dict<str,str>
+    :ivar status: One of ``INCOMPLETE``, ``CONFIRM``, ``COMPLETE`` or ``CANCELLED``.
+    :type status: str
+    :ivar result: The return value of the command once it has run.
+    :type result: object
+    :ivar metrics: Metrics to record the translation in, if any.
+    :type metrics: Metrics|None
+    :ivar contexts: Rule contexts resolved for the command, such as ``translation.ObjectAttribute`` and the values
+                    of prefetched providers, by id.
+    :type contexts: dict
+    :ivar memo: Results of the rules evaluated for the command, by (rule, id(context), type of input, input), shared
+                by the arguments so each distinct evaluation runs once. Rules opt out with the ``memoize`` trait.
+    :type memo: dict
+    :ivar deadline: Timer value by which the rules of the dispatch must be done, or None for no deadline.
+    :type deadline: float|None
+    :ivar failures: The rule calls that timed out, missed the deadline or raised, in the order they failed.
+    :type failures: list<RuleFailure>
+    """
+
+    INCOMPLETE = 'incomplete'
+    CONFIRM = 'confirm'
+    COMPLETE = 'complete'
+    CANCELLED = 'cancelled'
+
+    __slots__ = ('translator', 'obj', 'headless', 'managed_args', 'missing', 'unrecognized', 'needs_confirmation',
+                 'confirmed', 'supplied', 'rejected', 'status', 'result', 'metrics', 'contexts', 'memo', 'deadline',
+                 'failures')
+
+    def __init__(self, translator, obj, headless=False, metrics=None):
+        self.translator = translator
+        self.obj = obj
+        self.headless = headless
+        self.managed_args = {}
+        self.missing = []
+        self.unrecognized = []
+        self.needs_confirmation = False
+        self.confirmed = False
+        self.supplied = []
+        self.rejected = {}
+        self.status = Resolution.INCOMPLETE
+        self.result = None
+        self.metrics = metrics
+        self.contexts = {}
+        self.memo = {}
+        self.deadline = None
+        self.failures = []
+
+    def start_budget(self, seconds):
+        """Start the latency budget of a dispatch, the rules giving up once ``seconds`` have passed.
+
+        :param seconds: The budget, or None for no deadline.
+        :type seconds: float|None
+        """
+        self.deadline = timer() + seconds if seconds is not None else None
+
+    def get_context(self, context):
+        """Returns the context to pass to a rule, looking up attributes of the interface object once per dispatch.
+
+        A context fetched by ``prefetch_contexts()`` is replaced by its value.
+        """
+        key = id(context)
+        if key in self.contexts:
+            return self.contexts[key]
+        if isinstance(context, translation.ObjectAttribute):
+            self.contexts[key] = context.resolve(self.obj)
+            return self.contexts[key]
+        return context
+
+    def prefetch_contexts(self, providers):
+        """Look up the callable contexts of rules with the ``prefetch`` trait at once, rather than one after another.
+
+        The lookups run concurrently on the rule pool, so the dispatch waits for the slowest lookup rather than for
+        their sum, within the timeout of each rule and the deadline. A lookup that fails leaves its rules without a
+        context, and is recorded in ``failures`` like a failed rule. A single lookup without a timeout or deadline
+        runs in place.
+
+        :param providers: Tuples (argument mediator, rule function, context), see ``Translator.get_context_providers``.
+        :type providers: tuple<tuple>
+        """
+        fetches = []
+        for arg_mediator, rule, context in providers:
+            key = id(context)
+            if key in self.contexts:
+                continue
+            fn = context.resolve(self.obj) if isinstance(context, translation.ObjectAttribute) else context
+            if not callable(fn) or isinstance(fn, type):
+                self.contexts[key] = fn
+                continue
+            self.contexts[key] = None
+            fetches.append((key, fn, arg_mediator, rule, translation.get_rule_trait(rule, 'timeout', context)))
+
+        if len(fetches) == 1 and fetches[0][4] is None and self.deadline is None:
+            key, fn, arg_mediator, rule, timeout = fetches[0]
+            try:
+                self.contexts[key] = fn()
+            except Exception as e:
+                arg_mediator.fail_rule(rule, self, RuleFailure.ERROR, '{}: {}'.format(e.__class__.__name__, e))
+            return
+
+        pool = get_rule_pool()
+        started = timer()
+        pending = [(fetch, pool.apply_async(fetch[1])) for fetch in fetches]
+        for (key, fn, arg_mediator, rule, timeout), async_result in pending:
+            wait = max(0, started + timeout - timer()) if timeout is not None else None
+            reason = RuleFailure.TIMEOUT
+            if self.deadline is not None:
+                remaining = max(0, self.deadline - timer())
+                if wait is None or remaining < wait:
+                    wait = remaining
+                    reason = RuleFailure.DEADLINE
+            try:
+                self.contexts[key] = async_result.get(wait)
+            except TimeoutError:
+                arg_mediator.fail_rule(rule, self, reason)
+            except Exception as e:
+                arg_mediator.fail_rule(rule, self, RuleFailure.ERROR, '{}: {}'.format(e.__class__.__name__, e))
+
+    def is_pending(self):
+        """Returns whether the resolution is waiting on input or confirmation."""
+        return self.status in (Resolution.INCOMPLETE, Resolution.CONFIRM)
+
+    def is_reusable(self):
+        """Returns whether the command completed from the original input alone, with nothing to confirm.
+
+        A command where a rule failed is not reusable, as the rule may recognize the same input next time.
+        """
+        return (self.status == Resolution.COMPLETE and len(self.supplied) == 0 and not self.needs_confirmation and
+                len(self.failures) == 0)
+
+    def questions(self):
+        """Returns a dictionary of the questions to ask for each missing argument."""
+        questions = {}
+        for name in self.missing:
+            questions[name] = self.translator.get_arg_mediator(name).get_question()
+        return questions
+
+    def resume(self, answers=None, confirm=None):
+        """Supply missing input and/or confirmation and continue the command.
+
+        :param answers: Human-language input for missing arguments, by argument name.
+        :type answers: dict<str,str>|None
+        :param confirm: Whether the user confirmed the command, or None if not answered yet.
+        :type confirm: bool|None
+        :return: Returns the resolution.
+        :rtype: Resolution
+        """
+        self.translator.resume(self, answers=answers, confirm=confirm)
+        return self
+
+    def cancel(self):
+        """Abandon the pending command."""
+        if self.is_pending():
+            self.status = Resolution.CANCELLED
 
 
 #=======================================================================================================================
@@ -447,13 +1231,29 @@ class ArgumentMediator(object):
     :type rules: tuple
     :ivar question: Human-readable question to request input for the argument.
     :type question: str
+    :ivar types: Types of the argument from the function's docstring.
+    :type types: list<str>
+    :ivar rule_order: The learned evaluation order of the rules, or None to evaluate them in the order given.
+    :type rule_order: tuple|None
+    :ivar rule_stats: Observed cost and selectivity of the rules, recorded in adaptive mode only.
+    :type rule_stats: EvaluationStats|None
+    :ivar max_span: Max number of consecutive input parts the argument can claim as one input, such as 'next tuesday'.
+    :type max_span: int
+    :ivar frozen: Whether the mediator is read-only, see ``freeze()``.
+    :type frozen: bool
     """
 
+    __slots__ = ('name', 'description', 'required', 'argument_prefixer', 'max_count', 'rules', 'question', 'types',
+                 'rule_order', 'rule_stats', 'max_span', 'frozen')
+
+    # attributes that may still be replaced once frozen, each assignment swapping in a whole new value
+    LEARNED = ('rule_order', 'rule_stats')
+
     #===================================================================================================================
     # Initialization
     #===================================================================================================================
     def __init__(self, name, description='', required=False, max_count=1, argument_prefixer=None, rules=None,
-                 question=None, from_func_info=None):
+                 question=None, from_func_info=None, max_span=1):
 
         self.name = name
         self.description = description
@@ -462,6 +1262,10 @@ class ArgumentMediator(object):
         self.max_count = max_count
         self.rules = rules
         self.question = question
+        self.rule_order = None
+        self.rule_stats = None
+        self.max_span = max_span
+        self.frozen = False
 
         # if function info object was supplied, grab the info and apply it
         if from_func_info is not None:
@@ -474,53 +1278,69 @@ class ArgumentMediator(object):
                         types = type_str.split(',')
                         self.types = types
 
+    def __setattr__(self, name, value):
+        if getattr(self, 'frozen', False) and name not in ArgumentMediator.LEARNED:
+            raise AttributeError("Argument '{}' is frozen, '{}' can't be changed.".format(self.name, name))
+        object.__setattr__(self, name, value)
+
     #===================================================================================================================
     # Public Methods
     #===================================================================================================================
-    def try_match(self, input_part, prefix_matched=False):
+    def freeze(self):
+        """Make the mediator read-only, so it can be shared by concurrent dispatches without locks.
+
+        State of a single dispatch lives in its ``Resolution``. Only the learned rule order and statistics may be
+        replaced afterwards, see ``LEARNED``.
+        """
+        self.frozen = True
+
+    def get_rules(self):
+        """Returns the rules as a tuple of (rule_function, description, context) tuples, in evaluation order."""
+        if self.rule_order is not None:
+            return self.rule_order
+        return self.get_given_rules()
+
+    def get_given_rules(self):
+        """Returns the rules as a tuple of (rule_function, description, context) tuples, in the order given."""
+        if self.rules is None or not isinstance(self.rules, tuple) or len(self.rules) == 0:
+            return ()
+        if isinstance(self.rules[0], tuple):
+            return self.rules
+        return (self.rules,)
+
+    def try_match(self, input_part, prefix_matched=False, resolution=None):
         """Try to match argument definition to the input and return a bool indicating if it was successful.
 
         If a match is made, it will call the ``InputChain`` instance's add_match() function, adding itself for later
         consideration of the best match.
 
+        :param input_part: The link of the input chain to match.
+        :type input_part: InputChain
+        :param prefix_matched: Whether the argument prefixer was already matched by a previous link.
+        :type prefix_matched: bool
+        :param resolution: The resolution of the command being translated, if any.
+        :type resolution: Resolution|None
         :return: Returns a bool indicating whether it was successfully matched to the input.
         :rtype: bool
         """
 
-        translation = input_part.input
-        match_len = 1
         certainty = 1
 
+        metrics = resolution.metrics if resolution is not None else None
+
         # check for prefix
         prefix = 0
         if self.argument_prefixer is not None and not prefix_matched:
-            if input_part.previous_link is None:
+            if not self.is_prefixed(input_part):
+                if metrics is not None:
+                    metrics.mediator_matches.inc((resolution.translator.fn.func_name, self.name, 'reject'))
                 return False
-            if hasattr(self.argument_prefixer, '__iter__'):
-                if input_part.previous_link.input not in self.argument_prefixer:
-                    return False
-            else:
-                if input_part.previous_link.input != self.argument_prefixer:
-                    return False
             prefix = 1
 
-        # test rules if defined
-        if self.rules is not None and isinstance(self.rules, tuple) and len(self.rules) > 0:
-            if isinstance(self.rules[0], tuple):
-                for rule_args in self.rules:
-                    rule, description, context = rule_args
-                    recognized, evaluation_output = rule(translation, context)
-                    if not recognized:
-                        return False
-                    else:
-                        translation = evaluation_output
-            else:
-                rule, description, context = self.rules
-                recognized, evaluation_output = rule(translation, context)
-                if not recognized:
-                    return False
-                else:
-                    translation = evaluation_output
+        # test rules if defined, leaving the translation of the last rule until the input is assigned
+        recognized, translation = self.evaluate(input_part.input, resolution, defer=True)
+        if not recognized:
+            return False
 
         # if we made it this far, then match was successful!
         # add to managed_args and return true
@@ -534,50 +1354,348 @@ class ArgumentMediator(object):
                 reader.add_match(self.name, translation, True, certainty)
 
         # try to match everything following this if it depends on the prefix
-        # but as soon as one doesn't match, it breaks the argument chain
+        # but as soon as one doesn't match, or another prefixer starts, it breaks the argument chain
         if prefix > 0 and (self.max_count is None or self.max_count > 1):
             reader = input_part.read()
             matched = True
             match_count = 1
-            while reader is not None and matched is True:
-                matched = self.try_match(reader, True)
+            while reader is not None and matched is True and not self.is_prefixer(reader):
+                matched = self.try_match(reader, True, resolution)
                 match_count += 1
                 if match_count == self.max_count:
                     break
-                reader = input_part.read()
-
-        # match extended parts
-        if match_len > 1:
-            reader = input_part
-            for i in range(1, match_len):
                 reader = reader.read()
-                reader.add_match(self.name, translation, False, certainty)
 
         return True
 
-    def ask(self):
-        """Prompt user to give input in the case that required input was not already supplied or identified."""
+    def evaluate(self, text, resolution=None, chart=None, start=None, end=None, defer=False):
+        """Test the rules against the input and return a tuple of (recognized, translated output).
+
+        :param text: The input to test.
+        :type text: str
+        :param resolution: The resolution of the command being translated, if any.
+        :type resolution: Resolution|None
+        :param chart: The span chart the input is a span of, to reuse the result of the first rule for the span.
+        :type chart: SpanChart|None
+        :param start: Index of the first link of the span in the chart.
+        :type start: int|None
+        :param end: Index after the last link of the span in the chart.
+        :type end: int|None
+        :param defer: Only call the recognizer of the last rule if it has one, the output being a
+                      ``DeferredTranslation`` to complete with ``complete_translation()``.
+        :type defer: bool
+        :rtype: tuple
+        """
+        metrics = resolution.metrics if resolution is not None else None
+        memo = resolution.memo if resolution is not None else None
+        output = text
+        rules = self.get_rules()
+        last = len(rules) - 1
+
+        for i, rule_args in enumerate(rules):
+            rule, description, context = rule_args
+            if resolution is not None:
+                context = resolution.get_context(context)
+            if metrics is not None:
+                labels = (resolution.translator.fn.func_name, self.name, getattr(rule, '__name__', repr(rule)))
+
+            recognize = getattr(rule, 'recognize', None) if defer and i == last and chart is None else None
+            if recognize is not None:
+                if not recognize(output, context):
+                    if metrics is not None:
+                        metrics.mediator_matches.inc((labels[0], self.name, 'reject'))
+                    return False, None
+                output = DeferredTranslation(rule, context, output)
+                break
+
+            # reuse the result of the same rule, context and input from another argument of the same dispatch
+            key = None
+            result = None
+            if memo is not None and (chart is None or i > 0) and isinstance(output, _MEMO_INPUT_TYPES) and \
+                    translation.get_rule_trait(rule, 'memoize', context, default=True):
+                key = (rule, id(context), type(output), output)
+                result = memo.get(key)
+                if result is not None and metrics is not None:
+                    metrics.rule_memo_hits.inc(labels)
+
+            if result is None:
+                if self.rule_stats is not None:
+                    started = timer()
+                if chart is not None and i == 0:
+                    result = chart.evaluate(rule, context, start, end, self, resolution)
+                else:
+                    result = self.call_rule(rule, output, context, resolution)
+                if self.rule_stats is not None:
+                    self.rule_stats.record(rule_args, timer() - started, result[0])
+                if metrics is not None:
+                    metrics.rule_evaluations.inc(labels)
+                    if not result[0]:
+                        metrics.rule_rejections.inc(labels)
+                if key is not None:
+                    memo[key] = result
+
+            recognized, evaluation_output = result
+            if not recognized:
+                if metrics is not None:
+                    metrics.mediator_matches.inc((labels[0], self.name, 'reject'))
+                return False, None
+            else:
+                output = evaluation_output
+
+        if metrics is not None:
+            metrics.mediator_matches.inc((resolution.translator.fn.func_name, self.name, 'accept'))
+
+        return True, output
+
+    def complete_translation(self, output, resolution=None):
+        """Returns a tuple of (recognized, translated output) of matched output, calling the rule it was deferred by.
+
+        :param output: The output of ``evaluate()``, which may be a ``DeferredTranslation``.
+        :type output: object
+        :param resolution: The resolution of the command being translated, if any.
+        :type resolution: Resolution|None
+        :rtype: tuple
+        """
+        if not isinstance(output, DeferredTranslation):
+            return True, output
+        rule, context, value = output
+
+        # shared with the evaluations of the same rule by other arguments, see ``evaluate()``
+        key = None
+        memo = resolution.memo if resolution is not None else None
+        if memo is not None and isinstance(value, _MEMO_INPUT_TYPES) and \
+                translation.get_rule_trait(rule, 'memoize', context, default=True):
+            key = (rule, id(context), type(value), value)
+            if key in memo:
+                return memo[key]
+
+        result = self.call_rule(rule, value, context, resolution)
+        if resolution is not None and resolution.metrics is not None:
+            labels = (resolution.translator.fn.func_name, self.name, getattr(rule, '__name__', repr(rule)))
+            resolution.metrics.rule_evaluations.inc(labels)
+            if not result[0]:
+                resolution.metrics.rule_rejections.inc(labels)
+        if key is not None:
+            memo[key] = result
+        return result
+
+    def call_rule(self, rule, value, context, resolution=None):
+        """Call a rule function within its timeout and the deadline of the dispatch, and return its result.
+
+        Rules with the ``timeout`` trait may block, and run on the shared rule pool while the dispatch waits at most
+        until the timeout or the deadline. Other rules run in place once the deadline is checked. A rule that times
+        out, misses the deadline or raises counts as not recognizing the input, and the reason is recorded in the
+        resolution's ``failures``. Without a resolution, such as when ``try_match()`` is called directly, the rule
+        runs in place, and a rule that raises still counts as not recognizing the input.
+
+        :param rule: The rule function.
+        :type rule: func
+        :param value: The input to the rule.
+        :type value: object
+        :param context: The resolved context of the rule.
+        :type context: object
+        :param resolution: The resolution of the command being translated, if any.
+        :type resolution: Resolution|None
+        :rtype: tuple
+        """
+        if resolution is None:
+            try:
+                return rule(value, context)
+            except Exception:
+                # there is no resolution to record the failure in
+                return False, None
+
+        timeout = translation.get_rule_trait(rule, 'timeout', context)
+        reason = RuleFailure.TIMEOUT
+        if resolution.deadline is not None:
+            remaining = resolution.deadline - timer()
+            if remaining <= 0:
+                return self.fail_rule(rule, resolution, RuleFailure.DEADLINE)
+            if timeout is not None and remaining < timeout:
+                timeout = remaining
+                reason = RuleFailure.DEADLINE
+
+        try:
+            if timeout is None:
+                return rule(value, context)
+            return get_rule_pool().apply_async(rule, (value, context)).get(timeout)
+        except TimeoutError:
+            return self.fail_rule(rule, resolution, reason)
+        except Exception as e:
+            return self.fail_rule(rule, resolution, RuleFailure.ERROR, '{}: {}'.format(e.__class__.__name__, e))
+
+    def fail_rule(self, rule, resolution, reason, detail=''):
+        """Record a failed rule call in the resolution and return the result of a rule not recognizing the input."""
+        rule_name = getattr(rule, '__name__', repr(rule))
+        resolution.failures.append(RuleFailure(self.name, rule_name, reason, detail))
+        if resolution.metrics is not None:
+            resolution.metrics.rule_failures.inc((resolution.translator.fn.func_name, self.name, rule_name, reason))
+        return False, None
+
+    def is_prefixed(self, input_part):
+        """Returns whether the link before the input is one of the argument prefixers.
+
+        Reads the prefix owners labeled by ``InputChain.label_prefixers()`` when the chain was labeled.
+        """
+        previous_link = input_part.previous_link
+        if previous_link is None:
+            return False
+        if previous_link.prefix_owners is not None:
+            return self.name in previous_link.prefix_owners
+        return previous_link.input in self.get_prefixers()
+
+    def is_prefixer(self, input_part):
+        """Returns whether the input is an argument prefixer, of any argument if the chain was labeled."""
+        if input_part.prefix_owners is not None:
+            return len(input_part.prefix_owners) > 0
+        return input_part.input in self.get_prefixers()
+
+    def get_prefixers(self):
+        """Returns a tuple of the argument prefixers."""
+        if self.argument_prefixer is None:
+            return ()
+        if isinstance(self.argument_prefixer, basestring):
+            return (self.argument_prefixer,)
+        return tuple(self.argument_prefixer)
+
+    def get_question(self):
+        """Returns the question to ask the user for input to the argument."""
         if self.question is None:
-            self.question = "Please supply a value for required argument '{}':".format(self.name)
-        line = raw_input("{} ".format(self.question))
+            return "Please supply a value for required argument '{}':".format(self.name)
+        return self.question
+
+    def ask(self, resolution=None):
+        """Prompt user to give input in the case that required input was not already supplied or identified."""
+        line = raw_input("{} ".format(self.get_question()))
         line = line.strip()
         if line in ('', 'quit', 'cancel', 'q', 'abort', 'nevermind', 'forget it'):
             return False, True, None
 
+        # the time spent waiting on the user doesn't count against the deadline
+        if resolution is not None:
+            resolution.start_budget(resolution.translator.deadline)
+        reader = self.answer(line, resolution)
+        if reader is None:
+            print("Sorry, I didn't understand that. Please try again or hit enter to abort.")
+            return False, False, None
+        else:
+            return True, False, reader
+
+    def answer(self, line, resolution=None):
+        """Match input that was supplied for this argument, without prompting the user.
+
+        :param line: Human-language input for the argument.
+        :type line: str
+        :param resolution: The resolution of the command being translated, if any.
+        :type resolution: Resolution|None
+        :return: Returns the matched link of the input chain, or None if the input was not recognized.
+        :rtype: InputChain|None
+        """
         input_chain = InputChain.convert_to_chain(line)
+        if input_chain is not None and self.max_span > 1:
+            # the answer is given for this argument alone, so it has to be matched as a single span
+            input_chain = SpanChart(input_chain).parse([self], resolution)
+            if input_chain.read() is not None or not input_chain.is_matched_by(self.name):
+                return None
+            return input_chain
+        if input_chain is None or not self.try_match(input_chain, resolution=resolution):
+            return None
+        output, is_prefix, certainty = input_chain.get_output(self.name)
+        recognized, output = self.complete_translation(output, resolution)
+        if not recognized:
+            return None
+        input_chain.add_match(self.name, output, is_prefix, certainty)
+        return input_chain
+
+    def learn(self):
+        """Reorder the rules by their observed cost and selectivity.
+
+        Only consecutive rules with the ``check`` trait are reordered. A check returns its input unchanged, so every
+        check in such a run is evaluated against the same value and the outcome doesn't depend on their order. Rules
+        that translate the input stay where they are. Within a run, the checks that reject the most input for the
+        least cost are evaluated first.
+        """
+        if self.rule_stats is None:
+            return
 
-        # match every input to every arg so we can build stats and see what we have to work with
-        reader = input_chain
-        while reader is not None:
-            if not self.try_match(reader):
-                print("Sorry, I didn't understand that. Please try again or hit enter to abort.")
-                return False, False, None
+        rules = list(self.get_rules())
+        i = 0
+        while i < len(rules):
+            j = i
+            while j < len(rules) and translation.get_rule_trait(rules[j][0], 'check', rules[j][2], default=False):
+                j += 1
+            if j - i > 1:
+                rules[i:j] = sorted(rules[i:j], key=self.rule_stats.rank)
+            i = max(j, i + 1)
+
+        self.rule_order = tuple(rules)
+
+    def get_learned_order(self):
+        """Returns the learned evaluation order as a list of indexes into the rules as given, or None."""
+        if self.rule_order is None:
+            return None
+        given = [id(rule_args) for rule_args in self.get_given_rules()]
+        return [given.index(id(rule_args)) for rule_args in self.rule_order]
+
+    def set_learned_order(self, order):
+        """Apply an evaluation order returned by ``get_learned_order()``.
+
+        The order is ignored if it no longer fits the rules, ie. it would move a rule that isn't a check.
+        """
+        given = self.get_given_rules()
+        if order is None or sorted(order) != list(range(len(given))):
+            return False
+
+        # number the runs of consecutive checks, a rule may only move within its run
+        runs = []
+        run = 0
+        for rule, description, context in given:
+            if not translation.get_rule_trait(rule, 'check', context, default=False):
+                run += 1
+                runs.append(-run)
             else:
-                return True, False, reader
+                runs.append(run)
+        for position, i in enumerate(order):
+            if i != position and (runs[i] < 0 or runs[i] != runs[position]):
+                return False
+
+        self.rule_order = tuple(given[i] for i in order)
+        return True
 
-    def learn(self):
-        """Especially useful for main command translator, but may be useful for other translators as well."""
-        pass
+
+class EvaluationStats(object):
+
+    """Observed cost and selectivity of evaluations, such as rule function calls or argument mediator matches.
+
+    :ivar stats: Lists of [calls, rejects, total seconds], by the id of the evaluated object.
+    :type stats: dict
+    """
+
+    __slots__ = ('stats',)
+
+    def __init__(self):
+        self.stats = {}
+
+    def record(self, key_obj, cost, accepted):
+        """Record an evaluation of an object, its cost in seconds and whether it accepted the input."""
+        # counts are approximate under concurrent dispatches, an increment may be lost but never a whole entry
+        stats = self.stats.get(id(key_obj))
+        if stats is None:
+            stats = self.stats.setdefault(id(key_obj), [0, 0, 0.0])
+        stats[0] += 1
+        if not accepted:
+            stats[1] += 1
+        stats[2] += cost
+
+    def rank(self, key_obj):
+        """Returns the expected cost per rejection of an object, lowest first is the cheapest evaluation order.
+
+        Objects that have not been observed yet rank first, so they get observed.
+        """
+        calls, rejects, cost = self.stats.get(id(key_obj), (0, 0, 0.0))
+        if calls == 0:
+            return 0.0
+        return (cost / calls) / (float(rejects + 1) / (calls + 1))
 
 
 #=======================================================================================================================
@@ -612,6 +1730,9 @@ def interface(original_class):
 
     def __init__(self, *args, **kws):
         self.command_dictionary = {}
+        self.command_index = CommandIndex()
+        self.scope_index = None
+        self.help_index = HelpIndex()
         self.interfaces = []
         self.parent_interface = None
         self.operator = None
@@ -644,7 +1765,7 @@ def interface(original_class):
     return original_class
 
 
-def translator(synonyms=None, arg_mediators=None, rules=None, code_alert=0):
+def translator(synonyms=None, arg_mediators=None, rules=None, code_alert=0, deadline=None):
     """Wraps a function to accept HumanLanguageInput and translate to expected arguments.
 
     :param synonyms: A dictionary of 'commandname[ arg]' key entries each with a
@@ -656,6 +1777,8 @@ def translator(synonyms=None, arg_mediators=None, rules=None, code_alert=0):
     :type rules: tuple<func,object>|tuple<tuple<func,object>,...>
     :param code_alert: 0 - non-modifying code, 1 - non-critical modifying code, 2 - critical modifying code
     :type code_alert: int
+    :param deadline: Seconds the rules of a dispatch may take in all, or None for no deadline.
+    :type deadline: float|None
     """
 
     class Translator(object):
@@ -671,12 +1794,52 @@ def translator(synonyms=None, arg_mediators=None, rules=None, code_alert=0):
         :ivar synonyms: A dictionary of 'commandname[ arg]' key entries each with a
                         list of synonyms that equate to the key.
         :type synonyms: dict<str,list<str>>
+        :ivar code_alert: 0 - non-modifying code, 1 - non-critical modifying code, 2 - critical modifying code
+        :type code_alert: int
+        :ivar match_order: The learned order to match the argument mediators in, or None to match them in priority
+                           order. The order in which the matched input is assigned is not affected.
+        :type match_order: tuple<ArgumentMediator>|None
+        :ivar mediator_stats: Observed cost and selectivity of the argument mediators, recorded in adaptive mode only.
+        :type mediator_stats: EvaluationStats|None
+        :ivar learn_interval: Number of translations between reordering in adaptive mode.
+        :type learn_interval: int
+        :ivar usage: Usage text of the function, rendered by ``render_usage()``.
+        :type usage: str|None
+        :ivar prefixers: The names of the arguments of each argument prefixer, built by ``get_prefixers()``.
+        :type prefixers: dict<str,tuple<str>>|None
+        :ivar context_providers: The callable contexts of the rules to prefetch, built by ``get_context_providers()``.
+        :type context_providers: tuple<tuple>|None
+        :ivar cacheable: Whether resolved arguments can be reused for the same input, found by ``is_cacheable()``.
+        :type cacheable: bool|None
+        :ivar deadline: Seconds the rules of a dispatch may take in all, or None for no deadline. Once it passes,
+                        the remaining rules count as not recognizing their input and the dispatch carries on with
+                        what was matched, see ``Resolution.failures``.
+        :type deadline: float|None
+        :ivar translation_counter: Counts the translations in adaptive mode, without a lock.
+        :type translation_counter: itertools.count
+        :ivar frozen: Whether the translator is read-only, see ``freeze()``.
+        :type frozen: bool
         """
 
-        def __init__(self, fn, arg_mediators=None, synonyms=None, description=None, code_alert=0, auto_setup=True):
+        # attributes that may still be replaced once frozen, each assignment swapping in a whole new value
+        LEARNED = ('match_order', 'mediator_stats', 'learn_interval', 'translation_counter')
 
+        def __init__(self, fn, arg_mediators=None, synonyms=None, description=None, code_alert=0, auto_setup=True,
+                     deadline=None):
+
+            self.frozen = False
             self.fn = fn
             self.description = description
+            self.code_alert = code_alert
+            self.match_order = None
+            self.mediator_stats = None
+            self.learn_interval = 1000
+            self.translation_counter = count(1)
+            self.usage = None
+            self.prefixers = None
+            self.context_providers = None
+            self.cacheable = None
+            self.deadline = deadline
 
             if arg_mediators is not None:
                 self.arg_mediators = arg_mediators
@@ -721,11 +1884,13 @@ def translator(synonyms=None, arg_mediators=None, rules=None, code_alert=0):
                             types = type_str.split(',')
                             self.types = types
                             if 'str' not in types and 'None' not in types:
+                                # resolve the type casts once, rather than looking them up on every call
                                 context_types = []
                                 add_rule = True
                                 for key in types:
-                                    if key in translation.type_cast_dict:
-                                        context_types.append(key)
+                                    cast = translation.resolve_type_cast(key)
+                                    if cast is not None:
+                                        context_types.append(cast)
                                     else:
                                         add_rule = False  # unrecognized object
                                         break
@@ -735,25 +1900,70 @@ def translator(synonyms=None, arg_mediators=None, rules=None, code_alert=0):
                                             'Value must be translatable to one of the '
                                             'following types: {}.'.format(type_str), context_types)
 
+                        # compile the docstring rules once, after the types rule that translates the input
+                        rules = (rule,) if rule is not None else ()
+                        if par.rules.strip() != '':
+                            try:
+                                rules += translation.compile_rules(par.rules, rules)
+                            except ValueError as e:
+                                raise ValueError("'{}' argument '{}': {}".format(fn.func_name, par.name, e))
+
+                        if len(rules) == 0:
+                            rules = None
+                        elif len(rules) == 1:
+                            rules = rules[0]
+
                         arg_mediator = ArgumentMediator(par.name,
                                                         description=par.description,
                                                         required=par.has_default is False,
-                                                        rules=rule)
+                                                        rules=rules)
                         self.arg_mediators.append(arg_mediator)
 
-        def add_to_managed_args(self, input_chain, arg_mediator, managed_args):
-            """Add output to managed args and pop link from the chain, returning the chain."""
+        def __setattr__(self, name, value):
+            if getattr(self, 'frozen', False) and name not in Translator.LEARNED:
+                raise AttributeError("Translator of '{}' is frozen, '{}' can't be changed.".format(self.fn.func_name,
+                                                                                                   name))
+            object.__setattr__(self, name, value)
+
+        def freeze(self):
+            """Build the state that is otherwise built on first use, and make the translator and its argument mediators
+            read-only.
+
+            A translator is shared by every instance of the interface and every thread, so everything that belongs to
+            a single call lives in its ``Resolution``, and the same translator can run concurrent dispatches without
+            locks. Only the learned order and statistics of adaptive mode may be replaced afterwards, see ``LEARNED``.
+            """
+            self.arg_mediators = tuple(self.arg_mediators)
+            self.render_usage()
+            self.get_prefixers()
+            self.get_context_providers()
+            self.is_cacheable()
+            for arg_mediator in self.arg_mediators:
+                arg_mediator.freeze()
+            self.frozen = True
+
+        def add_to_managed_args(self, input_chain, arg_mediator, managed_args, resolution=None):
+            """Add output to managed args and pop link from the chain, returning the chain.
+
+            A translation deferred while matching is completed first. If the rule then rejects the input, the link
+            stays in the chain for the other arguments that matched it.
+            """
 
             # get the matched variables
             output, is_prefix, certainty = input_chain.get_output(arg_mediator.name)
 
-            # accept the input to pop it from the input chain
-            input_chain = input_chain.accept_input()
-
             # if it's just context for argument matching, do not add to managed args
             if is_prefix:
+                return input_chain.accept_input()
+
+            recognized, output = arg_mediator.complete_translation(output, resolution)
+            if not recognized:
+                input_chain.remove_match(arg_mediator.name)
                 return input_chain
 
+            # accept the input to pop it from the input chain
+            input_chain = input_chain.accept_input()
+
             # add to managed args
             if arg_mediator.max_count is None or arg_mediator.max_count > 1:
                 if not arg_mediator.name in managed_args:
@@ -765,28 +1975,243 @@ def translator(synonyms=None, arg_mediators=None, rules=None, code_alert=0):
             # return what is left of the chain
             return input_chain
 
-        def translate_and_run(self, obj, line):
-            self.obj = obj
+        def confirm_matches(self, links, arg_mediator, resolution=None):
+            """Complete the translations deferred for the links matched by the argument, see ``evaluate()``.
+
+            The matches the rule rejects are removed, and the rest keep the completed output.
+
+            :return: Returns the links that are still matched by the argument.
+            :rtype: list<InputChain>
+            """
+            confirmed = []
+            for link in links:
+                output, is_prefix, certainty = link.get_output(arg_mediator.name)
+                if not is_prefix and isinstance(output, DeferredTranslation):
+                    recognized, output = arg_mediator.complete_translation(output, resolution)
+                    if not recognized:
+                        link.remove_match(arg_mediator.name)
+                        continue
+                    link.add_match(arg_mediator.name, output, is_prefix, certainty)
+                confirmed.append(link)
+            return confirmed
+
+        def is_cacheable(self):
+            """Returns whether resolved arguments can be reused for the same input, found on first use.
+
+            True for non-modifying functions whose rules are all declared pure, with contexts that are either static
+            or versioned by a ``ContextProvider``.
+            """
+            if self.cacheable is not None:
+                return self.cacheable
+
+            cacheable = self.code_alert == 0
+            for arg_mediator in self.arg_mediators:
+                for rule, description, context in arg_mediator.get_given_rules():
+                    if not translation.get_rule_trait(rule, 'pure', context, default=False) or \
+                            (not translation.is_static_context(context) and
+                             not isinstance(context, translation.ContextProvider)):
+                        cacheable = False
+
+            self.cacheable = cacheable
+            return cacheable
+
+        def get_context_versions(self):
+            """Returns a tuple of the versions of the context providers used by the argument rules."""
+            versions = []
+            for arg_mediator in self.arg_mediators:
+                for rule, description, context in arg_mediator.get_rules():
+                    if isinstance(context, translation.ContextProvider):
+                        versions.append(context.version)
+            return tuple(versions)
+
+        def get_context_providers(self):
+            """Returns tuples (argument mediator, rule function, context) of the contexts to prefetch, built on first use.
+
+            These are the callable and ``translation.ObjectAttribute`` contexts of the rules with the ``prefetch`` trait.
+            """
+            if self.context_providers is not None:
+                return self.context_providers
+
+            providers = []
+            for arg_mediator in self.arg_mediators:
+                for rule, description, context in arg_mediator.get_given_rules():
+                    if not translation.is_static_context(context) and \
+                            translation.get_rule_trait(rule, 'prefetch', context, default=False):
+                        providers.append((arg_mediator, rule, context))
+
+            self.context_providers = tuple(providers)
+            return self.context_providers
+
+        def render_usage(self):
+            """Returns the usage text of the function, rendered on first use and then reused."""
+            if self.usage is not None:
+                return self.usage
+
+            message = "{}: {}\n".format(self.fn.func_name, self.description)
+
+            if len(self.arg_mediators) > 0:
+                message += "\nCommand Arguments:"
+            for arg_mediator in self.arg_mediators:
+                required = ' (required)'
+                max_count = ''
+
+                if not arg_mediator.required:
+                    required = ' (optional)'
+                if arg_mediator.max_count is None:
+                    max_count = ' There is no limit to the number of times this argument can be used.'
+                elif arg_mediator.max_count == 1:
+                    max_count = ' It can only be used once.'
+                else:
+                    max_count = ' It can only be used up to ' + str(arg_mediator.max_count) + ' times.'
+
+                message += "  {}{}: {}{}\n".format(arg_mediator.name, required, arg_mediator.description, max_count)
+
+            self.usage = message
+            return message
+
+        def get_prefixers(self):
+            """Returns the names of the arguments of each argument prefixer, built on first use."""
+            if self.prefixers is not None:
+                return self.prefixers
+
+            prefixers = {}
+            for arg_mediator in self.arg_mediators:
+                for prefixer in arg_mediator.get_prefixers():
+                    prefixers[prefixer] = prefixers.get(prefixer, ()) + (arg_mediator.name,)
+
+            self.prefixers = prefixers
+            return prefixers
+
+        def enable_adaptive(self, learn_interval=1000):
+            """Record the cost and selectivity of the rules and argument mediators, and reorder them periodically.
+
+            :param learn_interval: Number of translations between reordering.
+            :type learn_interval: int
+            """
+            self.learn_interval = learn_interval
+            self.mediator_stats = EvaluationStats()
+            for arg_mediator in self.arg_mediators:
+                arg_mediator.rule_stats = EvaluationStats()
+
+        def learn(self):
+            """Reorder the rules of each argument mediator, and the argument mediators by their observed cost.
+
+            Every argument mediator is matched against every part of the input, and the matches are assigned in
+            priority order, so neither order changes the outcome of a translation.
+            """
+            if self.mediator_stats is None:
+                return
+            for arg_mediator in self.arg_mediators:
+                arg_mediator.learn()
+            self.match_order = tuple(sorted(self.arg_mediators, key=self.mediator_stats.rank))
+
+        def get_learned_order(self):
+            """Returns the learned match and rule order as a dictionary that can be serialized to JSON."""
+            order = {'match_order': None, 'rule_order': {}}
+            if self.match_order is not None:
+                order['match_order'] = [arg_mediator.name for arg_mediator in self.match_order]
+            for arg_mediator in self.arg_mediators:
+                rule_order = arg_mediator.get_learned_order()
+                if rule_order is not None:
+                    order['rule_order'][arg_mediator.name] = rule_order
+            return order
+
+        def set_learned_order(self, order):
+            """Apply a learned order returned by ``get_learned_order()``, skipping parts that no longer fit."""
+            names = [arg_mediator.name for arg_mediator in self.arg_mediators]
+            match_order = order.get('match_order')
+            if match_order is not None and sorted(match_order) == sorted(names):
+                self.match_order = tuple(self.get_arg_mediator(name) for name in match_order)
+            for name, rule_order in order.get('rule_order', {}).items():
+                if name in names:
+                    self.get_arg_mediator(name).set_learned_order(rule_order)
+
+        def get_arg_mediator(self, name):
+            """Returns the argument mediator with the given name."""
+            for arg_mediator in self.arg_mediators:
+                if arg_mediator.name == name:
+                    return arg_mediator
+            raise KeyError("'{}' has no argument named '{}'.".format(self.fn.func_name, name))
+
+        def translate_and_run(self, obj, line, headless=False, resolution=None):
+            """Translate the human-language input to arguments and run the function.
+
+            :param obj: The interface instance to run the function against.
+            :type obj: object
+            :param line: Human-language input for the arguments.
+            :type line: str
+            :param headless: Return a pending ``Resolution`` instead of prompting for missing input or confirmation.
+            :type headless: bool
+            :param resolution: A new resolution to fill in, for callers that need it after an interactive command.
+            :type resolution: Resolution|None
+            :return: Returns a tuple of (success, return value of the function). In headless mode the second item is
+                     the ``Resolution`` of the command.
+            :rtype: tuple
+            """
+            if resolution is None:
+                resolution = Resolution(self, obj, headless=headless)
+            resolution.start_budget(self.deadline)
+            managed_args = resolution.managed_args
+            metrics = resolution.metrics
+            if metrics is not None:
+                started = timer()
+
             input_chain = InputChain.convert_to_chain(line)
+            prefixers = self.get_prefixers()
+            if input_chain is not None and len(prefixers) > 0:
+                InputChain.label_prefixers(input_chain, prefixers)
+
+            # look up the contexts the rules will need all at once, unless there is no input to match
+            context_providers = self.get_context_providers()
+            if input_chain is not None and len(context_providers) > 0:
+                resolution.prefetch_contexts(context_providers)
+
+            if metrics is not None:
+                started = metrics.time_stage(self.fn.func_name, 'tokenize', started)
 
             # match every input to every arg so we can build stats and see what we have to work with
+            match_order = self.match_order if self.match_order is not None else self.arg_mediators
+            mediator_stats = self.mediator_stats
+
+            # arguments that can claim several input parts are matched first, merging the spans they claim
+            span_mediators = [arg_mediator for arg_mediator in match_order if arg_mediator.max_span > 1]
+            if input_chain is not None and len(span_mediators) > 0:
+                input_chain = SpanChart(input_chain).parse(span_mediators, resolution)
+
             link = input_chain
             while link is not None:
-                for arg_mediator in self.arg_mediators:
-                    arg_mediator.try_match(link)
+                for arg_mediator in match_order:
+                    if arg_mediator.max_span > 1:
+                        continue
+                    if mediator_stats is not None:
+                        match_started = timer()
+                        matched = arg_mediator.try_match(link, resolution=resolution)
+                        mediator_stats.record(arg_mediator, timer() - match_started, matched)
+                    else:
+                        arg_mediator.try_match(link, resolution=resolution)
                 link = link.read()
 
+            if mediator_stats is not None:
+                if next(self.translation_counter) % self.learn_interval == 0:
+                    self.learn()
+
+            if metrics is not None:
+                started = metrics.time_stage(self.fn.func_name, 'match', started)
+
             # now evaluate the input matches and pick the best options
-            managed_args = {}  # dict of managed args
 
             # first, if there are required args that are only matched once, accept those matches
             if input_chain is not None:
                 for arg_mediator in self.arg_mediators:
-                    match_results = input_chain.get_match_results()
-                    if arg_mediator.name in match_results and len(match_results[arg_mediator.name]) == 1 and arg_mediator.required:
-
-                        link = input_chain.get_links_matched_by(arg_mediator.name)[0]
-                        input_chain = self.add_to_managed_args(input_chain.get_by_pos(link.position), arg_mediator, managed_args)
+                    if not arg_mediator.required:
+                        continue
+                    links = input_chain.get_links_matched_by(arg_mediator.name)
+                    if len(links) > 1:
+                        # a match the rule was deferred for only counts once the rule accepts it
+                        links = self.confirm_matches(links, arg_mediator, resolution)
+                    if len(links) == 1:
+                        input_chain = self.add_to_managed_args(input_chain.get_by_pos(links[0].position),
+                                                               arg_mediator, managed_args, resolution)
 
                     if input_chain is None:
                         break
@@ -801,58 +2226,154 @@ def translator(synonyms=None, arg_mediators=None, rules=None, code_alert=0):
                     for link in links[:]:
                         if arg_mediator.name not in managed_args or arg_mediator.max_count is None or \
                                 (arg_mediator.max_count > 1 and len(managed_args[arg_mediator.name]) < arg_mediator.max_count):
-                            input_chain = self.add_to_managed_args(input_chain.get_by_pos(link.position), arg_mediator, managed_args)
+                            input_chain = self.add_to_managed_args(input_chain.get_by_pos(link.position),
+                                                                   arg_mediator, managed_args, resolution)
 
                     if input_chain is None:
                         break
 
-            # check if any required args haven't been assigned to
-            # and prompt user to supply required input
-            required_args_were_not_matched = False
+            # note required args that haven't been assigned to
             for arg_mediator in self.arg_mediators:
                 if arg_mediator.required and arg_mediator.name not in managed_args:
-                    matched = False
-                    abort = False
-                    i_c = None
-                    while matched is False and abort is False:
-                        matched, abort, input_chain = arg_mediator.ask()
-
-                    if matched:
-                        self.add_to_managed_args(input_chain, arg_mediator, managed_args)
-                    else:
-                        required_args_were_not_matched = True
-                        break
-
-            # if user cancels before matching all required args, return None
-            if required_args_were_not_matched:
-                return False, None
+                    resolution.missing.append(arg_mediator.name)
 
-            # check if any input is still unrecognized
-            unrecognized_input_exists = input_chain is not None
+            # note any input that is still unrecognized
+            link = input_chain.first() if input_chain is not None else None
+            while link is not None:
+                resolution.unrecognized.append(link.input)
+                link = link.read()
 
             # if this is a critical function, or there was ignored input
             # then lets make sure we're doing what the user really wants
-            if code_alert > 0 or unrecognized_input_exists:
+            resolution.needs_confirmation = self.code_alert > 0 or len(resolution.unrecognized) > 0
+
+            if metrics is not None:
+                metrics.time_stage(self.fn.func_name, 'assign', started)
+                for name in resolution.missing:
+                    metrics.prompts.inc((self.fn.func_name, name))
+                if resolution.needs_confirmation:
+                    metrics.confirmations.inc((self.fn.func_name, 'requested'))
+
+            return self.resolve(resolution)
+
+        def resume(self, resolution, answers=None, confirm=None):
+            """Continue a pending resolution with the missing input and/or confirmation.
+
+            Answers are matched by the named argument's mediator only, the rest of the original input is not
+            tokenized or matched again.
+
+            :param resolution: A pending resolution returned by ``translate_and_run``.
+            :type resolution: Resolution
+            :param answers: Human-language input for missing arguments, by argument name.
+            :type answers: dict<str,str>|None
+            :param confirm: Whether the user confirmed the command, or None if not answered yet.
+            :type confirm: bool|None
+            :return: Returns a tuple of (success, resolution).
+            :rtype: tuple
+            """
+            if not resolution.is_pending():
+                raise Exception("The resolution is {} and cannot be resumed.".format(resolution.status))
+
+            if answers is not None:
+                resolution.start_budget(self.deadline)
+                for name, line in answers.iteritems():
+                    arg_mediator = self.get_arg_mediator(name)
+                    link = arg_mediator.answer(line.strip(), resolution)
+                    if link is None:
+                        resolution.rejected[name] = line
+                        continue
+                    resolution.rejected.pop(name, None)
+                    self.add_to_managed_args(link, arg_mediator, resolution.managed_args, resolution)
+                    resolution.supplied.append(name)
+                    if name in resolution.missing:
+                        resolution.missing.remove(name)
+
+            if confirm is not None:
+                if resolution.metrics is not None:
+                    resolution.metrics.confirmations.inc((self.fn.func_name, 'accepted' if confirm else 'declined'))
+                if not confirm:
+                    resolution.status = Resolution.CANCELLED
+                    return False, resolution
+                resolution.confirmed = True
+
+            return self.resolve(resolution)
+
+        def resolve(self, resolution):
+            """Get the missing input and confirmation for the resolution, and run the function once complete.
+
+            In headless mode, return the resolution pending instead of prompting the user.
+            """
+            managed_args = resolution.managed_args
+
+            if resolution.headless:
+                if len(resolution.missing) > 0:
+                    resolution.status = Resolution.INCOMPLETE
+                    return False, resolution
+                if resolution.needs_confirmation and not resolution.confirmed:
+                    resolution.status = Resolution.CONFIRM
+                    return False, resolution
+                self.run(resolution)
+                return True, resolution
+
+            # prompt user to supply required input
+            for name in resolution.missing[:]:
+                arg_mediator = self.get_arg_mediator(name)
+                matched = False
+                abort = False
+                input_chain = None
+                while matched is False and abort is False:
+                    matched, abort, input_chain = arg_mediator.ask(resolution)
+
+                if matched:
+                    self.add_to_managed_args(input_chain, arg_mediator, managed_args, resolution)
+                    resolution.supplied.append(name)
+                    resolution.missing.remove(name)
+                else:
+                    # if user cancels before matching all required args, return None
+                    resolution.status = Resolution.CANCELLED
+                    return False, None
+
+            if resolution.needs_confirmation and not resolution.confirmed:
                 args_verify = ''
                 for key, value in managed_args.iteritems():
                     args_verify += "\n    {}: {}".format(key, value)
                 line = raw_input("{}: {}{}\n\nIs this what you want to do? ".format(self.func_info.name, self.description, args_verify))
-                if line == 'y':
-                    return True, (self.fn(obj, **managed_args))
-                else:
+                if resolution.metrics is not None:
+                    resolution.metrics.confirmations.inc((self.fn.func_name, 'accepted' if line == 'y' else 'declined'))
+                if line != 'y':
+                    resolution.status = Resolution.CANCELLED
                     return False, None
-            else:
-                return True, (self.fn(obj, **managed_args))
+                resolution.confirmed = True
+
+            self.run(resolution)
+            return True, resolution.result
+
+        def run(self, resolution):
+            """Call the function with the managed args of a complete resolution."""
+            if resolution.metrics is not None:
+                started = timer()
+            managed_args = resolution.managed_args
+            if self.is_cacheable():
+                # the resolved arguments may be cached after the call, keep them as they were resolved
+                managed_args = cache.copy_args(managed_args)
+            resolution.result = self.fn(resolution.obj, **managed_args)
+            resolution.status = Resolution.COMPLETE
+            if resolution.metrics is not None:
+                resolution.metrics.time_stage(self.fn.func_name, 'run', started)
 
     def wrapper(fn):
         def wrapped(self, *args, **kwargs):
             if args is not None and len(args) == 1 and isinstance(args[0], HumanLanguageInput):
                 # hooman
-                return fn.translator.translate_and_run(self, args[0].input)
+                args[0].resolution = Resolution(fn.translator, self, headless=args[0].headless,
+                                                metrics=args[0].metrics)
+                return fn.translator.translate_and_run(self, args[0].input, resolution=args[0].resolution)
             else:
                 # musheen
                 return fn(self, *args, **kwargs)
-        hltranslator = Translator(fn, synonyms=synonyms, arg_mediators=arg_mediators, code_alert=code_alert)
+        hltranslator = Translator(fn, synonyms=synonyms, arg_mediators=arg_mediators, code_alert=code_alert,
+                                  deadline=deadline)
+        hltranslator.freeze()
         wrapped.translator = hltranslator
         fn.translator = hltranslator
         return wrapped
@@ -863,8 +2384,26 @@ def translator(synonyms=None, arg_mediators=None, rules=None, code_alert=0):
 #=======================================================================================================================
 # Helper Methods and Classes
 #=======================================================================================================================
+def get_rule_pool():
+    """Returns the pool of ``RULE_POOL_SIZE`` threads that rules with a timeout run on, starting it on first use.
+
+    The pool is bounded, so rules that hang hold at most every thread of the pool, and later calls time out waiting
+    for a thread rather than starting more. A forked process starts a pool of its own.
+
+    :rtype: multiprocessing.pool.ThreadPool
+    """
+    global _rule_pool, _rule_pool_pid
+    if _rule_pool is None or _rule_pool_pid != os.getpid():
+        with _rule_pool_lock:
+            if _rule_pool is None or _rule_pool_pid != os.getpid():
+                from multiprocessing.pool import ThreadPool
+                _rule_pool = ThreadPool(RULE_POOL_SIZE)
+                _rule_pool_pid = os.getpid()
+    return _rule_pool
+
+
 def build_command_words(*args):
-    """Builds a list of command words for a single command, especially for joining together common synonyms of parts of a command.
+    """Builds the command words for a single command, especially for joining together common synonyms of parts of a command.
 
     Ie. Supplying a tuple of lists of strings::
 
@@ -891,6 +2430,10 @@ def build_command_words(*args):
     would result in ``['findaction', 'findtask', 'searchaction', 'searchtask', 'unjoined', 'command_words',
     'one off command']``
 
+    A tuple can join any number of parts. The joined words are not built up front: they are kept in factored form in
+    the returned ``CommandWords``, which matches input against the parts directly, so large combinations of synonyms
+    cost memory in proportion to the parts rather than to every combination.
+
     It is not recommended to use spaces in your command words, as the command prompt would interpret the space as the
     beginning of the arguments list. However, once optional speech recognition is implemented in HoomanCmd these
     command parts will be fully supported and treated as separate words, so keep that in mind in your implementation
@@ -899,21 +2442,15 @@ def build_command_words(*args):
 
     :param args: Handles tuples of lists of str, lists of str objects, and str objects.
     :type args: tuple<list<str>>, list<str>, str
-    :return: Returns a list of str objects of all the combined command parts and lists given.
-    :rtype: list<str>
+    :return: Returns the list-like command words of all the combined command parts and lists given.
+    :rtype: CommandWords
     """
 
-    command_words = []
+    command_words = CommandWords()
 
     for arg in args:
         if isinstance(arg, tuple) and len(arg) > 1:
-            for cmd_part_1 in arg[0]:
-                for cmd_part_2 in arg[1]:
-                    if len(arg) > 2:
-                        for cmd_part_3 in arg[2]:
-                            command_words.append(''.join([cmd_part_1, cmd_part_2, cmd_part_3]))
-                    else:
-                        command_words.append(''.join([cmd_part_1, cmd_part_2]))
+            command_words.add_product(arg)
         elif isinstance(arg, list) and len(arg) > 0 and isinstance(arg[0], str):
             command_words.extend(arg)
         elif isinstance(arg, str):
@@ -922,7 +2459,525 @@ def build_command_words(*args):
     return command_words
 
 
-class FunctionInfo():
+class CommandWords(object):
+
+    """The command words of a single command, with joined parts kept in factored form.
+
+    Behaves like the list of every command word for iterating, ``len()`` and ``in``, but the joined words are only
+    built when iterating. Membership is tested against the literal words, then against one compiled pattern per
+    product of parts.
+
+    :ivar words: Literal command words.
+    :type words: list<str>
+    :ivar products: Products of parts, each a tuple of tuples of str, joined in the order given.
+    :type products: list<tuple<tuple<str>>>
+    """
+
+    __slots__ = ('words', 'word_set', 'products', 'patterns')
+
+    def __init__(self, words=None, products=None):
+        self.words = []
+        self.word_set = set()
+        self.products = []
+        self.patterns = []
+        if words is not None:
+            self.extend(words)
+        for parts in products or []:
+            self.add_product(parts)
+
+    def append(self, word):
+        """Add a literal command word."""
+        if word not in self.word_set:
+            self.words.append(word)
+            self.word_set.add(word)
+
+    def extend(self, words):
+        """Add literal command words."""
+        for word in words:
+            self.append(word)
+
+    def add_product(self, parts):
+        """Add the command words joining one of each of the parts, in order.
+
+        :param parts: Lists of str, or a str for a part with a single word.
+        :type parts: tuple<list<str>|str>
+        """
+        self.products.append(tuple((part,) if isinstance(part, str) else tuple(part) for part in parts))
+        self.patterns.append(None)
+
+    def iter_products(self):
+        """Yields a ``CommandWords`` for each product of parts."""
+        for parts in self.products:
+            yield CommandWords(products=[parts])
+
+    def get_pattern(self, i):
+        """Returns the compiled pattern matching the words of a product, compiling it on first use."""
+        pattern = self.patterns[i]
+        if pattern is None:
+            pattern = re.compile(''.join('(?:{})'.format('|'.join(re.escape(word) for word in
+                                                                   sorted(part, key=len, reverse=True)))
+                                         for part in self.products[i]) + r'\Z')
+            self.patterns[i] = pattern
+        return pattern
+
+    def __contains__(self, word):
+        if word in self.word_set:
+            return True
+        for i in range(len(self.products)):
+            if self.get_pattern(i).match(word) is not None:
+                return True
+        return False
+
+    def __iter__(self):
+        for word in self.words:
+            yield word
+        for parts in self.products:
+            for words in product(*parts):
+                yield ''.join(words)
+
+    def __len__(self):
+        count = len(self.words)
+        for parts in self.products:
+            combinations = 1
+            for part in parts:
+                combinations *= len(part)
+            count += combinations
+        return count
+
+    def __str__(self):
+        items = [repr(word) for word in self.words]
+        for parts in self.products:
+            items.append(''.join('({})'.format('|'.join(part)) for part in parts))
+        return '[' + ', '.join(items) + ']'
+
+    __repr__ = __str__
+
+    def complete(self, prefix):
+        """Yields the command words starting with the prefix, walking the parts rather than every combination."""
+        for word in self.words:
+            if word.startswith(prefix):
+                yield word
+        for parts in self.products:
+            for word in CommandWords._complete_parts(parts, 0, prefix, ''):
+                yield word
+
+    @staticmethod
+    def _complete_parts(parts, i, prefix, joined):
+        if i == len(parts):
+            if prefix == '':
+                yield joined
+            return
+        for part in parts[i]:
+            if part.startswith(prefix):
+                # the rest of the prefix is consumed, so any combination of the remaining parts completes it
+                for words in product(*parts[i + 1:]):
+                    yield joined + part + ''.join(words)
+            elif prefix.startswith(part):
+                for word in CommandWords._complete_parts(parts, i + 1, prefix[len(part):], joined + part):
+                    yield word
+
+
+class PatternIndex(object):
+
+    """Finds the products of parts of ``CommandWords`` that join to a word, without matching it against every product.
+
+    Products are indexed by the words of their first and last parts. A word can only be joined from a product with a
+    first part word it starts with and a last part word it ends with, which are looked up with one dictionary lookup
+    per distinct length of those words, and only the products found both ways are matched against the word.
+
+    :ivar entries: Tuples of (value, ``CommandWords``, index of the product) by entry id, ids increasing as added.
+    :type entries: dict<int,tuple>
+    :ivar values: Entry ids by value.
+    :type values: dict<object,list<int>>
+    :ivar firsts: Entry ids by word of the first part.
+    :type firsts: dict<str,set<int>>
+    :ivar lasts: Entry ids by word of the last part.
+    :type lasts: dict<str,set<int>>
+    :ivar first_lengths: Number of first part words of each length, as {length: count}.
+    :type first_lengths: dict<int,int>
+    :ivar last_lengths: Number of last part words of each length, as {length: count}.
+    :type last_lengths: dict<int,int>
+    :ivar first_prefixes: Entry ids by proper prefix of the words of the first part, to find overlapping products.
+    :type first_prefixes: dict<str,set<int>>
+    :ivar last_suffixes: Entry ids by proper suffix of the words of the last part, to find overlapping products.
+    :type last_suffixes: dict<str,set<int>>
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.values = {}
+        self.firsts = {}
+        self.lasts = {}
+        self.first_lengths = {}
+        self.last_lengths = {}
+        self.first_prefixes = {}
+        self.last_suffixes = {}
+        self.next_id = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, value, synonyms):
+        """Add the products of parts of a ``CommandWords``, found as the value, ie. a command key."""
+        for i, parts in enumerate(synonyms.products):
+            entry_id = self.next_id
+            self.next_id += 1
+            self.entries[entry_id] = (value, synonyms, i)
+            self.values.setdefault(value, []).append(entry_id)
+            for word in set(parts[0]):
+                PatternIndex._index(self.firsts, self.first_lengths, word, entry_id)
+                for length in range(len(word)):
+                    self.first_prefixes.setdefault(word[:length], set()).add(entry_id)
+            for word in set(parts[-1]):
+                PatternIndex._index(self.lasts, self.last_lengths, word, entry_id)
+                for length in range(len(word)):
+                    self.last_suffixes.setdefault(word[len(word) - length:], set()).add(entry_id)
+
+    def remove(self, value):
+        """Remove the products added for a value."""
+        for entry_id in self.values.pop(value, ()):
+            value, synonyms, i = self.entries.pop(entry_id)
+            parts = synonyms.products[i]
+            for word in set(parts[0]):
+                PatternIndex._unindex(self.firsts, self.first_lengths, word, entry_id)
+                for length in range(len(word)):
+                    PatternIndex._discard(self.first_prefixes, word[:length], entry_id)
+            for word in set(parts[-1]):
+                PatternIndex._unindex(self.lasts, self.last_lengths, word, entry_id)
+                for length in range(len(word)):
+                    PatternIndex._discard(self.last_suffixes, word[len(word) - length:], entry_id)
+
+    def copy(self):
+        """Returns a copy of the index that products can be added to without changing this one."""
+        copied = PatternIndex()
+        copied.entries = dict(self.entries)
+        copied.values = dict((value, list(ids)) for value, ids in self.values.items())
+        for name in ('firsts', 'lasts', 'first_prefixes', 'last_suffixes'):
+            setattr(copied, name, dict((word, set(ids)) for word, ids in getattr(self, name).items()))
+        copied.first_lengths = dict(self.first_lengths)
+        copied.last_lengths = dict(self.last_lengths)
+        copied.next_id = self.next_id
+        return copied
+
+    def find(self, word):
+        """Returns the values of the products joining to the word, in the order they were added.
+
+        :rtype: list
+        """
+        candidates = PatternIndex._lookup(self.firsts, self.first_lengths, word, True)
+        if len(candidates) == 0:
+            return []
+        candidates &= PatternIndex._lookup(self.lasts, self.last_lengths, word, False)
+
+        values = []
+        for entry_id in sorted(candidates):
+            value, synonyms, i = self.entries[entry_id]
+            if value not in values and synonyms.get_pattern(i).match(word) is not None:
+                values.append(value)
+        return values
+
+    def get_overlapping(self, parts):
+        """Returns tuples of (value, ``CommandWords``) of the products that may share words with a product of parts.
+
+        Products sharing a word have a first part word that is a prefix of the other's, and a last part word that is
+        a suffix of the other's, which leaves only the products that need their words compared.
+
+        :param parts: The parts of the product.
+        :type parts: tuple<tuple<str>>
+        :rtype: list<tuple>
+        """
+        candidates = set()
+        for word in set(parts[0]):
+            candidates |= PatternIndex._lookup(self.firsts, self.first_lengths, word, True)
+            candidates.update(self.first_prefixes.get(word, ()))
+        if len(candidates) == 0:
+            return []
+        related = set()
+        for word in set(parts[-1]):
+            related |= PatternIndex._lookup(self.lasts, self.last_lengths, word, False)
+            related.update(self.last_suffixes.get(word, ()))
+        return [self.entries[entry_id][:2] for entry_id in sorted(candidates & related)]
+
+    @staticmethod
+    def _lookup(words, lengths, word, first):
+        # the ids of the entries with an indexed word that the word starts (or ends) with
+        ids = set()
+        for length in lengths:
+            if length <= len(word):
+                found = words.get(word[:length] if first else word[len(word) - length:])
+                if found is not None:
+                    ids |= found
+        return ids
+
+    @staticmethod
+    def _index(words, lengths, word, entry_id):
+        ids = words.setdefault(word, set())
+        if entry_id not in ids:
+            ids.add(entry_id)
+            lengths[len(word)] = lengths.get(len(word), 0) + 1
+
+    @staticmethod
+    def _unindex(words, lengths, word, entry_id):
+        if entry_id in words.get(word, ()):
+            PatternIndex._discard(words, word, entry_id)
+            lengths[len(word)] -= 1
+            if lengths[len(word)] == 0:
+                del lengths[len(word)]
+
+    @staticmethod
+    def _discard(words, word, entry_id):
+        ids = words.get(word)
+        if ids is not None:
+            ids.discard(entry_id)
+            if len(ids) == 0:
+                del words[word]
+
+
+class CommandIndex(object):
+
+    """Finds the command of a command word in a scope, without scanning every command's synonyms.
+
+    :ivar words: Command keys by literal command word.
+    :type words: dict<str,str>
+    :ivar patterns: Tuples of (command key, ``CommandWords``) for the commands with joined parts.
+    :type patterns: list<tuple>
+    :ivar pattern_index: The joined parts of the commands, by command key.
+    :type pattern_index: PatternIndex
+    """
+
+    def __init__(self):
+        self.words = {}
+        self.patterns = []
+        self.pattern_index = PatternIndex()
+
+    def add(self, command, synonyms):
+        """Add the synonyms of a command. The first command added for a word is the one found."""
+        if isinstance(synonyms, CommandWords):
+            words = synonyms.words
+            if len(synonyms.products) > 0:
+                self.patterns.append((command, synonyms))
+                self.pattern_index.add(command, synonyms)
+        else:
+            words = synonyms
+        for word in words:
+            self.words.setdefault(word, command)
+
+    def remove(self, command):
+        """Remove the synonyms of a command."""
+        for word in [word for word, key in self.words.items() if key == command]:
+            del self.words[word]
+        self.patterns = [(key, synonyms) for key, synonyms in self.patterns if key != command]
+        self.pattern_index.remove(command)
+
+    def find(self, word):
+        """Returns the command key of a command word, or None if it isn't a command word of the scope."""
+        command = self.words.get(word)
+        if command is not None:
+            return command
+        if len(self.pattern_index) > 0:
+            commands = self.pattern_index.find(word)
+            if len(commands) > 0:
+                return commands[0]
+        return None
+
+
+class ScopeIndex(object):
+
+    """Merged view of the command words of a scope and its ancestors, so lookups fall through to the ancestors in
+    constant time, however deep the scope is.
+
+    The view of a scope is chained to the view of its parent, copy-on-write: a scope without command words of its own
+    shares its parent's dictionary, and a scope with command words copies it once and overlays its own, so the
+    commands of a scope shadow those of its ancestors. Views are built on first use and discarded when a scope or
+    one of its ancestors registers commands, see ``Operator.invalidate_scope_index``.
+
+    :ivar depth: Number of ancestors of the scope.
+    :type depth: int
+    :ivar words: Tuples of (depth, interface, command key) by literal command word.
+    :type words: dict<str,tuple>
+    :ivar patterns: Tuples of (depth, interface, command key, ``CommandWords``) of the commands with joined parts,
+                    nearest scope first.
+    :type patterns: list<tuple>
+    :ivar pattern_index: The joined parts of the commands, by tuple of (depth, interface, command key), or None if
+                         there are none.
+    :type pattern_index: PatternIndex|None
+    :ivar sorted_words: The literal command words in order, sorted on the first ``complete()``.
+    :type sorted_words: list<str>|None
+    """
+
+    __slots__ = ('depth', 'words', 'patterns', 'pattern_index', 'sorted_words')
+
+    def __init__(self, scope, parent_index=None):
+        command_index = scope.command_index
+        self.depth = parent_index.depth + 1 if parent_index is not None else 0
+        words = parent_index.words if parent_index is not None else {}
+        patterns = parent_index.patterns if parent_index is not None else []
+        pattern_index = parent_index.pattern_index if parent_index is not None else None
+
+        if len(command_index.words) > 0:
+            words = dict(words)
+            for word, command in command_index.words.items():
+                words[word] = (self.depth, scope, command)
+        if len(command_index.patterns) > 0:
+            patterns = [(self.depth, scope, command, synonyms)
+                        for command, synonyms in command_index.patterns] + patterns
+            pattern_index = pattern_index.copy() if pattern_index is not None else PatternIndex()
+            for command, synonyms in command_index.patterns:
+                pattern_index.add((self.depth, scope, command), synonyms)
+
+        self.words = words
+        self.patterns = patterns
+        self.pattern_index = pattern_index
+        self.sorted_words = None
+
+    def find(self, word):
+        """Returns a tuple of (interface, command key) of a command word, or (None, None) if it isn't recognized."""
+        entry = self.words.get(word)
+        # a literal command word of a scope is found before the joined parts of the same or outer scopes
+        if self.pattern_index is not None and (entry is None or entry[0] < self.depth):
+            found = None
+            for depth, scope, command in self.pattern_index.find(word):
+                # the nearest scope wins, and within a scope the first command added
+                if (entry is None or depth > entry[0]) and (found is None or depth > found[0]):
+                    found = (depth, scope, command)
+            if found is not None:
+                return found[1], found[2]
+        if entry is None:
+            return None, None
+        return entry[1], entry[2]
+
+    def complete(self, prefix, limit=None):
+        """Returns a sorted list of the command words of the scope and its ancestors starting with the prefix.
+
+        Literal words are found by bisecting the sorted words, so the cost depends on the number of matches rather
+        than the number of command words in scope.
+
+        :param prefix: The start of a command word.
+        :type prefix: str
+        :param limit: Max number of command words to return, or None for all.
+        :type limit: int|None
+        :rtype: list<str>
+        """
+        if self.sorted_words is None:
+            self.sorted_words = sorted(self.words)
+        sorted_words = self.sorted_words
+
+        matches = []
+        i = bisect_left(sorted_words, prefix)
+        while i < len(sorted_words) and sorted_words[i].startswith(prefix):
+            if limit is not None and len(matches) == limit:
+                break
+            matches.append(sorted_words[i])
+            i += 1
+
+        if len(self.patterns) > 0:
+            words = set(matches)
+            for depth, scope, command, synonyms in self.patterns:
+                words.update(islice(synonyms.complete(prefix), limit))
+            matches = sorted(words)[:limit]
+        return matches
+
+
+class HelpEntry(namedtuple('HelpEntry', 'command synonyms text')):
+
+    """A command of the help listing, with its rendered line of text."""
+
+    __slots__ = ()
+
+
+class HelpIndex(object):
+
+    """The help listing of an interface, rendered once per command and searchable by synonym prefix.
+
+    :ivar entries: Help entries by command.
+    :type entries: dict<str,HelpEntry>
+    :ivar commands: Sorted commands.
+    :type commands: list<str>
+    :ivar synonyms: Sorted tuples of (synonym, command) of the literal synonyms.
+    :type synonyms: list<tuple>
+    :ivar patterns: Tuples of (command, ``CommandWords``) for the commands with joined parts.
+    :type patterns: list<tuple>
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.commands = []
+        self.synonyms = []
+        self.patterns = []
+
+    def add(self, command, synonyms):
+        """Add or replace the help entry of a command."""
+        self.add_all([(command, synonyms)])
+
+    def add_all(self, commands):
+        """Add or replace the help entries of commands, sorting the listing once for all of them.
+
+        :param commands: Tuples of (command, synonyms).
+        :type commands: iterable<tuple>
+        """
+        commands = list(commands)
+        self.remove_all([command for command, synonyms in commands if command in self.entries])
+        for command, synonyms in commands:
+            if isinstance(synonyms, CommandWords):
+                words = list(synonyms.words)
+                if len(synonyms.products) > 0:
+                    self.patterns.append((command, synonyms))
+            else:
+                words = synonyms = list(synonyms)
+            self.entries[command] = HelpEntry(command, synonyms,
+                                              'Command: ' + command + '  ::  Synonyms: ' + str(synonyms))
+            self.commands.append(command)
+            self.synonyms.extend((synonym, command) for synonym in words)
+        # the listing is sorted up to the appended entries, so the sort only orders those and merges them in
+        self.commands.sort()
+        self.synonyms.sort()
+
+    def remove(self, command):
+        """Remove the help entry of a command."""
+        self.remove_all([command])
+
+    def remove_all(self, commands):
+        """Remove the help entries of commands, filtering the listing once for all of them.
+
+        :param commands: The commands to remove.
+        :type commands: iterable<str>
+        """
+        removed = set()
+        for command in commands:
+            del self.entries[command]
+            removed.add(command)
+        if len(removed) == 0:
+            return
+        # filtering keeps the listing sorted
+        self.commands = [command for command in self.commands if command not in removed]
+        self.synonyms = [(synonym, command) for synonym, command in self.synonyms if command not in removed]
+        self.patterns = [(command, synonyms) for command, synonyms in self.patterns if command not in removed]
+
+    def iter_entries(self, query=None):
+        """Yields the entries in command order, or the entries with a synonym starting with the query."""
+        if query is None:
+            for command in self.commands:
+                yield self.entries[command]
+            return
+
+        yielded = set()
+        i = bisect_left(self.synonyms, (query,))
+        while i < len(self.synonyms) and self.synonyms[i][0].startswith(query):
+            command = self.synonyms[i][1]
+            if command not in yielded:
+                yielded.add(command)
+                yield self.entries[command]
+            i += 1
+
+        for command, synonyms in self.patterns:
+            if command not in yielded:
+                for word in synonyms.complete(query):
+                    yielded.add(command)
+                    yield self.entries[command]
+                    break
+
+
+class FunctionInfo(object):
 
     """Garners information about a given function and its parameters."""
 
@@ -987,7 +3042,7 @@ class FunctionInfo():
             self.parameters.append(par)
 
 
-class ParameterInfo():
+class ParameterInfo(object):
 
     """Contains information about a function parameter.
 
@@ -1010,6 +3065,8 @@ class ParameterInfo():
     :type rules: str
     """
 
+    __slots__ = ('name', 'position', 'position_modifier', 'has_default', 'default', 'description', 'types', 'rules')
+
     def __init__(self, name, position):
         self.name = name
         self.position = position
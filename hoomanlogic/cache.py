@@ -0,0 +1,175 @@
+"""
+hoomanlogic.cache
+
+Caching of resolved arguments for frequently repeated human-language input.
+"""
+
+import copy
+import threading
+from array import array
+from collections import OrderedDict
+
+
+#=======================================================================================================================
+# Parse Cache
+#=======================================================================================================================
+_MUTABLE_TYPES = (list, dict, set, array)
+
+
+def copy_args(managed_args):
+    """Returns a copy of resolved arguments, with copies of the lists, dictionaries, sets and arrays among them."""
+    copied = {}
+    for key, value in managed_args.items():
+        if isinstance(value, _MUTABLE_TYPES):
+            value = copy.copy(value)
+        copied[key] = value
+    return copied
+
+
+class ParseCacheEntry(object):
+
+    """Resolved arguments of a cached command.
+
+    :ivar cmd: Name of the interface function that handles the command.
+    :type cmd: str
+    :ivar translator: The translator of the function.
+    :type translator: Translator
+    :ivar managed_args: The resolved arguments to call the function with.
+    :type managed_args: dict
+    :ivar versions: Versions of the translator's context providers when the arguments were resolved.
+    :type versions: tuple<int>
+    :ivar obj: The interface the function belongs to, or None for the scope the input was evaluated against.
+    :type obj: object|None
+    """
+
+    def __init__(self, cmd, translator, managed_args, versions, obj=None):
+        self.cmd = cmd
+        self.translator = translator
+        self.managed_args = managed_args
+        self.versions = versions
+        self.obj = obj
+
+    def copy_args(self):
+        """Returns a copy of the managed args, so the function can't modify the cached lists, dictionaries, sets and
+        arrays."""
+        return copy_args(self.managed_args)
+
+
+class ParseCache(object):
+
+    """Least-recently-used cache of resolved arguments, keyed on the scope and the stripped input line.
+
+    Only commands of translators that are ``is_cacheable()`` are stored: non-modifying functions (``code_alert == 0``)
+    whose rules are all declared pure and whose contexts are either static or a ``ContextProvider``. An entry is
+    discarded once the version of any of the translator's context providers changes.
+
+    The cache may be shared by the threads of an operator, lookups and changes are serialized by a lock.
+
+    :ivar maxsize: Maximum number of entries kept in the cache.
+    :type maxsize: int
+    :ivar hits: Number of lookups that found a valid entry.
+    :type hits: int
+    :ivar misses: Number of lookups that did not find a valid entry.
+    :type misses: int
+    :ivar invalidations: Number of entries discarded because a context provider changed.
+    :type invalidations: int
+    :ivar evictions: Number of entries discarded to keep the cache within ``maxsize``.
+    :type evictions: int
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def normalize(line):
+        """Returns the line without leading and trailing whitespace.
+
+        Whitespace within the line is kept, as it may be part of a quoted argument, ie. ``say "a  b"``.
+        """
+        return line.strip()
+
+    def get(self, scope, line):
+        """Returns the valid entry for the input line in the scope, or None if there isn't one.
+
+        :param scope: The interface the input is evaluated against.
+        :type scope: object
+        :param line: Human-language input.
+        :type line: str
+        :rtype: ParseCacheEntry|None
+        """
+        key = (scope, ParseCache.normalize(line))
+        with self.lock:
+            entry = self.entries.pop(key, None)
+
+            if entry is not None and entry.versions != entry.translator.get_context_versions():
+                self.invalidations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            # re-insert to mark it as most recently used
+            self.entries[key] = entry
+            self.hits += 1
+            return entry
+
+    def put(self, scope, line, cmd, translator, managed_args, obj=None):
+        """Store the resolved arguments of the input line in the scope.
+
+        :param scope: The interface the input was evaluated against.
+        :type scope: object
+        :param line: Human-language input.
+        :type line: str
+        :param cmd: Name of the interface function that handled the command.
+        :type cmd: str
+        :param translator: The translator of the function.
+        :type translator: Translator
+        :param managed_args: The resolved arguments the function was called with.
+        :type managed_args: dict
+        :param obj: The interface the function belongs to, if not the scope itself.
+        :type obj: object|None
+        """
+        if not translator.is_cacheable():
+            return
+
+        key = (scope, ParseCache.normalize(line))
+        entry = ParseCacheEntry(cmd, translator, managed_args, translator.get_context_versions(), obj)
+        entry.managed_args = entry.copy_args()
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = entry
+
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, scopes):
+        """Remove the entries of input evaluated against, or run by, any of the interfaces.
+
+        :param scopes: The interfaces whose entries are removed.
+        :type scopes: set<object>
+        """
+        with self.lock:
+            for key in [key for key, entry in self.entries.items() if key[0] in scopes or entry.obj in scopes]:
+                del self.entries[key]
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """Returns a dictionary of the cache counters."""
+        return {'size': len(self.entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'evictions': self.evictions}
@@ -16,4 +16,3 @@ from . import *
 # todo: bugfix: >> progress 30 101 2h30m
 #       results in index=101, progress=30, and minutes=120
 #       should be index 30, progress 101, and minutes 150
-# todo: add ability to parse docstring 'rules' to build rules
\ No newline at end of file
@@ -0,0 +1,291 @@
+"""
+hoomanlogic.metrics
+
+Counters and histograms describing how human-language input is handled, rendered in the Prometheus text format.
+"""
+
+import threading
+from timeit import default_timer as timer
+
+
+#=======================================================================================================================
+# Metric Types
+#=======================================================================================================================
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames, labels, extra=None):
+    pairs = ['{}="{}"'.format(name, _escape(value)) for name, value in zip(labelnames, labels)]
+    if extra is not None:
+        pairs.append('{}="{}"'.format(extra[0], _escape(extra[1])))
+    if len(pairs) == 0:
+        return ''
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter(object):
+
+    """A monotonically increasing count for each combination of label values.
+
+    :ivar name: Metric name.
+    :type name: str
+    :ivar description: Help text of the metric.
+    :type description: str
+    :ivar labelnames: Names of the labels, in the order label values are given.
+    :type labelnames: tuple<str>
+    """
+
+    type_name = 'counter'
+
+    def __init__(self, name, description, labelnames=()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        """Increment the count for the label values.
+
+        :param labels: Label values, in the order of ``labelnames``.
+        :type labels: tuple
+        :param amount: Amount to add to the count.
+        :type amount: int|float
+        """
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def get(self, labels=()):
+        """Returns the count for the label values."""
+        return self.values.get(labels, 0)
+
+    def render(self):
+        """Returns the samples of the metric in the Prometheus text format."""
+        lines = []
+        with self.lock:
+            items = sorted(self.values.items())
+        for labels, value in items:
+            lines.append('{}{} {}'.format(self.name, _format_labels(self.labelnames, labels), _format_value(value)))
+        return lines
+
+
+class Histogram(object):
+
+    """Observed values counted in cumulative buckets for each combination of label values.
+
+    :ivar name: Metric name.
+    :type name: str
+    :ivar description: Help text of the metric.
+    :type description: str
+    :ivar labelnames: Names of the labels, in the order label values are given.
+    :type labelnames: tuple<str>
+    :ivar buckets: Upper bounds of the buckets, in ascending order.
+    :type buckets: tuple<float>
+    """
+
+    type_name = 'histogram'
+
+    DEFAULT_BUCKETS = (.0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, name, description, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        """Count an observed value for the label values.
+
+        :param value: The observed value, such as a latency in seconds.
+        :type value: float
+        :param labels: Label values, in the order of ``labelnames``.
+        :type labels: tuple
+        """
+        with self.lock:
+            counts = self.values.get(labels)
+            if counts is None:
+                # one count per bucket, followed by the total count and sum
+                counts = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            counts[-2] += 1
+            counts[-1] += value
+
+    def get_count(self, labels=()):
+        """Returns the number of values observed for the label values."""
+        counts = self.values.get(labels)
+        return 0 if counts is None else counts[-2]
+
+    def render(self):
+        """Returns the samples of the metric in the Prometheus text format."""
+        lines = []
+        with self.lock:
+            items = sorted((labels, list(counts)) for labels, counts in self.values.items())
+        for labels, counts in items:
+            cumulative = 0
+            for i, bound in enumerate(self.buckets + (float('inf'),)):
+                if i < len(self.buckets):
+                    cumulative += counts[i]
+                else:
+                    cumulative = counts[-2]
+                lines.append('{}_bucket{} {}'.format(self.name,
+                                                     _format_labels(self.labelnames, labels,
+                                                                    ('le', _format_value(bound))),
+                                                     cumulative))
+            lines.append('{}_count{} {}'.format(self.name, _format_labels(self.labelnames, labels), counts[-2]))
+            lines.append('{}_sum{} {}'.format(self.name, _format_labels(self.labelnames, labels),
+                                              _format_value(counts[-1])))
+        return lines
+
+
+#=======================================================================================================================
+# Registry
+#=======================================================================================================================
+class Metrics(object):
+
+    """The metrics collected by an ``Operator`` and the translators it runs.
+
+    Collection is opt-in: pass an instance to ``Operator(metrics=Metrics())``.
+
+    :ivar rule_evaluations: Rule function calls, by translator, argument and rule.
+    :type rule_evaluations: Counter
+    :ivar rule_rejections: Rule function calls that did not recognize the input, by translator, argument and rule.
+    :type rule_rejections: Counter
+    :ivar rule_memo_hits: Rule evaluations answered from the dispatch's memo instead of calling the rule, by
+                          translator, argument and rule.
+    :type rule_memo_hits: Counter
+    :ivar rule_failures: Rule function calls that timed out, missed the deadline of the dispatch or raised, by
+                         translator, argument, rule and reason.
+    :type rule_failures: Counter
+    :ivar mediator_matches: Match attempts of an argument mediator, by translator, argument and result.
+    :type mediator_matches: Counter
+    :ivar command_lookups: Command word lookups, by scope and result.
+    :type command_lookups: Counter
+    :ivar parse_cache_lookups: Lookups of input in the parse cache, by scope and result.
+    :type parse_cache_lookups: Counter
+    :ivar prompts: Required arguments that were not supplied and had to be asked for, by translator and argument.
+    :type prompts: Counter
+    :ivar confirmations: Commands that had to be confirmed, by translator and result.
+    :type confirmations: Counter
+    :ivar stage_seconds: Latency of each stage of handling input, by translator and stage.
+    :type stage_seconds: Histogram
+    """
+
+    def __init__(self, prefix='hoomanlogic'):
+        self.metrics = []
+        self.rule_evaluations = self.add(Counter(prefix + '_rule_evaluations_total',
+                                                 'Rule function calls.',
+                                                 ('translator', 'argument', 'rule')))
+        self.rule_rejections = self.add(Counter(prefix + '_rule_rejections_total',
+                                                'Rule function calls that did not recognize the input.',
+                                                ('translator', 'argument', 'rule')))
+        self.rule_memo_hits = self.add(Counter(prefix + '_rule_memo_hits_total',
+                                               'Rule evaluations answered from the memo of the dispatch.',
+                                               ('translator', 'argument', 'rule')))
+        self.rule_failures = self.add(Counter(prefix + '_rule_failures_total',
+                                              'Rule function calls that timed out, missed the deadline or raised.',
+                                              ('translator', 'argument', 'rule', 'reason')))
+        self.mediator_matches = self.add(Counter(prefix + '_mediator_matches_total',
+                                                 'Match attempts of an argument mediator.',
+                                                 ('translator', 'argument', 'result')))
+        self.command_lookups = self.add(Counter(prefix + '_command_lookups_total',
+                                                'Command word lookups.',
+                                                ('scope', 'result')))
+        self.parse_cache_lookups = self.add(Counter(prefix + '_parse_cache_lookups_total',
+                                                    'Lookups of input in the parse cache.',
+                                                    ('scope', 'result')))
+        self.prompts = self.add(Counter(prefix + '_prompts_total',
+                                        'Required arguments that had to be asked for.',
+                                        ('translator', 'argument')))
+        self.confirmations = self.add(Counter(prefix + '_confirmations_total',
+                                              'Commands that had to be confirmed.',
+                                              ('translator', 'result')))
+        self.stage_seconds = self.add(Histogram(prefix + '_stage_seconds',
+                                                'Latency of each stage of handling input.',
+                                                ('translator', 'stage')))
+
+    def add(self, metric):
+        """Register a metric to be included in snapshots and return it."""
+        self.metrics.append(metric)
+        return metric
+
+    def time_stage(self, translator_name, stage, started):
+        """Observe the time since ``started`` for a stage and return the current time for the next stage.
+
+        :param translator_name: Name of the function being translated, or '' for stages outside a translator.
+        :type translator_name: str
+        :param stage: Name of the stage.
+        :type stage: str
+        :param started: Timer value at the start of the stage.
+        :type started: float
+        :rtype: float
+        """
+        now = timer()
+        self.stage_seconds.observe(now - started, (translator_name, stage))
+        return now
+
+    def snapshot(self):
+        """Returns all metrics rendered in the Prometheus text format."""
+        lines = []
+        for metric in self.metrics:
+            lines.append('# HELP {} {}'.format(metric.name, metric.description))
+            lines.append('# TYPE {} {}'.format(metric.name, metric.type_name))
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Write a snapshot to a file, such as one read by the node exporter's textfile collector.
+
+        The snapshot is written to a temporary file first and renamed, so readers never see a partial snapshot.
+        """
+        import os
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'w') as f:
+            f.write(self.snapshot())
+        os.rename(tmp_path, path)
+
+    def serve(self, port=9464, host='127.0.0.1'):
+        """Serve snapshots over HTTP from a daemon thread and return the server.
+
+        :param port: Port to listen on. Use 0 to pick a free port.
+        :type port: int
+        :param host: Address to listen on, local only by default.
+        :type host: str
+        :rtype: BaseHTTPServer.HTTPServer
+        """
+        try:
+            from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+        except ImportError:
+            from http.server import HTTPServer, BaseHTTPRequestHandler
+
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                body = metrics.snapshot().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = HTTPServer((host, port), MetricsHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return server
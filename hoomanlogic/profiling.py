@@ -0,0 +1,258 @@
+"""
+hoomanlogic.profiling
+
+Opt-in capture of a profile of the dispatches that run slow, or are sampled at random, so the commands that
+occasionally take seconds can be looked into after the fact instead of being averaged away.
+
+Pass a profiler to the operator::
+
+    operator = hoomanlogic.Operator(profiler=DispatchProfiler('/var/tmp/hooman-profiles', threshold=0.5))
+
+Each captured dispatch is written to a file of its own, named after the time, the duration, the scope, the command
+and the number of input tokens, ie. ``20240101T120000.123_1520ms_TaskInterface.add_7tok_1234_1.prof``. cProfile
+files are read with ``pstats.Stats(path)``, tracemalloc files with ``tracemalloc.Snapshot.load(path)``. A profile
+that can't be written is logged to the ``hoomanlogic.profiling`` logger, and the dispatch goes on as if it wasn't
+profiled.
+"""
+
+from __future__ import absolute_import, print_function
+
+import logging
+import os
+import random
+import re
+import threading
+import time
+from timeit import default_timer as timer
+
+_log = logging.getLogger(__name__)
+
+
+#=======================================================================================================================
+# Collectors
+#=======================================================================================================================
+class CProfileCollector(object):
+
+    """Collects the function calls of a dispatch with ``cProfile``."""
+
+    extension = '.prof'
+
+    def start(self):
+        import cProfile
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def stop(self, profile):
+        profile.disable()
+        return profile
+
+    def dump(self, profile, path):
+        profile.dump_stats(path)
+
+
+class TracemallocCollector(object):
+
+    """Collects the memory allocated by a dispatch with ``tracemalloc``, on Python 3.4 and later.
+
+    Tracing is process wide: it is started by the first dispatch being traced and stopped after the last, and is
+    left alone if something else started it.
+    """
+
+    extension = '.tracemalloc'
+
+    def __init__(self):
+        import tracemalloc
+        self.tracemalloc = tracemalloc
+        self.lock = threading.Lock()
+        self.active = 0
+        self.started_tracing = False
+
+    def start(self):
+        with self.lock:
+            if self.active == 0 and not self.tracemalloc.is_tracing():
+                self.tracemalloc.start()
+                self.started_tracing = True
+            self.active += 1
+
+    def stop(self, state):
+        with self.lock:
+            snapshot = self.tracemalloc.take_snapshot()
+            self.active -= 1
+            if self.active == 0 and self.started_tracing:
+                self.tracemalloc.stop()
+                self.started_tracing = False
+        return snapshot
+
+    def dump(self, snapshot, path):
+        snapshot.dump(path)
+
+
+#=======================================================================================================================
+# Profiler
+#=======================================================================================================================
+class DispatchProfiler(object):
+
+    """Profiles the dispatches of an ``Operator`` and keeps the profiles of the slow and sampled ones.
+
+    With a threshold, every dispatch is profiled, as whether it is slow is only known once it is done, and the
+    profile is thrown away unless the dispatch took at least ``threshold`` seconds. Without a threshold only the
+    sampled dispatches are profiled, which keeps the overhead of sampling at ``sample_rate``.
+
+    :ivar directory: Directory the profiles are written to, created on first write.
+    :type directory: str
+    :ivar threshold: Seconds a dispatch must take for its profile to be kept, or None to only keep sampled ones.
+    :type threshold: float|None
+    :ivar sample_rate: Fraction of the dispatches whose profile is kept regardless of how long they take.
+    :type sample_rate: float
+    :ivar mode: ``CPROFILE`` for the function calls, or ``TRACEMALLOC`` for the memory allocated.
+    :type mode: str
+    :ivar max_files: Max number of profiles kept in the directory, the oldest are deleted first.
+    :type max_files: int
+    :ivar max_bytes: Max total size of the profiles kept in the directory, the oldest are deleted first.
+    :type max_bytes: int
+    :ivar captured: Number of profiles written.
+    :type captured: int
+    """
+
+    CPROFILE = 'cprofile'
+    TRACEMALLOC = 'tracemalloc'
+
+    def __init__(self, directory, threshold=1.0, sample_rate=0.0, mode=CPROFILE, max_files=100,
+                 max_bytes=50 * 1024 * 1024, seed=None):
+        self.directory = directory
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.mode = mode
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.captured = 0
+        self.random = random.Random(seed)
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+        if mode == DispatchProfiler.CPROFILE:
+            self.collector = CProfileCollector()
+        elif mode == DispatchProfiler.TRACEMALLOC:
+            self.collector = TracemallocCollector()
+        else:
+            raise ValueError("Unknown profiling mode '{}'.".format(mode))
+
+    def is_profiling(self):
+        """Returns whether a dispatch of the current thread is already being handled by the profiler."""
+        return getattr(self.local, 'active', False)
+
+    def profile(self, operator, says):
+        """Run ``operator.listen_and_respond(says)``, profiling it if it's sampled or may be slow.
+
+        :param operator: The operator handling the input.
+        :type operator: Operator
+        :param says: The human-language input.
+        :type says: str
+        :return: Returns the return value of ``listen_and_respond``.
+        """
+        sampled = self.sample_rate > 0 and self.random.random() < self.sample_rate
+        self.local.active = True
+        try:
+            if self.threshold is None and not sampled:
+                return operator.listen_and_respond(says)
+
+            scope = operator.current_scope
+            state = self.collector.start()
+            started = timer()
+            try:
+                return operator.listen_and_respond(says)
+            finally:
+                seconds = timer() - started
+                data = self.collector.stop(state)
+                if sampled or seconds >= self.threshold:
+                    try:
+                        self.write(data, operator, scope, says, seconds)
+                    except EnvironmentError:
+                        # the error of the dispatch, if any, is the one to raise
+                        _log.exception("Failed to write the profile of '%s' to %s", says, self.directory)
+        finally:
+            self.local.active = False
+
+    def write(self, data, operator, scope, says, seconds):
+        """Write the profile of a dispatch to the directory and apply the retention limits.
+
+        :return: Returns the path of the profile.
+        :rtype: str
+        """
+        command = get_command_tag(operator, scope, says)
+        with self.lock:
+            self.captured += 1
+            count = self.captured
+        now = time.time()
+        name = '{}.{:03d}_{}ms_{}.{}_{}tok_{}_{}{}'.format(time.strftime('%Y%m%dT%H%M%S', time.localtime(now)),
+                                                          int(now * 1000) % 1000, int(seconds * 1000),
+                                                          _clean_tag(scope.__class__.__name__), _clean_tag(command),
+                                                          len(says.split()), os.getpid(), count,
+                                                          self.collector.extension)
+
+        if not os.path.isdir(self.directory):
+            try:
+                os.makedirs(self.directory)
+            except OSError:
+                # created by another thread or process in the meantime
+                if not os.path.isdir(self.directory):
+                    raise
+        path = os.path.join(self.directory, name)
+        self.collector.dump(data, path)
+        self.enforce_retention()
+        return path
+
+    def get_profiles(self):
+        """Returns a list of tuples (modified time, size, path) of the profiles in the directory, oldest first."""
+        profiles = []
+        if not os.path.isdir(self.directory):
+            return profiles
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.collector.extension):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            profiles.append((stat.st_mtime, stat.st_size, path))
+        profiles.sort()
+        return profiles
+
+    def enforce_retention(self):
+        """Delete the oldest profiles until the directory is within ``max_files`` and ``max_bytes``."""
+        with self.lock:
+            profiles = self.get_profiles()
+            count = len(profiles)
+            total = sum(size for mtime, size, path in profiles)
+            for mtime, size, path in profiles:
+                if count <= self.max_files and total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                count -= 1
+                total -= size
+
+
+#=======================================================================================================================
+# Helper Methods
+#=======================================================================================================================
+_tag_pattern = re.compile(r'[^\w-]+')
+
+
+def _clean_tag(text):
+    return _tag_pattern.sub('-', text)[:40] or 'none'
+
+
+def get_command_tag(operator, scope, says):
+    """Returns the command key the input resolves to in the scope, or its first word if it isn't a command."""
+    cmd, arg, line = operator.parseline(says)
+    if cmd is None or cmd == '':
+        return 'none'
+    if cmd == 'help':
+        return cmd
+    owner, key, argprefix = operator.find_command(scope, cmd)
+    return key if key is not None else cmd
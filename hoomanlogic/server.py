@@ -0,0 +1,362 @@
+"""
+hoomanlogic.server
+
+Dispatch of human-language input to a pool of worker processes over a local socket, so an operator isn't limited to
+a single core. Each worker registers the interfaces once and serves the sessions assigned to it.
+
+Requests and responses are JSON objects, one per line::
+
+    {"session": "alice", "says": "add buy milk"}
+    {"session": "alice", "answers": {"minutes": "30"}, "confirm": true}
+    {"session": "alice", "cancel": true}
+
+A load test against a local server is run from the root of the repository with ``python -m benchmarks.server``.
+"""
+
+from __future__ import absolute_import, print_function
+
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import zlib
+from collections import OrderedDict
+
+try:
+    import SocketServer as socketserver
+except ImportError:
+    import socketserver
+
+try:
+    text_type = unicode
+except NameError:
+    text_type = str
+
+
+#=======================================================================================================================
+# Workers
+#=======================================================================================================================
+class Session(object):
+
+    """State of a user's conversation, kept by the worker the session is assigned to.
+
+    :ivar scope: The current scope of the session.
+    :type scope: object
+    :ivar resolution: The pending resolution of the last command, if any.
+    :type resolution: Resolution|None
+    """
+
+    __slots__ = ('scope', 'resolution')
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.resolution = None
+
+
+def describe_resolution(resolution):
+    """Returns a dictionary describing a resolution that can be serialized to JSON."""
+    response = {'handled': True,
+                'status': resolution.status,
+                'missing': list(resolution.missing),
+                'questions': resolution.questions(),
+                'unrecognized': list(resolution.unrecognized),
+                'needs_confirmation': resolution.needs_confirmation and not resolution.confirmed}
+    try:
+        json.dumps(resolution.result)
+        response['result'] = resolution.result
+    except (TypeError, ValueError):
+        response['result'] = repr(resolution.result)
+    return response
+
+
+def handle_request(operator, sessions, request, messages, max_sessions=10000):
+    """Handle a request of a session with the worker's operator and return the response.
+
+    :param operator: The headless operator of the worker.
+    :type operator: Operator
+    :param sessions: The sessions of the worker, by session id, least recently used first.
+    :type sessions: OrderedDict
+    :param request: The decoded request.
+    :type request: dict
+    :param messages: The list the operator's messages are collected in.
+    :type messages: list<str>
+    :param max_sessions: Max number of sessions kept by the worker.
+    :type max_sessions: int
+    :rtype: dict
+    """
+    from hoomanlogic import Resolution
+
+    key = request.get('session')
+    session = sessions.pop(key, None)
+    if session is None:
+        session = Session(operator.root_scope)
+    sessions[key] = session
+    while len(sessions) > max_sessions:
+        sessions.popitem(last=False)
+
+    operator.current_scope = session.scope
+    if 'says' in request:
+        session.resolution = None
+        result = operator.listen_and_respond(request['says'])
+    elif session.resolution is None:
+        return {'error': 'There is no pending command to continue.'}
+    elif request.get('cancel'):
+        session.resolution.cancel()
+        result = session.resolution
+    else:
+        result = session.resolution.resume(request.get('answers'), request.get('confirm'))
+    session.scope = operator.current_scope
+
+    if isinstance(result, Resolution):
+        session.resolution = result if result.is_pending() else None
+        response = describe_resolution(result)
+    else:
+        response = {'handled': bool(result)}
+    response['messages'] = list(messages)
+    return response
+
+
+def run_worker(setup, conn, max_sessions=10000):
+    """Register the interfaces with a headless operator and handle requests received on the pipe until it closes.
+
+    :param setup: Function that registers the interfaces with the operator it is given.
+    :type setup: func
+    :param conn: The worker's end of the pipe.
+    :type conn: multiprocessing.Connection
+    :param max_sessions: Max number of sessions kept by the worker.
+    :type max_sessions: int
+    """
+    import signal
+    from hoomanlogic import Operator
+
+    # the server process handles interrupts and closes the pipes
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    messages = []
+    operator = Operator(message_user_func=lambda message, *args, **kwargs: messages.append(message), headless=True)
+    setup(operator)
+    sessions = OrderedDict()
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+
+        del messages[:]
+        try:
+            response = handle_request(operator, sessions, request, messages, max_sessions)
+        except Exception as e:
+            # a failing command must not take the worker and its sessions down with it
+            response = {'error': '{}: {}'.format(e.__class__.__name__, e)}
+        conn.send(response)
+
+
+class Worker(object):
+
+    """A worker process and the server's end of its pipe.
+
+    :ivar process: The worker process.
+    :type process: multiprocessing.Process
+    :ivar conn: The server's end of the pipe.
+    :type conn: multiprocessing.Connection
+    :ivar lock: Serializes the requests of the server's threads on the pipe.
+    :type lock: threading.Lock
+    """
+
+    def __init__(self, setup, max_sessions=10000):
+        self.conn, worker_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=run_worker, args=(setup, worker_conn, max_sessions))
+        self.process.daemon = True
+        self.process.start()
+        worker_conn.close()
+        self.lock = threading.Lock()
+
+    def request(self, request):
+        """Send a request to the worker and return its response."""
+        with self.lock:
+            self.conn.send(request)
+            return self.conn.recv()
+
+    def stop(self):
+        """Ask the worker to finish and wait for it."""
+        with self.lock:
+            try:
+                self.conn.send(None)
+            except (IOError, OSError):
+                pass
+            self.conn.close()
+        self.process.join()
+
+
+#=======================================================================================================================
+# Server
+#=======================================================================================================================
+class DispatchServer(object):
+
+    """Accepts JSON-line requests on a local socket and dispatches them to preforked worker processes.
+
+    Every request of a session goes to the same worker, picked by a hash of the session id, so the session's current
+    scope and pending command stay with the worker that holds them. Requests of different sessions are handled by
+    the workers in parallel.
+
+    :ivar address: Path of a Unix domain socket, or a (host, port) tuple for TCP. Use port 0 to pick a free port.
+    :type address: str|tuple
+    :ivar workers: The worker processes.
+    :type workers: list<Worker>
+    """
+
+    def __init__(self, setup, address, workers=None, max_sessions=10000):
+        """
+        :param setup: Function that registers the interfaces with the operator it is given, run once in each worker.
+        :type setup: func
+        :param address: Path of a Unix domain socket, or a (host, port) tuple for TCP.
+        :type address: str|tuple
+        :param workers: Number of worker processes, the number of CPUs by default.
+        :type workers: int|None
+        :param max_sessions: Max number of sessions kept by each worker.
+        :type max_sessions: int
+        """
+        self.setup = setup
+        self.address = address
+        self.worker_count = workers if workers is not None else multiprocessing.cpu_count()
+        self.max_sessions = max_sessions
+        self.workers = []
+        self.server = None
+        self.thread = None
+
+    def get_worker(self, session):
+        """Returns the worker of a session.
+
+        :param session: The session id as decoded from the request, usually text but any JSON value is accepted.
+        :type session: unicode|str|object
+        :rtype: Worker
+        """
+        if isinstance(session, bytes):
+            key = session
+        elif isinstance(session, text_type):
+            key = session.encode('utf-8')
+        else:
+            key = json.dumps(session, sort_keys=True).encode('utf-8')
+        return self.workers[(zlib.crc32(key) & 0xffffffff) % len(self.workers)]
+
+    def dispatch(self, request):
+        """Send a decoded request to the worker of its session and return the response, or an error response.
+
+        :param request: The decoded request.
+        :type request: dict
+        :rtype: dict
+        """
+        if not isinstance(request, dict):
+            return {'error': 'The request is not a JSON object.'}
+        try:
+            worker = self.get_worker(request.get('session'))
+        except (TypeError, ValueError):
+            return {'error': 'The session id is not valid.'}
+        try:
+            return worker.request(request)
+        except (IOError, OSError, EOFError):
+            return {'error': 'The worker of the session is not available.'}
+
+    def start(self):
+        """Start the workers and serve requests from a daemon thread. Returns the address being listened on."""
+        self.workers = [Worker(self.setup, self.max_sessions) for i in range(self.worker_count)]
+
+        dispatch_server = self
+
+        class RequestHandler(socketserver.StreamRequestHandler):
+
+            def handle(self):
+                for line in iter(self.rfile.readline, b''):
+                    if line.strip() == b'':
+                        continue
+                    try:
+                        request = json.loads(line.decode('utf-8'))
+                    except ValueError:
+                        response = {'error': 'The request is not valid JSON.'}
+                    else:
+                        response = dispatch_server.dispatch(request)
+                    self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+                    self.wfile.flush()
+
+        if isinstance(self.address, tuple):
+            class Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+                daemon_threads = True
+                allow_reuse_address = True
+        else:
+            if os.path.exists(self.address):
+                os.remove(self.address)
+
+            class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+                daemon_threads = True
+
+        self.server = Server(self.address, RequestHandler)
+        self.address = self.server.server_address
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self.address
+
+    def stop(self):
+        """Stop serving requests and stop the workers."""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            if not isinstance(self.address, tuple) and os.path.exists(self.address):
+                os.remove(self.address)
+            self.server = None
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+
+
+#=======================================================================================================================
+# Client
+#=======================================================================================================================
+class Client(object):
+
+    """Sends the input of a session to a ``DispatchServer`` and returns the responses.
+
+    :ivar session: The session id, a new unique id unless given.
+    :type session: str
+    """
+
+    def __init__(self, address, session=None):
+        if session is None:
+            import uuid
+            session = uuid.uuid4().hex
+        self.session = session
+        if isinstance(address, tuple):
+            self.socket = socket.create_connection(address)
+        else:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.connect(address)
+        self.reader = self.socket.makefile('rb')
+
+    def request(self, request):
+        """Send a request of the session and return the decoded response."""
+        request = dict(request, session=self.session)
+        self.socket.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        line = self.reader.readline()
+        if line == b'':
+            raise IOError('The server closed the connection.')
+        return json.loads(line.decode('utf-8'))
+
+    def says(self, line):
+        """Send human-language input and return the response."""
+        return self.request({'says': line})
+
+    def resume(self, answers=None, confirm=None):
+        """Continue the pending command with the missing input and/or confirmation and return the response."""
+        return self.request({'answers': answers, 'confirm': confirm})
+
+    def cancel(self):
+        """Abandon the pending command."""
+        return self.request({'cancel': True})
+
+    def close(self):
+        self.reader.close()
+        self.socket.close()
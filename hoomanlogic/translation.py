@@ -1,8 +1,153 @@
+import re
+from array import array
+from datetime import date, datetime, time
+
+
+#=======================================================================================================================
+# Rule Traits and Context Providers
+#=======================================================================================================================
+def rule_traits(**traits):
+    """Decorator for declaring traits of a rule function, such as whether it is pure.
+
+    A trait is either a value, or a function accepting the rule's context and returning the value for that context.
+
+    Known traits:
+
+        - ``pure``: The output depends only on the input and the context, so it can be cached.
+        - ``check``: The rule only validates the input and returns it unchanged, so consecutive checks can be
+          evaluated in any order.
+        - ``memoize``: Defaults to True. Set to False for rules that must run every time they are evaluated, rather
+          than once per distinct input of a dispatch.
+        - ``timeout``: Seconds the rule may run before it counts as not recognizing the input. Rules with a timeout
+          may block, such as on a remote lookup, and are run on a bounded pool of threads so a hung call cannot
+          stall the dispatch.
+        - ``prefetch``: The rule calls a callable context without arguments to look up its value, and accepts the
+          value in its place, so the lookup can be made at the start of a dispatch, concurrently with the lookups of
+          the other rules. See ``Resolution.prefetch_contexts``.
+        - ``recognize``: A cheap function accepting the input and the context, like the rule, and returning whether
+          the rule would recognize the input. While input is matched, the last rule of an argument only calls its
+          recognizer, and the rule itself runs once the input is assigned to the argument, so expensive
+          conversions aren't made for the arguments that don't get the input. A recognizer may accept input the rule
+          then rejects, such input is left for the other arguments. Unlike other traits, it isn't called with the
+          context to get its value.
+        - ``numeric``: The output is a number, so rules comparing numbers, such as ``in_range`` in a docstring, can
+          follow the rule without casting the input first.
+
+    Ie.::
+
+        @rule_traits(pure=True, check=True)
+        def validate_is_even(int_value, context=None):
+            return int_value % 2 == 0, int_value
+
+    :param traits: Trait names and their values.
+    :type traits: dict
+    """
+    def decorator(fn):
+        for key, value in traits.items():
+            setattr(fn, key, value)
+        return fn
+    return decorator
+
+
+def get_rule_trait(rule, name, context=None, default=None):
+    """Returns the value of a rule function's trait for the given context.
+
+    :param rule: A rule function.
+    :type rule: func
+    :param name: Name of the trait.
+    :type name: str
+    :param context: The context object passed to the rule function.
+    :type context: object
+    :param default: Value returned if the rule does not declare the trait.
+    :type default: object
+    """
+    value = getattr(rule, name, default)
+    if callable(value):
+        return value(context)
+    return value
+
+
+class ContextProvider(object):
+
+    """A versioned, callable context for rule functions.
+
+    Rule functions accept a function returning the context, such as a list of project names that is looked up when
+    the rule is evaluated. Wrapping the function in a ``ContextProvider`` gives it a version number, so results
+    depending on the context can be cached until the provider is invalidated.
+
+    :ivar fn: Function returning the context.
+    :type fn: func
+    :ivar version: Incremented every time the context changes.
+    :type version: int
+    :ivar timeout: Seconds a lookup may take before the rules reading the context give up, or None to wait.
+    :type timeout: float|None
+    """
+
+    def __init__(self, fn, timeout=None):
+        self.fn = fn
+        self.version = 0
+        self.timeout = timeout
+
+    def __call__(self):
+        return self.fn()
+
+    def invalidate(self):
+        """Flag the context as changed."""
+        self.version += 1
+
+
+class ObjectAttribute(object):
+
+    """A rule context naming an attribute of the interface object, such as a list of project names.
+
+    The attribute is looked up once per dispatch, on the object the command is run against, see
+    ``Resolution.get_context``. A method is passed to the rule as is, and called by rules accepting a function.
+
+    :ivar name: Name of the attribute.
+    :type name: str
+    """
+
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def resolve(self, obj):
+        """Returns the attribute of the object, or None if it doesn't have one."""
+        return getattr(obj, self.name, None)
+
+    def __repr__(self):
+        return 'ObjectAttribute({!r})'.format(self.name)
+
+
+def is_static_context(context):
+    """Returns whether a rule context is fixed, as opposed to being looked up when the rule is evaluated."""
+    if isinstance(context, ObjectAttribute):
+        return False
+    return not callable(context) or isinstance(context, type)
+
+
+def _context_timeout(context):
+    return getattr(context, 'timeout', None) if isinstance(context, ContextProvider) else None
+
+
+def _casts_are_pure(context):
+    for type in context or []:
+        cast = resolve_type_cast(type)
+        if cast is not None and not cast.pure:
+            return False
+    return True
+
+
+def _casts_are_numeric(context):
+    casts = [resolve_type_cast(type) for type in context or []]
+    return len(casts) > 0 and all(cast is not None and cast.name in ('int', 'float') for cast in casts)
 
 
 #=======================================================================================================================
 # Translation and Validation Methods
 #=======================================================================================================================
+@rule_traits(pure=True, numeric=True)
 def translate_duration_to_minutes(text, context=None):
     """Recognizes multiple human-input formats for durations of time and converts it to minutes,
     returning minutes as int
@@ -59,6 +204,11 @@ def translate_duration_to_minutes(text, context=None):
     return True, minutes
 
 
+def _recognize_datetime(text, context=None):
+    return could_be_datetime(text)
+
+
+@rule_traits(recognize=_recognize_datetime)
 def translate_datetime(text, context=None):
     output = str_to_datetime(text)
     if output is not None:
@@ -67,6 +217,7 @@ def translate_datetime(text, context=None):
         return False, None
 
 
+@rule_traits(recognize=_recognize_datetime)
 def translate_date(text, context=None):
     output = str_to_date(text)
     if output is not None:
@@ -75,26 +226,108 @@ def translate_date(text, context=None):
         return False, None
 
 
+@rule_traits(pure=_casts_are_pure)
 def translate_list_to_first_type(text, context):
+    """Translates comma-separated input to a list, casting each item to the first type in the context it can be cast
+    to. For long lists of numbers, see ``translate_numeric_list``.
+
+    :param text: A human-input string.
+    :type text: str
+    :param context: Types, type names or resolved type casts to try in order.
+    :type context: list<type|str|TypeCast>
+    """
 
-    list = text.split(',')
+    casts = [cast for cast in (resolve_type_cast(type) for type in context) if cast is not None]
     output = []
 
-    for item in list:
-        wascast = False
-        for type in context:
-            cast = string_to_type(text, type, on_fail_return=None)
-            if cast is not None:
-                wascast = True
-                output.append(cast)
+    for item in text.split(','):
+        for cast in casts:
+            value = cast(item)
+            if value is not None:
+                output.append(value)
                 break
-
-        if wascast is False:
+        else:
             return False, None
 
     return True, output
 
 
+_numeric_list_chars_pattern = re.compile(r'[\d\s,.eE+-]*\Z')
+_numeric_range_pattern = re.compile(r'\s*(\d+)\s*-\s*(\d+)\s*\Z')
+_fraction_pattern = re.compile(r'[.eE]')
+
+
+def _count_numeric_list(text):
+    """Returns a tuple (items, ranges by item index, number of values) of a numeric list, or None if it isn't one."""
+    if _numeric_list_chars_pattern.match(text) is None:
+        return None
+
+    parts = text.split(',')
+
+    # ranges are whole numbers joined by a dash, a dash after a comma is the sign of a number
+    ranges = {}
+    count = len(parts)
+    if '-' in text:
+        for i, part in enumerate(parts):
+            match = _numeric_range_pattern.match(part)
+            if match is not None:
+                low, high = int(match.group(1)), int(match.group(2))
+                if low > high:
+                    return None
+                ranges[i] = (low, high)
+                count += high - low
+    return parts, ranges, count
+
+
+def _recognize_numeric_list(text, context=None):
+    counted = _count_numeric_list(text)
+    return counted is not None and (context is None or counted[2] <= context)
+
+
+@rule_traits(pure=True, recognize=_recognize_numeric_list)
+def translate_numeric_list(text, context=None):
+    """Translates a comma-separated list of numbers and ranges of whole numbers, such as '1-500,600,700', to an array.
+
+    Input that can't be a list of numbers is rejected by a single compiled scan, and lists without ranges are
+    converted in bulk by ``int`` or ``float`` mapped over the items, rather than casting each item in Python. Ranges
+    are counted before they are expanded, so a size limit rejects input such as '1-1000000000' without building it.
+
+    :param text: A human-input string.
+    :type text: str
+    :param context: Max number of values in the list, or None for no limit.
+    :type context: int|None
+    :return: Returns an ``array('l')`` of whole numbers, or an ``array('d')`` if any of the numbers has a fraction.
+    :rtype: tuple
+    """
+
+    counted = _count_numeric_list(text)
+    if counted is None:
+        return False, None
+    parts, ranges, count = counted
+    if context is not None and count > context:
+        return False, None
+
+    typecode = 'd' if _fraction_pattern.search(text) is not None else 'l'
+    convert = float if typecode == 'd' else int
+
+    try:
+        if len(ranges) == 0:
+            return True, array(typecode, map(convert, parts))
+
+        output = array(typecode)
+        for i, part in enumerate(parts):
+            if i in ranges:
+                output.extend(xrange(ranges[i][0], ranges[i][1] + 1))
+            else:
+                output.append(convert(part))
+    except (ValueError, OverflowError):
+        # an item isn't a number, such as an empty item or '1.2.3'
+        return False, None
+
+    return True, output
+
+
+@rule_traits(pure=True, timeout=_context_timeout, prefetch=True)
 def translate_to_dict_key(text, context=None):
     """Recognizes multiple human-input formats for durations of time and converts it to minutes,
     returning minutes as int
@@ -105,13 +338,7 @@ def translate_to_dict_key(text, context=None):
     :type context: dict<list<str>>, or func returning dict<list<str>>
     """
 
-    if isinstance(context, dict):
-        dict_ = context
-    else:
-        try:
-            dict_ = context()
-        except:
-            return False, None
+    dict_ = context() if callable(context) else context
 
     if dict_ is None or isinstance(dict_, dict) is False or len(dict_) == 0:
         return False, None
@@ -132,24 +359,38 @@ def translate_to_dict_key(text, context=None):
         return True, output
 
 
+def _recognize_first_type(text, context=[str]):
+    for type in context:
+        cast = resolve_type_cast(type)
+        if cast is not None and cast.recognize(text):
+            return True
+    return False
+
+
+@rule_traits(pure=_casts_are_pure, recognize=_recognize_first_type, numeric=_casts_are_numeric)
 def translate_to_first_type(text, context=[str]):
+    """Translates the input to the first type in the context that it can be cast to.
+
+    :param text: A human-input string.
+    :type text: str
+    :param context: Types, type names or resolved type casts to try in order.
+    :type context: list<type|str|TypeCast>
+    """
 
     for type in context:
-        cast = string_to_type(text, type, on_fail_return=None)
-        if cast is not None:
-            return True, cast
+        cast = resolve_type_cast(type)
+        if cast is None:
+            continue
+        output = cast(text)
+        if output is not None:
+            return True, output
 
     return False, None
 
 
+@rule_traits(pure=True, check=True, timeout=_context_timeout, prefetch=True)
 def validate_is_in_list(text, context=None):
-    if isinstance(context, list):
-        list_ = context
-    else:
-        try:
-            list_ = context()
-        except:
-            return False, None
+    list_ = context() if callable(context) else context
 
     if list_ is None or isinstance(list_, list) is False or len(list_) == 0:
         return False, None
@@ -161,14 +402,9 @@ def validate_is_in_list(text, context=None):
         return False, None
 
 
+@rule_traits(pure=True, check=True, timeout=_context_timeout, prefetch=True)
 def validate_lcase_is_in_list(text, context=None):
-    if isinstance(context, list):
-        list_ = context
-    else:
-        try:
-            list_ = context()
-        except:
-            return False, None
+    list_ = context() if callable(context) else context
 
     lcase_input = text.lower()
 
@@ -184,6 +420,7 @@ def validate_lcase_is_in_list(text, context=None):
         return False, None
 
 
+@rule_traits(pure=True, check=True)
 def validate_int_is_in_range(int_value, context=None):
     min, max = context
 
@@ -197,48 +434,46 @@ def validate_int_is_in_range(int_value, context=None):
 # Helper Methods used by Translation and Validation Methods
 #=======================================================================================================================
 def string_to_type(string, type, on_fail_return=None, special_cast=None):
-    try:
-        if isinstance(type, str):
-            func = type_cast_dict[type]
-        else:
-            func = type_cast_dict[type.__name__]
-        return func(string, on_fail_return)
-    except:
+    cast = resolve_type_cast(type)
+    if cast is None:
         return on_fail_return
+    return cast(string, on_fail_return)
+
+
+# ASCII digits only, int() and float() reject other digits such as u'\xb2'
+_int_pattern = re.compile(r'\s*[-+]?[0-9]+\s*$')
+_float_pattern = re.compile(r'\s*[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?\s*$'
+                            r'|\s*[-+]?(inf|infinity|nan)\s*$', re.I)
+
+
+def is_int(string):
+    """Returns whether ``int()`` accepts the string, without calling it and catching the exception."""
+    if not isinstance(string, basestring):
+        return False
+    return _int_pattern.match(string) is not None
+
+
+def is_float(string):
+    """Returns whether ``float()`` accepts the string, without calling it and catching the exception."""
+    return isinstance(string, basestring) and _float_pattern.match(string) is not None
 
 
 def str_to_int(string, on_fail_return=None):
-    # match the type
-    try:
+    # match the type without raising, as most input isn't an int
+    if is_int(string):
         return int(string)
-    except:
-        return on_fail_return
+    return on_fail_return
 
 
 def str_to_float(string, on_fail_return=None):
-    # match the type
-    try:
+    # match the type without raising, as most input isn't a float
+    if is_float(string):
         return float(string)
-    except:
-        return on_fail_return
+    return on_fail_return
 
 
 def str_to_datetime(string, on_fail_return=None):
-    try:
-        from dateutil import parser as p
-        output = p.parse(string)
-        return output
-    except:
-        from parsedatetime import Calendar
-        from datetime import datetime
-        c = Calendar()
-        output, flags = c.parse(string)
-        if flags > 0:
-            return datetime(*output[:6])
-        else:
-            return None
-
-    return None
+    return parse_datetime(string)
 
 
 def str_to_date(string, on_fail_return=None):
@@ -248,9 +483,418 @@ def str_to_date(string, on_fail_return=None):
     else:
         return None
 
-type_cast_dict = {
-    'int': str_to_int,
-    'float': str_to_float,
-    'datetime': str_to_datetime,
-    'date': str_to_date
-}
\ No newline at end of file
+
+#=======================================================================================================================
+# Date Parsing
+#=======================================================================================================================
+_iso_datetime_pattern = re.compile(r'(\d{4})-(\d{2})-(\d{2})(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.(\d{1,6}))?)?)?\Z')
+_time_pattern = re.compile(r'(\d{1,2}):(\d{2})(?::(\d{2}))?\s*([AaPp][Mm])?\Z')
+# whole words only, so 'market', 'lemon' or 'snow' aren't taken for 'mar', 'mon' or 'now'
+_date_words_pattern = re.compile(r'\b(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|'
+                                 r'sept?(?:ember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?|mon(?:day)?|'
+                                 r'tues?(?:day)?|wed(?:nesday)?|thu(?:rs?)?(?:day)?|fri(?:day)?|sat(?:urday)?|'
+                                 r'sun(?:day)?|today|tomorrow|tonight|yesterday|now|noon|midnight|morning|afternoon|'
+                                 r'evening|night|next|last|ago|days?|weeks?|months?|years?|hours?|minutes?|eod|eow)\b',
+                                 re.UNICODE)
+_date_format_directives = {
+    'Y': r'\d{4}', 'y': r'\d{2}', 'm': r'\d{1,2}', 'd': r'\d{1,2}', 'H': r'\d{1,2}', 'I': r'\d{1,2}',
+    'M': r'\d{2}', 'S': r'\d{2}', 'f': r'\d{1,6}', 'b': r'[A-Za-z]{3}', 'a': r'[A-Za-z]{3}', 'B': r'[A-Za-z]+',
+    'A': r'[A-Za-z]+', 'p': r'[AaPp][Mm]', '%': '%',
+}
+
+
+def _compile_date_format(format):
+    parts = []
+    i = 0
+    while i < len(format):
+        if format[i] == '%' and i + 1 < len(format):
+            parts.append(_date_format_directives.get(format[i + 1], '.+?'))
+            i += 2
+        else:
+            parts.append(r'\s+' if format[i] == ' ' else re.escape(format[i]))
+            i += 1
+    return re.compile(''.join(parts) + r'\Z')
+
+
+def register_date_format(format):
+    """Add a ``strptime`` format to the fast path of ``parse_datetime``, ahead of the general date parsers.
+
+    The format is compiled to a pattern, so ``strptime`` is only called on input of the right shape.
+
+    Ie.::
+
+        register_date_format('%m/%d/%Y')
+
+    :param format: A ``datetime.strptime`` format.
+    :type format: str
+    """
+    date_formats.append((format, _compile_date_format(format)))
+
+
+date_formats = []
+_general_parsers = None
+
+# month first, as dateutil reads them
+for _format in ('%m/%d/%Y', '%m/%d/%y', '%Y/%m/%d', '%d %b %Y', '%b %d %Y', '%b %d, %Y'):
+    register_date_format(_format)
+
+
+def _get_general_parsers():
+    """Returns the list of general date parsers that are installed, looked up once."""
+    global _general_parsers
+    if _general_parsers is None:
+        parsers = []
+        try:
+            from dateutil import parser
+            parsers.append(_parse_with_dateutil)
+        except ImportError:
+            pass
+        try:
+            import parsedatetime
+            parsers.append(_parse_with_parsedatetime)
+        except ImportError:
+            pass
+        _general_parsers = parsers
+    return _general_parsers
+
+
+def _parse_with_dateutil(string):
+    from dateutil import parser
+    try:
+        return parser.parse(string)
+    except (ValueError, OverflowError):
+        return None
+
+
+def _parse_with_parsedatetime(string):
+    from parsedatetime import Calendar
+    output, flags = Calendar().parse(string)
+    if flags > 0:
+        return datetime(*output[:6])
+    return None
+
+
+def parse_fast_datetime(string):
+    """Returns the datetime of ISO-8601 input, a time of today, or input in one of the registered date formats.
+
+    :param string: A human-input string.
+    :type string: str
+    :return: Returns the datetime, or None if the input isn't in one of the fast-path formats.
+    :rtype: datetime|None
+    """
+
+    match = _iso_datetime_pattern.match(string)
+    if match is not None:
+        year, month, day, hour, minute, second, fraction = match.groups()
+        try:
+            return datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0),
+                            int((fraction or '0').ljust(6, '0')))
+        except ValueError:
+            # out of range, such as 2024-02-30
+            return None
+
+    match = _time_pattern.match(string)
+    if match is not None:
+        hour, minute, second, meridiem = match.groups()
+        hour = int(hour)
+        if meridiem is not None:
+            if hour < 1 or hour > 12:
+                return None
+            hour = hour % 12 + (12 if meridiem.lower() == 'pm' else 0)
+        try:
+            return datetime.combine(date.today(), time(hour, int(minute), int(second or 0)))
+        except ValueError:
+            return None
+
+    for format, pattern in date_formats:
+        if pattern.match(string) is not None:
+            try:
+                return datetime.strptime(string, format)
+            except ValueError:
+                continue
+    return None
+
+
+def could_be_datetime(string):
+    """Returns whether input may be a date or time, ie. it has a digit or a whole date word such as 'tomorrow'.
+
+    Input rejected here, like most words, never reaches the general date parsers.
+    """
+    for char in string:
+        if char.isdigit():
+            return True
+    return _date_words_pattern.search(string.lower()) is not None
+
+
+def parse_datetime(string):
+    """Parse a date and/or time from human input, trying the cheapest parser that can recognize it first.
+
+    ISO-8601 dates and times, times like '17:30' or '5:30pm', and the registered date formats are parsed by compiled
+    patterns. Input that can't be a date, see ``could_be_datetime``, is rejected, and the rest is parsed by dateutil
+    and then parsedatetime, whichever are installed.
+
+    :param string: A human-input string.
+    :type string: str
+    :return: Returns the datetime, or None if the input isn't recognized as a date or time.
+    :rtype: datetime|None
+    """
+    string = string.strip()
+    output = parse_fast_datetime(string)
+    if output is not None:
+        return output
+    if not could_be_datetime(string):
+        return None
+
+    parsers = _get_general_parsers()
+    if len(parsers) == 0:
+        raise ImportError('Parsing dates other than ISO-8601 requires dateutil or parsedatetime.')
+    for parser in parsers:
+        output = parser(string)
+        if output is not None:
+            return output
+    return None
+
+
+#=======================================================================================================================
+# Type Cast Registry
+#=======================================================================================================================
+class TypeCast(object):
+
+    """Casts human input to a type, with a cheap recognizer to reject input before converting it.
+
+    Called like the ``str_to_*`` functions, returning the converted value or ``on_fail_return``.
+
+    :ivar name: Name of the type, as used in docstrings.
+    :type name: str
+    :ivar recognize: Function accepting a str and returning whether it can be converted. It should be cheap and must
+                     not raise.
+    :type recognize: func
+    :ivar convert: Function accepting a recognized str and returning the value, or None if it can't be converted.
+    :type convert: func
+    :ivar pure: Whether the value depends only on the input, as opposed to ie. the current time.
+    :type pure: bool
+    """
+
+    __slots__ = ('name', 'recognize', 'convert', 'pure')
+
+    def __init__(self, name, recognize, convert, pure=True):
+        self.name = name
+        self.recognize = recognize
+        self.convert = convert
+        self.pure = pure
+
+    def __call__(self, string, on_fail_return=None):
+        if not self.recognize(string):
+            return on_fail_return
+        output = self.convert(string)
+        if output is None:
+            return on_fail_return
+        return output
+
+    def __repr__(self):
+        return 'TypeCast({!r})'.format(self.name)
+
+
+def _recognize_any(string):
+    return True
+
+
+def register_type(type, recognize, convert, pure=True):
+    """Register a type that docstrings and ``translate_to_first_type`` can cast human input to.
+
+    Register types before the interfaces that use them are decorated, as the automatic rules of a translator resolve
+    the casts of their types once, when the translator is built.
+
+    Ie.::
+
+        register_type('color', lambda text: text.lower() in COLORS, lambda text: text.lower())
+
+    :param type: The type or its name.
+    :type type: type|str
+    :param recognize: Function accepting a str and returning whether it can be converted. It should be cheap and must
+                      not raise.
+    :type recognize: func
+    :param convert: Function accepting a recognized str and returning the value, or None if it can't be converted.
+    :type convert: func
+    :param pure: Whether the value depends only on the input, as opposed to ie. the current time.
+    :type pure: bool
+    :return: Returns the registered type cast.
+    :rtype: TypeCast
+    """
+    name = type if isinstance(type, str) else type.__name__
+    cast = TypeCast(name, recognize, convert, pure=pure)
+    type_cast_dict[name] = cast
+    return cast
+
+
+def resolve_type_cast(type):
+    """Returns the type cast for a type, type name or type cast, or None if the type isn't registered."""
+    if isinstance(type, TypeCast):
+        return type
+    if not isinstance(type, str):
+        type = getattr(type, '__name__', None)
+    return type_cast_dict.get(type)
+
+
+type_cast_dict = {}
+
+register_type('str', _recognize_any, lambda string: string)
+register_type('int', is_int, int)
+register_type('float', is_float, float)
+register_type('datetime', could_be_datetime, str_to_datetime, pure=False)
+register_type('date', could_be_datetime, str_to_date, pure=False)
+
+
+#=======================================================================================================================
+# Docstring Rules
+#=======================================================================================================================
+_rule_pattern = re.compile(r'\s*([A-Za-z_]\w*)\s*(?:\(([^)]*)\))?\s*(?:[,;]|$)')
+_rule_arg_pattern = re.compile(r'\s*(\'[^\']*\'|"[^"]*"|[^,\s]+)\s*(?:,|$)')
+_identifier_pattern = re.compile(r'[A-Za-z_]\w*$')
+
+
+def _parse_rule_arg(arg):
+    if arg[0] in '\'"':
+        return arg[1:-1]
+    if is_int(arg):
+        return int(arg)
+    if is_float(arg):
+        return float(arg)
+    return arg
+
+
+def _list_context(args):
+    # a single name refers to an attribute of the interface object, otherwise the values are listed
+    if len(args) == 1 and _identifier_pattern.match(args[0]):
+        return ObjectAttribute(args[0])
+    return [_parse_rule_arg(arg) if arg[0] in '\'"' else arg for arg in args]
+
+
+def _attribute_context(args):
+    # the values are a dictionary, which can't be written in a docstring, so they are looked up on the interface
+    if len(args) != 1 or not _identifier_pattern.match(args[0]):
+        raise ValueError('key_in takes the name of an attribute holding a dictionary, ie. key_in(statuses).')
+    return ObjectAttribute(args[0])
+
+
+def _range_context(args):
+    if len(args) != 2 or not all(is_int(arg) for arg in args):
+        raise ValueError('in_range takes two whole numbers, ie. in_range(1, 100).')
+    return int(args[0]), int(args[1])
+
+
+def _types_context(args):
+    casts = [resolve_type_cast(arg) for arg in args]
+    if len(casts) == 0 or None in casts:
+        raise ValueError('type takes registered type names, ie. type(int, float).')
+    return casts
+
+
+def _limit_context(args):
+    if len(args) == 0:
+        return None
+    if len(args) != 1 or not is_int(args[0]):
+        raise ValueError('The rule takes an optional whole number limit, ie. numbers(1000).')
+    return int(args[0])
+
+
+def _no_context(args):
+    if len(args) > 0:
+        raise ValueError('The rule takes no arguments.')
+    return None
+
+
+def register_rule_name(name, rule, description, build_context=_no_context):
+    """Register a rule that can be named in the ``:rules <param>:`` field of a docstring.
+
+    :param name: Name of the rule in docstrings.
+    :type name: str
+    :param rule: The rule function.
+    :type rule: func
+    :param description: Human-friendly description of the rule, formatted with the arguments given in the docstring,
+                        by position or all of them as ``{args}``.
+    :type description: str
+    :param build_context: Function accepting the list of argument strings and returning the context of the rule. It
+                          should raise ``ValueError`` for arguments that don't fit the rule.
+    :type build_context: func
+    """
+    rule_names[name] = (rule, description, build_context)
+
+
+def compile_rules(text, preceding=()):
+    """Compile the rules of a docstring into a tuple of (rule function, description, context) tuples.
+
+    Rules are separated by commas or semicolons and may take arguments in parentheses. Ie.::
+
+        :rules priority: in_range(1, 5)
+        :rules project: lcase_in(projects)
+        :rules estimate: duration
+
+    A single name given to ``in`` or ``lcase_in`` is an attribute of the interface object, looked up when the
+    command is dispatched. Otherwise the arguments are the values themselves. ``key_in`` only takes the name of an
+    attribute, as its values are a dictionary.
+
+    ``in_range`` compares numbers, so a whole number cast is put in front of it unless the rules before it already
+    output a number, see the ``numeric`` rule trait.
+
+    :param text: The rules field of a docstring.
+    :type text: str
+    :param preceding: The rules evaluated before the compiled ones, such as the types rule of the argument.
+    :type preceding: tuple<tuple>
+    :rtype: tuple<tuple>
+    :raises ValueError: If a rule isn't registered or its arguments don't fit.
+    """
+    numeric = False
+    for rule, description, context in preceding:
+        numeric = _outputs_number(rule, context, numeric)
+
+    rules = []
+    text = text.strip()
+    position = 0
+    while position < len(text):
+        match = _rule_pattern.match(text, position)
+        if match is None or match.end() == position:
+            raise ValueError("Can't read the rules '{}' at '{}'.".format(text, text[position:]))
+        name, arg_text = match.groups()
+        if name not in rule_names:
+            raise ValueError("Unknown rule '{}' in '{}'.".format(name, text))
+
+        args = []
+        if arg_text is not None and arg_text.strip() != '':
+            args = [arg.group(1) for arg in _rule_arg_pattern.finditer(arg_text) if arg.group(1)]
+
+        rule, description, build_context = rule_names[name]
+        try:
+            context = build_context(args)
+        except ValueError as e:
+            raise ValueError("Invalid rule '{}' in '{}': {}".format(name, text, e))
+        if rule is validate_int_is_in_range and not numeric:
+            rules.append((translate_to_first_type, 'Value must be a whole number.', [type_cast_dict['int']]))
+            numeric = True
+        rules.append((rule, description.format(*args, args=', '.join(args)), context))
+        numeric = _outputs_number(rule, context, numeric)
+        position = match.end()
+
+    return tuple(rules)
+
+
+def _outputs_number(rule, context, numeric):
+    # whether the output of a rule is a number, given whether its input is, as a check passes its input through
+    if get_rule_trait(rule, 'check', context, default=False):
+        return numeric
+    return bool(get_rule_trait(rule, 'numeric', context, default=False))
+
+
+rule_names = {}
+
+register_rule_name('duration', translate_duration_to_minutes, 'Value must be a duration of time.')
+register_rule_name('in_range', validate_int_is_in_range, 'Value must be from {0} to {1}.', _range_context)
+register_rule_name('in', validate_is_in_list, 'Value must be one of the acceptable values.', _list_context)
+register_rule_name('lcase_in', validate_lcase_is_in_list, 'Value must be one of the acceptable values.',
+                   _list_context)
+register_rule_name('key_in', translate_to_dict_key, 'Value must be one of the acceptable values.',
+                   _attribute_context)
+register_rule_name('numbers', translate_numeric_list, 'Value must be a list of numbers or ranges, such as 1-5,8.',
+                   _limit_context)
+register_rule_name('type', translate_to_first_type, 'Value must be translatable to one of the following types: '
+                   '{args}.', _types_context)
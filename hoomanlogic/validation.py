@@ -1,17 +1,262 @@
+from collections import namedtuple
+
+
 def identify_duplicate_command_words(command_dict):
-    """Feed it the command dictionary and print out all the command words that are duplicated."""
-    all_commands = []
-    for cmd_words in command_dict.itervalues():
-        all_commands.extend(cmd_words)
-
-    cmdcount = {}
-    for cmd in all_commands:
-        cmdcount[cmd] = cmdcount.get(cmd, 0) + 1
-
-    duplicate_commands = []
-    for key, value in cmdcount.iteritems():
-        if value > 1:
-            duplicate_commands.append(key)
-
-    for dup in duplicate_commands:
-        print(dup)
\ No newline at end of file
+    """Feed it the command dictionary and get the command words that are used by more than one command.
+
+    :return: Returns the ``AMBIGUOUS`` conflicts of the command words, ordered by command word. The scope of the
+             conflicts is None.
+    :rtype: list<Conflict>
+    """
+    index = ConflictIndex()
+    for cmd, cmd_words in command_dict.items():
+        index.add(None, cmd, cmd_words)
+    return index.get_conflicts(ConflictIndex.AMBIGUOUS)
+
+
+#=======================================================================================================================
+# Conflict Index
+#=======================================================================================================================
+class Conflict(namedtuple('Conflict', 'kind synonym scope commands other_scope other_commands')):
+
+    """A synonym that doesn't resolve to a single command.
+
+    :ivar kind: ``ConflictIndex.AMBIGUOUS`` when the synonym maps to more than one command of the same scope, or
+                ``ConflictIndex.SHADOWED`` when a scope maps the synonym to a command of its own, hiding the
+                command of an ancestor scope.
+    :type kind: str
+    :ivar synonym: The conflicting synonym.
+    :type synonym: str
+    :ivar scope: The interface of the conflict, or the descendant interface that shadows the synonym.
+    :type scope: object
+    :ivar commands: The commands of ``scope`` the synonym maps to.
+    :type commands: tuple<str>
+    :ivar other_scope: The ancestor interface whose commands are shadowed, or None.
+    :type other_scope: object|None
+    :ivar other_commands: The shadowed commands of ``other_scope``.
+    :type other_commands: tuple<str>
+    """
+
+    __slots__ = ()
+
+
+class ConflictIndex(object):
+
+    """Index of the synonyms of an interface tree, reporting ambiguous and shadowed synonyms as they are added.
+
+    Adding the synonyms of a command only looks at the other scopes using the same synonyms, so registering an
+    interface costs in proportion to its own synonyms, rather than a scan of every command dictionary in the tree.
+
+    Synonyms joined from parts (see ``build_command_words``) are kept in factored form, and indexed by the words of
+    their first and last parts in a ``PatternIndex``, so the products a literal synonym belongs to are found with a
+    few lookups. A new product is only compared against the literal synonyms starting with a word of its first part,
+    and against the products its first and last parts can overlap with, by walking the smaller product, so the
+    combinations are never all built at once.
+
+    :ivar synonyms: The commands of each literal synonym by scope, as {synonym: {scope: set(commands)}}.
+    :type synonyms: dict
+    :ivar scope_synonyms: The literal synonyms used by each scope.
+    :type scope_synonyms: dict<object,set<str>>
+    :ivar patterns: Tuples of (command, product of parts) of the joined synonyms of each scope.
+    :type patterns: dict<object,list<tuple>>
+    :ivar pattern_index: The products of parts, by tuple of (scope, command, product of parts).
+    :type pattern_index: PatternIndex
+    :ivar synonym_prefixes: The literal synonyms by their prefix of each length of the first part words of the
+                            products, as {length: {prefix: set(synonyms)}}, built as the lengths are used.
+    :type synonym_prefixes: dict
+    :ivar conflicts: Current conflicts, by (kind, synonym, scope, other_scope).
+    :type conflicts: dict
+    """
+
+    AMBIGUOUS = 'ambiguous'
+    SHADOWED = 'shadowed'
+
+    def __init__(self):
+        self.synonyms = {}
+        self.scope_synonyms = {}
+        from hoomanlogic import PatternIndex
+        self.patterns = {}
+        self.pattern_index = PatternIndex()
+        self.synonym_prefixes = {}
+        self.conflicts = {}
+
+    @staticmethod
+    def is_ancestor(ancestor, scope):
+        """Returns whether an interface is an ancestor of another, following ``parent_interface``."""
+        scope = getattr(scope, 'parent_interface', None)
+        while scope is not None:
+            if scope is ancestor:
+                return True
+            scope = getattr(scope, 'parent_interface', None)
+        return False
+
+    def add(self, scope, command, synonyms):
+        """Add the synonyms of a command in a scope, updating the conflicts of those synonyms.
+
+        :param scope: The interface the command belongs to.
+        :type scope: object
+        :param command: The command key of the interface's ``command_dictionary``.
+        :type command: str
+        :param synonyms: The synonyms of the command.
+        :type synonyms: iterable<str>|CommandWords
+        """
+        products = []
+        if hasattr(synonyms, 'iter_products'):
+            products = list(synonyms.iter_products())
+            synonyms = synonyms.words
+
+        scope_synonyms = self.scope_synonyms.setdefault(scope, set())
+        for synonym in synonyms:
+            scopes = self.synonyms.get(synonym)
+            if scopes is None:
+                scopes = self.synonyms[synonym] = {}
+                for length, prefixes in self.synonym_prefixes.items():
+                    if len(synonym) >= length:
+                        prefixes.setdefault(synonym[:length], set()).add(synonym)
+            scopes.setdefault(scope, set()).add(command)
+            scope_synonyms.add(synonym)
+            self.update_conflicts(synonym, scope)
+
+        for pattern in products:
+            self.patterns.setdefault(scope, []).append((command, pattern))
+            self.pattern_index.add((scope, command, pattern), pattern)
+            for synonym in self.get_shared_synonyms(scope, command, pattern):
+                self.update_conflicts(synonym, scope)
+
+    def remove(self, scope, command=None):
+        """Remove the synonyms of a command, or of all commands, of a scope.
+
+        :param scope: The interface the command belongs to.
+        :type scope: object
+        :param command: The command key, or None to remove every command of the scope.
+        :type command: str|None
+        """
+        for key in [key for key in self.conflicts if key[2] is scope or key[3] is scope]:
+            del self.conflicts[key]
+
+        patterns = []
+        for key, pattern in self.patterns.pop(scope, []):
+            if command is not None and key != command:
+                patterns.append((key, pattern))
+            else:
+                self.pattern_index.remove((scope, key, pattern))
+        if len(patterns) > 0:
+            self.patterns[scope] = patterns
+
+        scope_synonyms = self.scope_synonyms.get(scope, set())
+        for synonym in list(scope_synonyms):
+            scopes = self.synonyms[synonym]
+            if command is None:
+                del scopes[scope]
+            else:
+                scopes[scope].discard(command)
+                if len(scopes[scope]) == 0:
+                    del scopes[scope]
+            if scope not in scopes:
+                scope_synonyms.discard(synonym)
+            if len(scopes) == 0:
+                del self.synonyms[synonym]
+                for length, prefixes in self.synonym_prefixes.items():
+                    if len(synonym) >= length:
+                        self._discard_prefix(prefixes, synonym[:length], synonym)
+            elif scope in scopes:
+                self.update_conflicts(synonym, scope)
+
+        if len(scope_synonyms) == 0:
+            self.scope_synonyms.pop(scope, None)
+        for key, pattern in patterns:
+            for synonym in self.get_shared_synonyms(scope, key, pattern):
+                self.update_conflicts(synonym, scope)
+
+    def is_related(self, scope, other_scope):
+        """Returns whether synonyms of the scopes can conflict: the same scope, or one is an ancestor of the other."""
+        return (other_scope is scope or ConflictIndex.is_ancestor(other_scope, scope) or
+                ConflictIndex.is_ancestor(scope, other_scope))
+
+    def get_shared_synonyms(self, scope, command, pattern):
+        """Returns the set of synonyms of a joined synonym product also used by another command of a related scope.
+
+        :param scope: The interface the command belongs to.
+        :type scope: object
+        :param command: The command key of the product.
+        :type command: str
+        :param pattern: The product of parts, in factored form.
+        :type pattern: CommandWords
+        :rtype: set<str>
+        """
+        shared = set()
+        parts = pattern.products[0]
+        for word in set(parts[0]):
+            for synonym in self.get_synonyms_starting_with(word):
+                if synonym not in shared and synonym in pattern and \
+                        any(self.is_related(scope, other_scope) for other_scope in self.synonyms[synonym]):
+                    shared.add(synonym)
+
+        for (other_scope, other_command, other_pattern), other_words in self.pattern_index.get_overlapping(parts):
+            if other_pattern is pattern or (other_scope is scope and other_command == command):
+                continue
+            if not self.is_related(scope, other_scope):
+                continue
+            smaller, larger = sorted((pattern, other_pattern), key=len)
+            shared.update(synonym for synonym in smaller if synonym in larger)
+        return shared
+
+    def get_synonyms_starting_with(self, prefix):
+        """Returns the set of literal synonyms starting with the prefix.
+
+        The synonyms are indexed by their prefix of the length of the prefix the first time it is used.
+        """
+        prefixes = self.synonym_prefixes.get(len(prefix))
+        if prefixes is None:
+            prefixes = self.synonym_prefixes[len(prefix)] = {}
+            for synonym in self.synonyms:
+                if len(synonym) >= len(prefix):
+                    prefixes.setdefault(synonym[:len(prefix)], set()).add(synonym)
+        return prefixes.get(prefix, ())
+
+    @staticmethod
+    def _discard_prefix(prefixes, prefix, synonym):
+        synonyms = prefixes.get(prefix)
+        if synonyms is not None:
+            synonyms.discard(synonym)
+            if len(synonyms) == 0:
+                del prefixes[prefix]
+
+    def get_commands(self, synonym, scope):
+        """Returns the set of commands of a scope using a synonym, literal or joined."""
+        return self.get_scopes(synonym).get(scope, set())
+
+    def get_scopes(self, synonym):
+        """Returns the commands of each scope using a synonym, as {scope: set(commands)}."""
+        scopes = dict((scope, set(commands)) for scope, commands in self.synonyms.get(synonym, {}).items())
+        for scope, command, pattern in self.pattern_index.find(synonym):
+            scopes.setdefault(scope, set()).add(command)
+        return scopes
+
+    def update_conflicts(self, synonym, scope):
+        """Recompute the conflicts of a synonym involving a scope."""
+        scopes = self.get_scopes(synonym) if len(self.patterns) > 0 else self.synonyms.get(synonym, {})
+        commands = scopes.get(scope, set())
+
+        key = (ConflictIndex.AMBIGUOUS, synonym, scope, None)
+        if len(commands) > 1:
+            self.conflicts[key] = Conflict(ConflictIndex.AMBIGUOUS, synonym, scope, tuple(sorted(commands)), None, ())
+        else:
+            self.conflicts.pop(key, None)
+
+        for other_scope, other_commands in scopes.items():
+            if other_scope is scope:
+                continue
+            if ConflictIndex.is_ancestor(other_scope, scope):
+                self.conflicts[(ConflictIndex.SHADOWED, synonym, scope, other_scope)] = \
+                    Conflict(ConflictIndex.SHADOWED, synonym, scope, tuple(sorted(commands)),
+                             other_scope, tuple(sorted(other_commands)))
+            elif ConflictIndex.is_ancestor(scope, other_scope):
+                self.conflicts[(ConflictIndex.SHADOWED, synonym, other_scope, scope)] = \
+                    Conflict(ConflictIndex.SHADOWED, synonym, other_scope, tuple(sorted(other_commands)),
+                             scope, tuple(sorted(commands)))
+
+    def get_conflicts(self, kind=None):
+        """Returns a list of the current conflicts, optionally only of one kind, ordered by synonym."""
+        return sorted((conflict for conflict in self.conflicts.values() if kind is None or conflict.kind == kind),
+                      key=lambda conflict: (conflict.synonym, conflict.kind))
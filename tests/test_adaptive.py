@@ -0,0 +1,107 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import hoomanlogic
+from hoomanlogic import translation
+
+
+@translation.rule_traits(pure=True, check=True)
+def slow_check(value, context=None):
+    time.sleep(0.002)
+    return True, value
+
+
+@translation.rule_traits(pure=True, check=True)
+def even_check(value, context=None):
+    return value % 2 == 0, value
+
+
+@hoomanlogic.interface
+class AdaptiveInterface(object):
+
+    @hoomanlogic.translator(synonyms={'pick': ['pick']},
+                            arg_mediators=[
+                                hoomanlogic.ArgumentMediator('slow', max_count=None, rules=(
+                                    (translation.translate_to_first_type, 'a number', ['int']),
+                                    (slow_check, 'slow', None),
+                                    (even_check, 'even', None))),
+                                hoomanlogic.ArgumentMediator('fast', max_count=None, rules=(
+                                    (translation.translate_to_first_type, 'a number', ['int']),
+                                    (even_check, 'even', None)))])
+    def pick(self, slow=None, fast=None):
+        return slow, fast
+
+
+class AdaptiveOrderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.translator = AdaptiveInterface.pick.translator
+        self.directory = tempfile.mkdtemp()
+        self.operator = hoomanlogic.Operator(headless=True)
+        self.operator.register_interface(AdaptiveInterface())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        self.forget()
+
+    def forget(self):
+        # the translators are shared by every test using the interface
+        self.translator.match_order = None
+        self.translator.mediator_stats = None
+        for arg_mediator in self.translator.arg_mediators:
+            arg_mediator.rule_order = None
+            arg_mediator.rule_stats = None
+
+    def learn(self):
+        self.operator.enable_adaptive_ordering(learn_interval=10)
+        for i in range(20):
+            self.operator.listen_and_respond('pick {} {}'.format(i, i + 1))
+
+    def test_learn(self):
+        self.learn()
+        slow = self.translator.get_arg_mediator('slow')
+        fast = self.translator.get_arg_mediator('fast')
+
+        # the checks are reordered, the translation stays first
+        self.assertEqual([rule for rule, description, context in slow.get_rules()],
+                         [translation.translate_to_first_type, even_check, slow_check])
+        self.assertEqual(self.translator.match_order, (fast, slow))
+        self.assertEqual(self.translator.get_learned_order(),
+                         {'match_order': ['fast', 'slow'], 'rule_order': {'slow': [0, 2, 1], 'fast': [0, 1]}})
+
+        # the outcome doesn't depend on the order
+        resolution = self.operator.listen_and_respond('pick 4 5')
+        self.assertEqual(resolution.managed_args, {'slow': [4]})
+        self.assertEqual(resolution.unrecognized, ['5'])
+
+    def test_save_and_load(self):
+        self.learn()
+        path = os.path.join(self.directory, 'order.json')
+        self.operator.save_learned_order(path)
+        with open(path) as f:
+            saved = json.load(f)
+        self.assertEqual(saved['AdaptiveInterface.pick'], self.translator.get_learned_order())
+
+        self.forget()
+        self.assertEqual(self.translator.get_learned_order(), {'match_order': None, 'rule_order': {}})
+
+        self.operator.load_learned_order(path)
+        self.assertEqual(self.translator.get_learned_order(), saved['AdaptiveInterface.pick'])
+
+    def test_order_that_no_longer_fits(self):
+        slow = self.translator.get_arg_mediator('slow')
+        # the translation can't be moved after a check
+        self.assertFalse(slow.set_learned_order([1, 0, 2]))
+        self.assertFalse(slow.set_learned_order([0, 1]))
+        self.assertTrue(slow.set_learned_order([0, 2, 1]))
+
+        self.translator.set_learned_order({'match_order': ['slow', 'gone'], 'rule_order': {'gone': [0]}})
+        self.assertIsNone(self.translator.match_order)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import threading
+import unittest
+
+import hoomanlogic
+import hoomanlogic.metrics
+from hoomanlogic import translation
+from hoomanlogic.cache import ParseCache
+
+
+@translation.rule_traits(pure=True)
+def translate_to_settings(text, context=None):
+    key, sep, value = text.partition('=')
+    if sep == '':
+        return False, None
+    return True, {key: value}
+
+
+@hoomanlogic.interface
+class CacheInterface(object):
+
+    def __init__(self):
+        self.calls = []
+
+    @hoomanlogic.translator(synonyms={'pick': ['pick']}, arg_mediators=[
+        hoomanlogic.ArgumentMediator('numbers', rules=(translation.translate_numeric_list, 'numbers', None)),
+        hoomanlogic.ArgumentMediator('settings', rules=(translate_to_settings, 'settings', None))])
+    def pick(self, numbers=None, settings=None):
+        self.calls.append((list(numbers), dict(settings)))
+        # the function is free to change its arguments
+        numbers.append(99.5)
+        settings['changed'] = True
+
+    @hoomanlogic.translator(synonyms={'say': ['say']})
+    def say(self, text):
+        """Say something.
+
+        :param text: What to say.
+        """
+        self.calls.append(text)
+        return text
+
+
+class ParseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ParseCache()
+        self.operator = hoomanlogic.Operator(headless=True, parse_cache=self.cache)
+        self.interface = CacheInterface()
+        self.operator.register_interface(self.interface)
+
+    def test_cached_containers_are_copied(self):
+        for i in range(3):
+            self.operator.listen_and_respond('pick 1.5,2 a=b')
+        self.assertEqual(self.cache.hits, 2)
+        self.assertEqual(self.interface.calls, [([1.5, 2.0], {'a': 'b'})] * 3)
+
+    def test_quoted_whitespace_is_kept(self):
+        self.assertEqual(self.operator.listen_and_respond('say "a  b"').result, 'a  b')
+        self.assertEqual(self.operator.listen_and_respond('say "a b"').result, 'a b')
+        self.assertEqual(self.operator.listen_and_respond('  say "a b" ').result, 'a b')
+        self.assertEqual(self.interface.calls, ['a  b', 'a b', 'a b'])
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_resolution_of_a_hit_has_its_own_args(self):
+        self.operator.listen_and_respond('pick 1.5,2 a=b')
+        resolution = self.operator.listen_and_respond('pick 1.5,2 a=b')
+        self.assertEqual(self.cache.hits, 1)
+        resolution.managed_args['settings']['a'] = 'changed'
+        del resolution.managed_args['numbers']
+
+        self.operator.listen_and_respond('pick 1.5,2 a=b')
+        self.assertEqual(self.interface.calls, [([1.5, 2.0], {'a': 'b'})] * 3)
+
+    def test_hits_are_recorded_in_metrics(self):
+        metrics = hoomanlogic.metrics.Metrics()
+        self.operator.metrics = metrics
+        for i in range(3):
+            self.operator.listen_and_respond('say hello')
+        self.assertEqual(metrics.parse_cache_lookups.get(('CacheInterface', 'miss')), 1)
+        self.assertEqual(metrics.parse_cache_lookups.get(('CacheInterface', 'hit')), 2)
+        self.assertEqual(metrics.stage_seconds.get_count(('say', 'cached')), 2)
+
+    def test_concurrent_lookups(self):
+        errors = []
+
+        def run(n):
+            try:
+                for i in range(300):
+                    line = 'pick {} a=b'.format((n * 300 + i) % 40)
+                    if self.cache.get(self.interface, line) is None:
+                        self.cache.put(self.interface, line, 'pick', self.interface.pick.translator, {'numbers': [i]})
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.cache.hits + self.cache.misses, 8 * 300)
+
+
+if __name__ == '__main__':
+    unittest.main()
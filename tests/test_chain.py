@@ -0,0 +1,62 @@
+import unittest
+
+import hoomanlogic
+from hoomanlogic import InputChain
+
+
+@hoomanlogic.interface
+class TagInterface(object):
+
+    @hoomanlogic.translator(synonyms={'tag': ['tag']},
+                            arg_mediators=[hoomanlogic.ArgumentMediator('tags', max_count=None,
+                                                                        argument_prefixer='--tags'),
+                                           hoomanlogic.ArgumentMediator('name')])
+    def tag(self, name=None, tags=None):
+        return name, tags
+
+
+def read_chain(first_link):
+    links = []
+    link = first_link
+    while link is not None:
+        links.append((link.position, link.input, link.prefix_owners))
+        link = link.read()
+    return links
+
+
+class LabelPrefixersTest(unittest.TestCase):
+
+    prefixers = {'--tags': ('tags',), '-t': ('tags', 'topics')}
+
+    def label(self, line):
+        return read_chain(InputChain.label_prefixers(InputChain.convert_to_chain(line), self.prefixers))
+
+    def test_prefixers(self):
+        self.assertEqual(self.label('chores --tags home -t work'),
+                         [(1, 'chores', ()), (2, '--tags', ('tags',)), (3, 'home', ()),
+                          (4, '-t', ('tags', 'topics')), (5, 'work', ())])
+
+    def test_split_value(self):
+        self.assertEqual(self.label('--tags=home chores -t=work'),
+                         [(1, '--tags', ('tags',)), (2, 'home', ()), (3, 'chores', ()),
+                          (4, '-t', ('tags', 'topics')), (5, 'work', ())])
+
+    def test_value_with_equals_sign(self):
+        self.assertEqual(self.label('--tags=a=b'), [(1, '--tags', ('tags',)), (2, 'a=b', ())])
+
+    def test_empty_value(self):
+        self.assertEqual(self.label('--tags= home'), [(1, '--tags', ('tags',)), (2, 'home', ())])
+
+    def test_not_a_prefixer(self):
+        self.assertEqual(self.label('--other=home a=b'), [(1, '--other=home', ()), (2, 'a=b', ())])
+
+    def test_translation(self):
+        operator = hoomanlogic.Operator(headless=True)
+        operator.register_interface(TagInterface())
+        self.assertEqual(operator.listen_and_respond('tag chores --tags=home work').result,
+                         ('chores', ['home', 'work']))
+        self.assertEqual(operator.listen_and_respond('tag --tags home work').result, (None, ['home', 'work']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import time
+import unittest
+from timeit import default_timer as timer
+
+import hoomanlogic
+import hoomanlogic.metrics
+from hoomanlogic import RuleFailure, translation
+
+
+@translation.rule_traits(timeout=0.05)
+def translate_slowly(text, context=None):
+    time.sleep(0.3)
+    return True, text
+
+
+def translate_in_place_slowly(text, context=None):
+    time.sleep(0.1)
+    return True, text
+
+
+def translate_with_error(text, context=None):
+    raise ValueError('boom')
+
+
+def get_projects():
+    raise IOError('the project list is unavailable')
+
+
+@hoomanlogic.interface
+class FailingInterface(object):
+
+    @hoomanlogic.translator(synonyms={'slow': ['slow']},
+                            arg_mediators=[hoomanlogic.ArgumentMediator('value', rules=(translate_slowly, '', None))])
+    def slow(self, value=None):
+        return value
+
+    @hoomanlogic.translator(synonyms={'late': ['late']}, deadline=0.05,
+                            arg_mediators=[hoomanlogic.ArgumentMediator('first', rules=(
+                                               translate_in_place_slowly, '', None)),
+                                           hoomanlogic.ArgumentMediator('second', rules=(
+                                               translate_in_place_slowly, '', None))])
+    def late(self, first=None, second=None):
+        return first, second
+
+    @hoomanlogic.translator(synonyms={'broken': ['broken']},
+                            arg_mediators=[hoomanlogic.ArgumentMediator('value', rules=(
+                                translate_with_error, '', None))])
+    def broken(self, value=None):
+        return value
+
+
+class RuleFailureTest(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = hoomanlogic.metrics.Metrics()
+        self.operator = hoomanlogic.Operator(headless=True, metrics=self.metrics)
+        self.operator.register_interface(FailingInterface())
+
+    def test_timeout(self):
+        started = timer()
+        resolution = self.operator.listen_and_respond('slow x')
+        self.assertLess(timer() - started, 0.25)
+        self.assertEqual(resolution.failures, [RuleFailure('value', 'translate_slowly', RuleFailure.TIMEOUT, '')])
+        self.assertEqual(resolution.unrecognized, ['x'])
+        self.assertFalse(resolution.is_reusable())
+        self.assertEqual(self.metrics.rule_failures.get(('slow', 'value', 'translate_slowly', RuleFailure.TIMEOUT)),
+                         1)
+
+    def test_deadline(self):
+        resolution = self.operator.listen_and_respond('late x y')
+        # the rule runs past the deadline in place, the rules after it aren't called
+        self.assertEqual(resolution.managed_args, {'first': 'x'})
+        self.assertEqual(resolution.failures,
+                         [RuleFailure('first', 'translate_in_place_slowly', RuleFailure.DEADLINE, '')])
+        self.assertEqual(resolution.unrecognized, ['y'])
+
+    def test_error(self):
+        resolution = self.operator.listen_and_respond('broken x')
+        self.assertEqual(resolution.failures,
+                         [RuleFailure('value', 'translate_with_error', RuleFailure.ERROR, 'ValueError: boom')])
+        self.assertEqual(resolution.unrecognized, ['x'])
+
+
+class WithoutResolutionTest(unittest.TestCase):
+
+    def test_failing_context_is_a_reject(self):
+        arg_mediator = hoomanlogic.ArgumentMediator('project', rules=(
+            translation.validate_is_in_list, '', translation.ContextProvider(get_projects)))
+        self.assertFalse(arg_mediator.try_match(hoomanlogic.InputChain.convert_to_chain('home')))
+        self.assertIsNone(arg_mediator.answer('home'))
+
+    def test_failing_rule_is_a_reject(self):
+        arg_mediator = hoomanlogic.ArgumentMediator('value', rules=(translate_with_error, '', None))
+        self.assertIsNone(arg_mediator.answer('x'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+
+import hoomanlogic
+from hoomanlogic import translation
+
+
+@hoomanlogic.interface
+class TaskInterface(object):
+
+    def __init__(self):
+        self.deleted = []
+
+    @hoomanlogic.translator(synonyms={'add': ['add']},
+                            arg_mediators=[
+                                hoomanlogic.ArgumentMediator('name', required=True),
+                                hoomanlogic.ArgumentMediator('priority', required=True, rules=(
+                                    (translation.translate_to_first_type, 'a number', ['int']),
+                                    (translation.validate_int_is_in_range, 'from 1 to 5', (1, 5))))])
+    def add(self, name, priority):
+        return name, priority
+
+    @hoomanlogic.translator(synonyms={'delete': ['delete', 'rm']}, code_alert=1)
+    def delete(self, name):
+        """Delete a task.
+
+        :param name: Name of the task.
+        """
+        self.deleted.append(name)
+        return name
+
+
+class HeadlessTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tasks = TaskInterface()
+        self.operator = hoomanlogic.Operator(headless=True)
+        self.operator.register_interface(self.tasks)
+
+    def test_complete(self):
+        resolution = self.operator.listen_and_respond('add chores 3')
+        self.assertEqual(resolution.status, hoomanlogic.Resolution.COMPLETE)
+        self.assertEqual(resolution.result, ('chores', 3))
+        self.assertIs(self.operator.last_resolution, resolution)
+
+    def test_resume_across_calls(self):
+        resolution = self.operator.listen_and_respond('add')
+        self.assertEqual(resolution.status, hoomanlogic.Resolution.INCOMPLETE)
+        self.assertEqual(sorted(resolution.missing), ['name', 'priority'])
+        self.assertEqual(sorted(resolution.questions()), ['name', 'priority'])
+
+        resolution.resume(answers={'priority': '9'})
+        self.assertEqual(resolution.rejected, {'priority': '9'})
+        self.assertEqual(sorted(resolution.missing), ['name', 'priority'])
+
+        resolution.resume(answers={'priority': '2'})
+        self.assertEqual(resolution.missing, ['name'])
+        self.assertEqual(resolution.rejected, {})
+        self.assertEqual(resolution.status, hoomanlogic.Resolution.INCOMPLETE)
+
+        resolution.resume(answers={'name': 'laundry'})
+        self.assertEqual(resolution.status, hoomanlogic.Resolution.COMPLETE)
+        self.assertEqual(resolution.result, ('laundry', 2))
+        self.assertEqual(sorted(resolution.supplied), ['name', 'priority'])
+        self.assertFalse(resolution.is_reusable())
+        self.assertRaises(Exception, resolution.resume, {'name': 'other'})
+
+    def test_confirm(self):
+        resolution = self.operator.listen_and_respond('rm chores')
+        self.assertEqual(resolution.status, hoomanlogic.Resolution.CONFIRM)
+        self.assertEqual(self.tasks.deleted, [])
+
+        resolution.resume(confirm=True)
+        self.assertEqual(resolution.status, hoomanlogic.Resolution.COMPLETE)
+        self.assertEqual(self.tasks.deleted, ['chores'])
+
+    def test_decline(self):
+        resolution = self.operator.listen_and_respond('rm chores')
+        resolution.resume(confirm=False)
+        self.assertEqual(resolution.status, hoomanlogic.Resolution.CANCELLED)
+        self.assertFalse(resolution.is_pending())
+        self.assertEqual(self.tasks.deleted, [])
+
+    def test_unrecognized_input_needs_confirmation(self):
+        resolution = self.operator.listen_and_respond('add chores 3 9')
+        self.assertEqual(resolution.status, hoomanlogic.Resolution.CONFIRM)
+        self.assertEqual(resolution.unrecognized, ['9'])
+        self.assertEqual(resolution.managed_args, {'name': 'chores', 'priority': 3})
+
+        resolution.cancel()
+        self.assertEqual(resolution.status, hoomanlogic.Resolution.CANCELLED)
+
+
+if __name__ == '__main__':
+    unittest.main()
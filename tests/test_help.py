@@ -0,0 +1,82 @@
+import unittest
+from timeit import default_timer as timer
+
+import hoomanlogic
+from hoomanlogic import HelpIndex
+
+
+class HelpIndexTest(unittest.TestCase):
+
+    def test_listing_and_query(self):
+        index = HelpIndex()
+        index.add_all([('remove', ['remove', 'delete']), ('add', ['add', 'new']), ('list', ['list', 'ls'])])
+        index.add('edit', ['edit', 'change'])
+        self.assertEqual([entry.command for entry in index.iter_entries()], ['add', 'edit', 'list', 'remove'])
+        self.assertEqual([entry.command for entry in index.iter_entries('de')], ['remove'])
+        self.assertEqual([entry.command for entry in index.iter_entries('l')], ['list'])
+
+    def test_replace_entry(self):
+        index = HelpIndex()
+        index.add_all([('add', ['add', 'new']), ('list', ['list'])])
+        index.add_all([('add', ['add', 'create'])])
+        self.assertEqual(index.commands, ['add', 'list'])
+        self.assertEqual(index.synonyms, [('add', 'add'), ('create', 'add'), ('list', 'list')])
+
+    def test_many_synonyms(self):
+        commands = [('command{:05d}'.format(i), ['synonym{:05d}_{}'.format(i, j) for j in range(10)])
+                    for i in range(5000)]
+        commands.reverse()
+        index = HelpIndex()
+        started = timer()
+        index.add_all(commands)
+        self.assertLess(timer() - started, 2.0)
+        self.assertEqual(len(index.synonyms), 50000)
+        self.assertEqual(index.synonyms, sorted(index.synonyms))
+        self.assertEqual(index.commands[0], 'command00000')
+
+        # replacing or removing them filters the listing once, rather than once per synonym
+        started = timer()
+        index.add_all(commands)
+        index.remove_all([command for command, synonyms in commands[::2]])
+        self.assertLess(timer() - started, 2.0)
+        self.assertEqual(len(index.synonyms), 25000)
+        self.assertEqual(index.synonyms, sorted(index.synonyms))
+
+    def test_remove(self):
+        index = HelpIndex()
+        index.add_all([('add', ['add', 'new']), ('list', ['list', 'ls']), ('edit', ['edit'])])
+        index.remove('list')
+        index.remove_all(['edit'])
+        index.remove_all([])
+        self.assertEqual(index.commands, ['add'])
+        self.assertEqual(index.synonyms, [('add', 'add'), ('new', 'add')])
+        self.assertEqual([entry.command for entry in index.iter_entries('l')], [])
+        self.assertRaises(KeyError, index.remove, 'list')
+
+
+@hoomanlogic.interface
+class HelpInterface(object):
+
+    @hoomanlogic.translator(synonyms={'list': ['list', 'ls']})
+    def list(self):
+        pass
+
+    @hoomanlogic.translator(synonyms={'add': ['add', 'new']})
+    def add(self):
+        pass
+
+
+class HelpPageTest(unittest.TestCase):
+
+    def test_help_page_of_registered_interface(self):
+        operator = hoomanlogic.Operator(headless=True)
+        operator.register_interface(HelpInterface())
+        entries, more = operator.get_help_page(page_size=100)
+        commands = [entry.command for entry in entries]
+        self.assertLess(commands.index('add'), commands.index('list'))
+        self.assertFalse(more)
+        self.assertEqual([entry.command for entry in operator.get_help_page(query='ls')[0]], ['list'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,295 @@
+import random
+import unittest
+from itertools import product
+from timeit import default_timer as timer
+
+import hoomanlogic
+from hoomanlogic import CommandIndex, CommandWords, PatternIndex, ScopeIndex
+from hoomanlogic.validation import Conflict, ConflictIndex, identify_duplicate_command_words
+
+WORDS = ['a', 'ab', 'b', 'ba', 'abc', 'c', '']
+
+
+@hoomanlogic.interface
+class Scope(object):
+    pass
+
+
+@hoomanlogic.interface
+class ConflictingInterface(object):
+
+    @hoomanlogic.translator(synonyms={'add': ['add', 'new']})
+    def add(self):
+        pass
+
+    @hoomanlogic.translator(synonyms={'create': ['create', 'new']})
+    def create(self):
+        pass
+
+
+def make_tree():
+    root = Scope()
+    child = Scope()
+    grandchild = Scope()
+    sibling = Scope()
+    root.register_child_interface(child)
+    child.register_child_interface(grandchild)
+    root.register_child_interface(sibling)
+    return [root, child, grandchild, sibling]
+
+
+def random_synonyms(rand):
+    words = CommandWords(rand.sample([w for w in WORDS if w != ''], rand.randint(0, 2)))
+    for i in range(rand.randint(0, 2)):
+        words.add_product(tuple(rand.sample(WORDS, rand.randint(1, 3)) for j in range(rand.randint(1, 3))))
+    return words
+
+
+def expand(synonyms):
+    words = set(synonyms.words)
+    for parts in synonyms.products:
+        words.update(''.join(joined) for joined in product(*parts))
+    return words
+
+
+def brute_force_conflicts(commands):
+    """Returns the conflict keys of the commands, tuples of (scope, command, CommandWords), by expanding them."""
+    by_scope = {}
+    for scope, command, synonyms in commands:
+        for word in expand(synonyms):
+            by_scope.setdefault(scope, {}).setdefault(word, set()).add(command)
+    keys = set()
+    for scope, words in by_scope.items():
+        for word, scope_commands in words.items():
+            if len(scope_commands) > 1:
+                keys.add((ConflictIndex.AMBIGUOUS, word, scope, None))
+            for other_scope, other_words in by_scope.items():
+                if word in other_words and ConflictIndex.is_ancestor(other_scope, scope):
+                    keys.add((ConflictIndex.SHADOWED, word, scope, other_scope))
+    return keys
+
+
+class PatternIndexTest(unittest.TestCase):
+
+    def test_find_matches_products(self):
+        rand = random.Random(7)
+        for trial in range(50):
+            index = PatternIndex()
+            commands = [('command{}'.format(i), random_synonyms(rand)) for i in range(6)]
+            for command, synonyms in commands:
+                index.add(command, synonyms)
+            removed = commands.pop(rand.randrange(len(commands)))
+            index.remove(removed[0])
+
+            for word in set(''.join(joined) for joined in product(WORDS, WORDS, WORDS)):
+                expected = [command for command, synonyms in commands
+                            if any(word in CommandWords(products=[parts]) for parts in synonyms.products)]
+                self.assertEqual(index.find(word), expected, word)
+
+    def test_copy_is_independent(self):
+        index = PatternIndex()
+        index.add('find', CommandWords(products=[(['find', 'search'], ['task', 'action'])]))
+        copied = index.copy()
+        copied.add('list', CommandWords(products=[(['list'], ['task'])]))
+        self.assertEqual(index.find('listtask'), [])
+        self.assertEqual(copied.find('listtask'), ['list'])
+        self.assertEqual(copied.find('searchaction'), ['find'])
+
+
+class CommandIndexTest(unittest.TestCase):
+
+    def test_find_matches_brute_force(self):
+        rand = random.Random(11)
+        for trial in range(50):
+            scopes = make_tree()
+            for scope in scopes:
+                for i in range(4):
+                    scope.command_index.add('command{}'.format(i), random_synonyms(rand))
+            indexes = {}
+            for scope in scopes:
+                parent = scope.parent_interface
+                indexes[scope] = ScopeIndex(scope, indexes[parent] if parent is not None else None)
+
+            for word in set(''.join(joined) for joined in product(WORDS, WORDS)):
+                for scope in scopes:
+                    self.assertEqual(scope.command_index.find(word), self.find_in_scope(scope, word))
+                    expected = (None, None)
+                    ancestor = scope
+                    while ancestor is not None:
+                        command = self.find_in_scope(ancestor, word)
+                        if command is not None:
+                            expected = (ancestor, command)
+                            break
+                        ancestor = ancestor.parent_interface
+                    self.assertEqual(indexes[scope].find(word), expected, word)
+
+    @staticmethod
+    def find_in_scope(scope, word):
+        if word in scope.command_index.words:
+            return scope.command_index.words[word]
+        for command, synonyms in scope.command_index.patterns:
+            if word in synonyms:
+                return command
+        return None
+
+
+@hoomanlogic.interface
+class RootInterface(object):
+
+    @hoomanlogic.translator(synonyms={'list': ['list', 'ls']})
+    def list(self):
+        return 'root', self
+
+    @hoomanlogic.translator(synonyms={'quit': ['quit', 'exit']})
+    def quit(self):
+        return 'root', self
+
+
+@hoomanlogic.interface
+class ProjectInterface(object):
+
+    @hoomanlogic.translator(synonyms={'list': ['list', 'tasks']})
+    def list(self):
+        return 'project', self
+
+
+@hoomanlogic.interface
+class TaskInterface(object):
+
+    @hoomanlogic.translator(synonyms={'done': ['done', 'finish']})
+    def done(self):
+        return 'task', self
+
+
+class ScopeFallthroughTest(unittest.TestCase):
+
+    def setUp(self):
+        self.operator = hoomanlogic.Operator(headless=True)
+        self.root = RootInterface()
+        self.project = ProjectInterface()
+        self.task = TaskInterface()
+        self.sibling = TaskInterface()
+        self.operator.register_interface(self.root)
+        self.operator.register_interface(self.project, child_of=self.root)
+        self.operator.register_interface(self.task, child_of=self.project)
+        self.operator.register_interface(self.sibling, child_of=self.root)
+
+    def run_in(self, scope, line):
+        self.operator.current_scope = scope
+        resolution = self.operator.listen_and_respond(line)
+        return resolution.result if resolution is not False else None
+
+    def test_fallthrough_to_ancestors(self):
+        self.assertEqual(self.run_in(self.task, 'done'), ('task', self.task))
+        self.assertEqual(self.run_in(self.task, 'exit'), ('root', self.root))
+        self.assertEqual(self.run_in(self.task, 'tasks'), ('project', self.project))
+        self.assertEqual(self.operator.find_command(self.task, 'quit'), (self.root, 'quit', ''))
+
+    def test_nearest_scope_shadows(self):
+        self.assertEqual(self.run_in(self.task, 'list'), ('project', self.project))
+        self.assertEqual(self.run_in(self.task, 'ls'), ('root', self.root))
+        self.assertEqual(self.run_in(self.root, 'list'), ('root', self.root))
+        self.assertEqual(self.run_in(self.sibling, 'list'), ('root', self.root))
+
+    def test_descendants_and_siblings_are_not_visible(self):
+        self.assertIsNone(self.run_in(self.root, 'done'))
+        self.assertIsNone(self.run_in(self.project, 'done'))
+        self.assertEqual(self.operator.find_command(self.sibling, 'tasks'), (None, None, None))
+
+    def test_registration_reaches_descendants(self):
+        self.assertEqual(self.run_in(self.task, 'tasks'), ('project', self.project))
+        other = ProjectInterface()
+        self.operator.register_interface(other, child_of=self.task)
+        self.assertEqual(self.run_in(other, 'finish'), ('task', self.task))
+        self.assertEqual(self.run_in(other, 'tasks'), ('project', other))
+        self.operator.unregister_interface(self.project)
+        self.assertIsNone(self.run_in(self.root, 'tasks'))
+
+
+class ConflictIndexTest(unittest.TestCase):
+
+    def test_conflicts_match_brute_force(self):
+        rand = random.Random(3)
+        for trial in range(40):
+            scopes = make_tree()
+            index = ConflictIndex()
+            commands = []
+            for i in range(10):
+                scope = rand.choice(scopes)
+                command = 'command{}'.format(rand.randint(0, 3))
+                synonyms = random_synonyms(rand)
+                commands.append((scope, command, synonyms))
+                index.add(scope, command, synonyms)
+                self.assertEqual(set(index.conflicts), brute_force_conflicts(commands))
+
+            scope, command, synonyms = rand.choice(commands)
+            index.remove(scope, command)
+            commands = [entry for entry in commands if entry[0] is not scope or entry[1] != command]
+            self.assertEqual(set(index.conflicts), brute_force_conflicts(commands))
+
+            scope = rand.choice(scopes)
+            index.remove(scope)
+            commands = [entry for entry in commands if entry[0] is not scope]
+            self.assertEqual(set(index.conflicts), brute_force_conflicts(commands))
+
+    def test_ambiguous(self):
+        root = Scope()
+        index = ConflictIndex()
+        index.add(root, 'add', ['add', 'new'])
+        index.add(root, 'create', ['create', 'new'])
+        self.assertEqual(index.get_conflicts(),
+                         [Conflict(ConflictIndex.AMBIGUOUS, 'new', root, ('add', 'create'), None, ())])
+
+        index.remove(root, 'create')
+        self.assertEqual(index.get_conflicts(), [])
+
+    def test_shadowed(self):
+        root, child, grandchild, sibling = make_tree()
+        index = ConflictIndex()
+        index.add(root, 'list', ['list', 'ls'])
+        index.add(sibling, 'show', ['show', 'ls'])
+        index.add(grandchild, 'items', CommandWords([], [(['list', 'show'], ['', 'items'])]))
+        self.assertEqual(index.get_conflicts(ConflictIndex.SHADOWED),
+                         [Conflict(ConflictIndex.SHADOWED, 'list', grandchild, ('items',), root, ('list',)),
+                          Conflict(ConflictIndex.SHADOWED, 'ls', sibling, ('show',), root, ('list',))])
+        self.assertEqual(index.get_conflicts(ConflictIndex.AMBIGUOUS), [])
+
+        index.remove(root)
+        self.assertEqual(index.get_conflicts(), [])
+
+    def test_operator_conflicts(self):
+        operator = hoomanlogic.Operator(headless=True)
+        root = ConflictingInterface()
+        child = ConflictingInterface()
+        operator.register_interface(root)
+        operator.register_interface(child, child_of=root)
+        self.assertEqual(set((conflict.synonym, conflict.scope)
+                             for conflict in operator.get_conflicts(ConflictIndex.AMBIGUOUS)),
+                         set([('new', root), ('new', child)]))
+        self.assertEqual(set((conflict.synonym, conflict.scope, conflict.other_scope)
+                             for conflict in operator.get_conflicts(ConflictIndex.SHADOWED)),
+                         set((synonym, child, root) for synonym in ('add', 'create', 'new')))
+
+        operator.unregister_interface(child)
+        self.assertEqual(len(operator.get_conflicts(ConflictIndex.SHADOWED)), 0)
+
+    def test_identify_duplicate_command_words(self):
+        conflicts = identify_duplicate_command_words({'add': ['add', 'new'], 'create': ['create', 'new'],
+                                                      'list': ['list']})
+        self.assertEqual(conflicts, [Conflict(ConflictIndex.AMBIGUOUS, 'new', None, ('add', 'create'), None, ())])
+
+    def test_registration_cost_follows_own_synonyms(self):
+        # products with distinct first parts are never compared to each other, nor to unrelated literals
+        index = ConflictIndex()
+        root = Scope()
+        started = timer()
+        for i in range(3000):
+            index.add(root, 'command{}'.format(i),
+                      CommandWords(['literal{}'.format(i)],
+                                   [(['p{}x'.format(i), 'p{}y'.format(i)], ['task', 'action', 'item'])]))
+        self.assertLess(timer() - started, 5.0)
+        self.assertEqual(index.get_conflicts(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import hoomanlogic
+from hoomanlogic import cache
+
+
+MODULE_SOURCE = '''import hoomanlogic
+
+
+@hoomanlogic.interface
+class Tasks(object):
+
+    @hoomanlogic.translator(synonyms={'add': ['add', 'NEW_WORD']})
+    def add(self, name=None):
+        return 'VERSION', name
+'''
+
+
+@hoomanlogic.interface
+class Root(object):
+
+    @hoomanlogic.translator(synonyms={'list': ['list', 'ls']})
+    def list(self):
+        return 'root'
+
+    @hoomanlogic.translator(synonyms={'make': ['new']})
+    def make(self):
+        return 'root-new'
+
+
+@hoomanlogic.interface
+class Sub(object):
+
+    @hoomanlogic.translator(synonyms={'show': ['show']})
+    def show(self):
+        return 'sub'
+
+
+class InterfaceTreeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.module_name = 'hl_reload_{}'.format(os.getpid())
+        self.write_module('v1', 'new')
+        sys.path.insert(0, self.directory)
+        self.dont_write_bytecode = sys.dont_write_bytecode
+        sys.dont_write_bytecode = True
+        module = __import__(self.module_name)
+
+        self.parse_cache = cache.ParseCache()
+        self.operator = hoomanlogic.Operator(headless=True, parse_cache=self.parse_cache)
+        self.root = Root()
+        self.tasks = module.Tasks()
+        self.sub = Sub()
+        self.operator.register_interface(self.root)
+        self.operator.register_interface(self.tasks, child_of=self.root)
+        self.operator.register_interface(self.sub, child_of=self.tasks)
+        self.operator.current_scope = self.sub
+
+    def tearDown(self):
+        sys.dont_write_bytecode = self.dont_write_bytecode
+        sys.path.remove(self.directory)
+        sys.modules.pop(self.module_name, None)
+        shutil.rmtree(self.directory)
+
+    def write_module(self, version, word):
+        source = MODULE_SOURCE.replace('VERSION', version).replace('NEW_WORD', word)
+        with open(os.path.join(self.directory, self.module_name + '.py'), 'w') as f:
+            f.write(source)
+
+    def get_conflicting_synonyms(self):
+        return set(conflict.synonym for conflict in self.operator.get_conflicts())
+
+    def test_reload(self):
+        self.assertEqual(self.operator.listen_and_respond('add 5').result, ('v1', '5'))
+        self.assertIn('new', self.get_conflicting_synonyms())
+
+        self.write_module('v2', 'create')
+        tasks = self.operator.reload_interface(self.tasks)
+        self.assertIsNot(tasks, self.tasks)
+        self.assertIs(tasks.parent_interface, self.root)
+        self.assertEqual(tasks.interfaces, [self.sub])
+        self.assertIs(self.sub.parent_interface, tasks)
+        self.assertEqual(self.root.interfaces, [tasks])
+
+        self.assertEqual(self.operator.listen_and_respond('add 5').result, ('v2', '5'))
+        self.assertEqual(self.operator.listen_and_respond('create 6').result, ('v2', '6'))
+        self.assertEqual(self.operator.listen_and_respond('new').result, 'root-new')
+        self.assertEqual(self.operator.listen_and_respond('show').result, 'sub')
+        self.assertNotIn('new', self.get_conflicting_synonyms())
+
+    def test_replace_detaches_the_old_interface(self):
+        tasks = type(self.tasks)()
+        self.operator.replace_interface(self.tasks, tasks)
+        self.assertIsNone(self.tasks.parent_interface)
+        self.assertEqual(self.tasks.interfaces, [])
+        self.assertIs(self.tasks.operator, self.operator)
+        self.assertEqual(self.operator.interfaces, [self.root, tasks, self.sub])
+
+        # the old instance still runs its commands
+        self.assertEqual(self.tasks.add.translator.fn(self.tasks, name='x'), ('v1', 'x'))
+
+    def test_replace_discards_parse_cache_entries(self):
+        self.operator.listen_and_respond('add 5')
+        self.operator.current_scope = self.root
+        self.operator.listen_and_respond('list')
+        self.operator.replace_interface(self.tasks, type(self.tasks)())
+        self.assertEqual(set(scope for scope, line in self.parse_cache.entries), set([self.root]))
+
+    def test_unregister(self):
+        self.operator.listen_and_respond('add 5')
+        self.operator.current_scope = self.root
+        self.operator.listen_and_respond('list')
+        self.operator.current_scope = self.sub
+
+        self.operator.unregister_interface(self.tasks)
+        self.assertIs(self.operator.current_scope, self.root)
+        self.assertEqual(self.operator.interfaces, [self.root])
+        self.assertEqual(self.root.interfaces, [])
+        self.assertIs(self.operator.listen_and_respond('add 5'), False)
+        self.assertEqual(self.operator.listen_and_respond('list').result, 'root')
+        self.assertTrue(all(scope is self.root for scope, line in self.parse_cache.entries))
+        self.assertEqual(self.operator.get_conflicts(), [])
+        self.assertRaises(ValueError, self.operator.unregister_interface, self.tasks)
+
+        # detached from its parent, with its descendants still attached
+        self.assertIsNone(self.tasks.parent_interface)
+        self.assertEqual(self.tasks.interfaces, [self.sub])
+        self.assertIs(self.sub.parent_interface, self.tasks)
+
+    def test_register_again(self):
+        self.operator.unregister_interface(self.sub)
+        self.operator.register_interface(self.sub, child_of=self.tasks)
+        self.operator.current_scope = self.sub
+        self.assertEqual(self.operator.listen_and_respond('show').result, 'sub')
+        self.assertEqual(self.operator.listen_and_respond('add 3').result, ('v1', '3'))
+
+
+if __name__ == '__main__':
+    unittest.main()
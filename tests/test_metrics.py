@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import hoomanlogic
+from hoomanlogic import translation
+from hoomanlogic.metrics import Counter, Histogram, Metrics
+
+
+@hoomanlogic.interface
+class RatingInterface(object):
+
+    @hoomanlogic.translator(synonyms={'rate': ['rate']},
+                            arg_mediators=[hoomanlogic.ArgumentMediator('stars', required=True, rules=(
+                                (translation.translate_to_first_type, 'a number', ['int']),
+                                (translation.validate_int_is_in_range, 'from 1 to 5', (1, 5))))])
+    def rate(self, stars):
+        return stars
+
+
+class MetricTypesTest(unittest.TestCase):
+
+    def test_counter(self):
+        counter = Counter('calls_total', 'Calls.', ('name',))
+        counter.inc(('a',))
+        counter.inc(('a',), 2)
+        counter.inc(('b"c',))
+        self.assertEqual(counter.get(('a',)), 3)
+        self.assertEqual(counter.get(('missing',)), 0)
+        self.assertEqual(counter.render(), ['calls_total{name="a"} 3', 'calls_total{name="b\\"c"} 1'])
+
+    def test_histogram(self):
+        histogram = Histogram('latency_seconds', 'Latency.', buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 7.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.get_count(), 4)
+        self.assertEqual(histogram.render(), ['latency_seconds_bucket{le="0.1"} 1',
+                                              'latency_seconds_bucket{le="1.0"} 3',
+                                              'latency_seconds_bucket{le="+Inf"} 4',
+                                              'latency_seconds_count 4',
+                                              'latency_seconds_sum 8.05'])
+
+
+class OperatorMetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = Metrics()
+        self.operator = hoomanlogic.Operator(headless=True, metrics=self.metrics)
+        self.operator.register_interface(RatingInterface())
+
+    def test_counts(self):
+        self.operator.listen_and_respond('rate 3')
+        self.operator.listen_and_respond('rate 9')
+        self.operator.listen_and_respond('rate x')
+        self.operator.listen_and_respond('unknown')
+
+        lookups = self.metrics.command_lookups
+        self.assertEqual(lookups.get(('RatingInterface', 'hit')), 3)
+        self.assertEqual(lookups.get(('RatingInterface', 'miss')), 1)
+
+        evaluations = self.metrics.rule_evaluations
+        self.assertEqual(evaluations.get(('rate', 'stars', 'translate_to_first_type')), 3)
+        self.assertEqual(evaluations.get(('rate', 'stars', 'validate_int_is_in_range')), 2)
+        self.assertEqual(self.metrics.rule_rejections.get(('rate', 'stars', 'translate_to_first_type')), 1)
+        self.assertEqual(self.metrics.rule_rejections.get(('rate', 'stars', 'validate_int_is_in_range')), 1)
+
+        self.assertEqual(self.metrics.mediator_matches.get(('rate', 'stars', 'accept')), 1)
+        self.assertEqual(self.metrics.mediator_matches.get(('rate', 'stars', 'reject')), 2)
+        self.assertEqual(self.metrics.prompts.get(('rate', 'stars')), 2)
+        self.assertEqual(self.metrics.confirmations.get(('rate', 'requested')), 2)
+        for stage in ('tokenize', 'match', 'assign'):
+            self.assertEqual(self.metrics.stage_seconds.get_count(('rate', stage)), 3, stage)
+        self.assertEqual(self.metrics.stage_seconds.get_count(('', 'lookup')), 4)
+
+    def test_snapshot(self):
+        self.operator.listen_and_respond('rate 3')
+        snapshot = self.metrics.snapshot()
+        lines = snapshot.splitlines()
+        self.assertIn('# TYPE hoomanlogic_rule_evaluations_total counter', lines)
+        self.assertIn('# TYPE hoomanlogic_stage_seconds histogram', lines)
+        self.assertIn('hoomanlogic_rule_evaluations_total{translator="rate",argument="stars",'
+                      'rule="validate_int_is_in_range"} 1', lines)
+        self.assertIn('hoomanlogic_command_lookups_total{scope="RatingInterface",result="hit"} 1', lines)
+        self.assertIn('hoomanlogic_stage_seconds_count{translator="rate",stage="match"} 1', lines)
+        self.assertTrue(snapshot.endswith('\n'))
+
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'hoomanlogic.prom')
+            self.metrics.write(path)
+            with open(path) as f:
+                self.assertEqual(f.read(), self.metrics.snapshot())
+            self.assertEqual(os.listdir(directory), ['hoomanlogic.prom'])
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
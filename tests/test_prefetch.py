@@ -0,0 +1,84 @@
+import time
+import unittest
+from timeit import default_timer as timer
+
+import hoomanlogic
+from hoomanlogic import RuleFailure, translation
+
+calls = []
+
+
+def get_projects():
+    calls.append('projects')
+    time.sleep(0.2)
+    return ['home', 'garden']
+
+
+def get_areas():
+    calls.append('areas')
+    time.sleep(0.2)
+    return ['work', 'chores']
+
+
+def get_stale_areas():
+    time.sleep(0.5)
+    return ['work', 'chores']
+
+
+def get_missing_projects():
+    raise IOError('the project list is unavailable')
+
+
+@hoomanlogic.interface
+class FilingInterface(object):
+
+    @hoomanlogic.translator(synonyms={'file': ['file']},
+                            arg_mediators=[hoomanlogic.ArgumentMediator('project', rules=(
+                                               translation.validate_is_in_list, 'a project',
+                                               translation.ContextProvider(get_projects, timeout=1))),
+                                           hoomanlogic.ArgumentMediator('area', rules=(
+                                               translation.validate_is_in_list, 'an area',
+                                               translation.ContextProvider(get_areas, timeout=1)))])
+    def file(self, project=None, area=None):
+        return project, area
+
+    @hoomanlogic.translator(synonyms={'refile': ['refile']},
+                            arg_mediators=[hoomanlogic.ArgumentMediator('project', rules=(
+                                               translation.validate_is_in_list, 'a project',
+                                               translation.ContextProvider(get_missing_projects, timeout=1))),
+                                           hoomanlogic.ArgumentMediator('area', rules=(
+                                               translation.validate_is_in_list, 'an area',
+                                               translation.ContextProvider(get_stale_areas, timeout=0.1)))])
+    def refile(self, project=None, area=None):
+        return project, area
+
+
+class PrefetchTest(unittest.TestCase):
+
+    def setUp(self):
+        del calls[:]
+        self.operator = hoomanlogic.Operator(headless=True)
+        self.operator.register_interface(FilingInterface())
+
+    def test_concurrent_lookups(self):
+        started = timer()
+        resolution = self.operator.listen_and_respond('file home work')
+        elapsed = timer() - started
+        self.assertEqual(resolution.result, ('home', 'work'))
+        # the lookups overlap, so the dispatch waits for the slowest rather than their sum
+        self.assertLess(elapsed, 0.35)
+        self.assertEqual(sorted(calls), ['areas', 'projects'])
+        self.assertEqual(resolution.failures, [])
+
+    def test_failed_lookups(self):
+        resolution = self.operator.listen_and_respond('refile home work')
+        self.assertEqual(resolution.failures,
+                         [RuleFailure('project', 'validate_is_in_list', RuleFailure.ERROR,
+                                      'IOError: the project list is unavailable'),
+                          RuleFailure('area', 'validate_is_in_list', RuleFailure.TIMEOUT, '')])
+        self.assertEqual(resolution.unrecognized, ['home', 'work'])
+        self.assertFalse(resolution.is_reusable())
+
+
+if __name__ == '__main__':
+    unittest.main()
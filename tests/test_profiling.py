@@ -0,0 +1,118 @@
+import logging
+import os
+import pstats
+import shutil
+import tempfile
+import time
+import unittest
+
+import hoomanlogic
+from hoomanlogic.profiling import DispatchProfiler
+
+
+class BrokenError(Exception):
+    pass
+
+
+class RecordingHandler(logging.Handler):
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@hoomanlogic.interface
+class ProfiledInterface(object):
+
+    @hoomanlogic.translator(synonyms={'wait': ['wait']})
+    def wait(self):
+        time.sleep(0.05)
+        return 'waited'
+
+    @hoomanlogic.translator(synonyms={'quick': ['quick']})
+    def quick(self):
+        return 'done'
+
+    @hoomanlogic.translator(synonyms={'fail': ['fail']})
+    def fail(self):
+        time.sleep(0.05)
+        raise BrokenError('the command failed')
+
+
+class DispatchProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.profile_directory = os.path.join(self.directory, 'profiles')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def create_operator(self, **kwargs):
+        self.profiler = DispatchProfiler(self.profile_directory, **kwargs)
+        operator = hoomanlogic.Operator(headless=True, profiler=self.profiler)
+        operator.register_interface(ProfiledInterface())
+        return operator
+
+    def test_slow_dispatch_is_written(self):
+        operator = self.create_operator(threshold=0.02)
+        self.assertEqual(operator.listen_and_respond('quick').result, 'done')
+        self.assertEqual(self.profiler.get_profiles(), [])
+
+        self.assertEqual(operator.listen_and_respond('wait').result, 'waited')
+        profiles = self.profiler.get_profiles()
+        self.assertEqual(len(profiles), 1)
+        name = os.path.basename(profiles[0][2])
+        self.assertIn('_ProfiledInterface.wait_1tok_', name)
+        self.assertTrue(name.endswith('_1.prof'))
+        stats = pstats.Stats(profiles[0][2])
+        self.assertTrue(any(fn[2] == 'wait' for fn in stats.stats))
+
+    def test_sampled_dispatch_is_written(self):
+        operator = self.create_operator(threshold=None, sample_rate=1.0)
+        operator.listen_and_respond('quick')
+        self.assertEqual(len(self.profiler.get_profiles()), 1)
+
+    def test_max_files(self):
+        operator = self.create_operator(threshold=0, max_files=3)
+        for i in range(5):
+            operator.listen_and_respond('quick')
+        profiles = self.profiler.get_profiles()
+        self.assertEqual(self.profiler.captured, 5)
+        # the oldest are deleted first
+        self.assertEqual(sorted(path[-7:] for mtime, size, path in profiles), ['_3.prof', '_4.prof', '_5.prof'])
+
+    def test_max_bytes(self):
+        operator = self.create_operator(threshold=0, max_bytes=1)
+        operator.listen_and_respond('quick')
+        operator.listen_and_respond('quick')
+        self.assertEqual(self.profiler.get_profiles(), [])
+
+    def test_dispatch_error_is_raised(self):
+        operator = self.create_operator(threshold=0.02)
+        self.assertRaises(BrokenError, operator.listen_and_respond, 'fail')
+        self.assertEqual(len(self.profiler.get_profiles()), 1)
+
+    def test_write_error_is_logged(self):
+        # a file in the way of the directory makes every write fail
+        with open(self.profile_directory, 'w') as f:
+            f.write('in the way')
+        operator = self.create_operator(threshold=0.02)
+        handler = RecordingHandler()
+        logger = logging.getLogger('hoomanlogic.profiling')
+        logger.addHandler(handler)
+        try:
+            self.assertRaises(BrokenError, operator.listen_and_respond, 'fail')
+            self.assertEqual(operator.listen_and_respond('wait').result, 'waited')
+        finally:
+            logger.removeHandler(handler)
+        self.assertEqual(self.profiler.captured, 2)
+        self.assertEqual([record.levelno for record in handler.records], [logging.ERROR, logging.ERROR])
+        self.assertIsInstance(handler.records[0].exc_info[1], EnvironmentError)
+
+
+if __name__ == '__main__':
+    unittest.main()
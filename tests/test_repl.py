@@ -0,0 +1,77 @@
+import unittest
+
+import hoomanlogic
+from hoomanlogic.repl import Completer, Shell
+
+
+@hoomanlogic.interface
+class GameInterface(object):
+
+    def __init__(self):
+        self.quit_count = 0
+
+    @hoomanlogic.translator(synonyms={'quit': ['quit', 'forfeit']})
+    def quit(self):
+        self.quit_count += 1
+
+    @hoomanlogic.translator(synonyms={'list': ['list', 'ls']})
+    def list(self):
+        pass
+
+
+@hoomanlogic.interface
+class PlainInterface(object):
+
+    @hoomanlogic.translator(synonyms={'list': ['list', 'ls']})
+    def list(self):
+        pass
+
+
+class ShellTest(unittest.TestCase):
+
+    def setUp(self):
+        self.messages = []
+        self.operator = hoomanlogic.Operator(message_user_func=self.messages.append)
+
+    def test_exit_words(self):
+        self.operator.register_interface(PlainInterface())
+        shell = Shell(self.operator)
+        self.assertTrue(shell.handle('list'))
+        self.assertTrue(shell.handle(''))
+        for word in Shell.EXIT_WORDS:
+            self.assertFalse(shell.handle(word))
+
+    def test_commands_named_like_exit_words(self):
+        interface = GameInterface()
+        self.operator.register_interface(interface)
+        shell = Shell(self.operator)
+        self.assertTrue(shell.handle('quit'))
+        self.assertEqual(interface.quit_count, 1)
+        self.assertFalse(shell.handle('exit'))
+
+    def test_unknown_input(self):
+        self.operator.register_interface(PlainInterface())
+        self.assertTrue(Shell(self.operator).handle('dance'))
+        self.assertIn("Sorry, I didn't understand 'dance'.", self.messages[-1])
+
+    def test_unterminated_quote(self):
+        self.operator.register_interface(PlainInterface())
+        shell = Shell(self.operator)
+        self.assertTrue(shell.handle('list "unterminated'))
+        self.assertEqual(self.messages[-1], "Sorry, I couldn't read 'list \"unterminated': No closing quotation.")
+        self.assertTrue(shell.handle('list'))
+
+
+class CompleterTest(unittest.TestCase):
+
+    def test_complete_command(self):
+        operator = hoomanlogic.Operator()
+        operator.register_interface(GameInterface())
+        completer = Completer(operator)
+        self.assertEqual(completer.get_completions('', 'l'), ['list', 'ls'])
+        self.assertEqual(completer.get_completions('', 'f'), ['forfeit'])
+        self.assertEqual(completer.get_completions('', 'he'), ['help'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+
+import hoomanlogic
+from hoomanlogic.server import Client, DispatchServer
+
+
+@hoomanlogic.interface
+class ServerInterface(object):
+
+    @hoomanlogic.translator(arg_mediators=[hoomanlogic.ArgumentMediator('name', required=True)],
+                            synonyms={'add': ['add']})
+    def add(self, name):
+        return name
+
+
+def setup(operator):
+    operator.register_interface(ServerInterface())
+
+
+class DispatchServerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.server = DispatchServer(setup, os.path.join(cls.directory, 'hoomanlogic.sock'), workers=2)
+        cls.address = cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        shutil.rmtree(cls.directory)
+
+    def test_session_ids_pick_a_worker(self):
+        for session in (u'caf\xe9', u'会话', b'bytes', None, 42, [1, 2]):
+            self.assertIn(self.server.get_worker(session), self.server.workers)
+        self.assertIs(self.server.get_worker(u'caf\xe9'), self.server.get_worker(u'caf\xe9'.encode('utf-8')))
+
+    def test_non_ascii_session(self):
+        client = Client(self.address, session=u'caf\xe9')
+        try:
+            response = client.says('add "buy milk"')
+            self.assertEqual(response.get('status'), 'complete', response)
+            self.assertEqual(response['result'], 'buy milk')
+        finally:
+            client.close()
+
+    def test_request_that_is_not_an_object(self):
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(self.address)
+        reader = connection.makefile('rb')
+        try:
+            connection.sendall(b'["add milk"]\n')
+            self.assertIn('error', json.loads(reader.readline().decode('utf-8')))
+            connection.sendall(b'{"session": "\\u00e9", "says": "add milk"}\n')
+            self.assertEqual(json.loads(reader.readline().decode('utf-8'))['result'], 'milk')
+        finally:
+            reader.close()
+            connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
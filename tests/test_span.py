@@ -0,0 +1,88 @@
+import unittest
+from datetime import datetime
+
+import hoomanlogic
+from hoomanlogic import InputChain, SpanChart
+
+
+DATES = {
+    'tomorrow': datetime(2030, 1, 2),
+    'tuesday': datetime(2030, 1, 8),
+    'next tuesday': datetime(2030, 1, 15),
+    'next tuesday 5pm': datetime(2030, 1, 15, 17),
+    '5pm': datetime(2030, 1, 1, 17),
+}
+
+calls = []
+
+
+def translate_date_phrase(text, context=None):
+    calls.append(text)
+    if text in DATES:
+        return True, DATES[text]
+    return False, None
+
+
+@hoomanlogic.interface
+class ReminderInterface(object):
+
+    @hoomanlogic.translator(synonyms={'remind': ['remind']},
+                            arg_mediators=[hoomanlogic.ArgumentMediator('when', required=True, max_span=3, rules=(
+                                               translate_date_phrase, 'a date', None)),
+                                           hoomanlogic.ArgumentMediator('note', max_count=None)])
+    def remind(self, when, note=None):
+        return when, note
+
+
+def read_chain(first_link):
+    links = []
+    link = first_link
+    while link is not None:
+        links.append((link.position, link.input))
+        link = link.read()
+    return links
+
+
+class SpanChartTest(unittest.TestCase):
+
+    def setUp(self):
+        del calls[:]
+
+    def test_longest_span_is_chosen(self):
+        arg_mediator = ReminderInterface.remind.translator.get_arg_mediator('when')
+        chart = SpanChart(InputChain.convert_to_chain('call mom next tuesday 5pm'))
+        first_link = chart.parse([arg_mediator])
+        self.assertEqual(read_chain(first_link), [(1, 'call'), (2, 'mom'), (3, 'next tuesday 5pm')])
+        link = first_link.get_by_pos(3)
+        self.assertEqual(link.get_output('when'), (datetime(2030, 1, 15, 17), False, 1))
+        self.assertEqual(first_link.get_links_matched_by('when'), [link])
+
+    def test_each_span_is_evaluated_once(self):
+        arg_mediator = ReminderInterface.remind.translator.get_arg_mediator('when')
+        chart = SpanChart(InputChain.convert_to_chain('a b c d e'))
+        chart.parse([arg_mediator, arg_mediator])
+        # spans of up to 3 of the 5 links: 5 + 4 + 3
+        self.assertEqual(len(calls), 12)
+        self.assertEqual(len(set(calls)), 12)
+
+    def test_fewest_spans(self):
+        # 'next tuesday' alone would leave '5pm' as a span of its own
+        arg_mediator = ReminderInterface.remind.translator.get_arg_mediator('when')
+        chart = SpanChart(InputChain.convert_to_chain('next tuesday 5pm tomorrow'))
+        chart.parse([arg_mediator])
+        self.assertEqual(chart.get_best_cover(), [(0, 3), (3, 4)])
+
+    def test_translation(self):
+        operator = hoomanlogic.Operator(headless=True)
+        operator.register_interface(ReminderInterface())
+        resolution = operator.listen_and_respond('remind call mom next tuesday 5pm')
+        self.assertEqual(resolution.result, (datetime(2030, 1, 15, 17), ['call', 'mom']))
+
+        resolution = operator.listen_and_respond('remind call mom')
+        self.assertEqual(resolution.missing, ['when'])
+        resolution.resume(answers={'when': 'next tuesday'})
+        self.assertEqual(resolution.result, (datetime(2030, 1, 15), ['call', 'mom']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+import unittest
+from array import array
+from datetime import datetime, time
+
+import hoomanlogic
+from hoomanlogic import translation
+
+
+class TypeCastTest(unittest.TestCase):
+
+    def test_str_to_int(self):
+        self.assertEqual(translation.str_to_int('42'), 42)
+        self.assertEqual(translation.str_to_int(' -7 '), -7)
+        self.assertEqual(translation.str_to_int(u'12'), 12)
+        self.assertIsNone(translation.str_to_int('4.2'))
+        self.assertIsNone(translation.str_to_int(''))
+
+    def test_str_to_int_rejects_other_digits(self):
+        # digits int() doesn't accept must be rejected rather than raise
+        for text in (u'\xb2', u'3\xb2', u'①', u'½'):
+            self.assertIsNone(translation.str_to_int(text))
+            self.assertEqual(translation.str_to_int(text, on_fail_return=0), 0)
+
+    def test_str_to_float(self):
+        self.assertEqual(translation.str_to_float('1.5'), 1.5)
+        self.assertEqual(translation.str_to_float('.5e2'), 50.0)
+        self.assertIsNone(translation.str_to_float(u'1\xb2'))
+        self.assertIsNone(translation.str_to_float('1.2.3'))
+
+
+class NumericListTest(unittest.TestCase):
+
+    def test_whole_numbers_and_ranges(self):
+        self.assertEqual(translation.translate_numeric_list('1-5,8'), (True, array('l', [1, 2, 3, 4, 5, 8])))
+        self.assertEqual(translation.translate_numeric_list('7'), (True, array('l', [7])))
+        self.assertEqual(translation.translate_numeric_list('-3,-1,2'), (True, array('l', [-3, -1, 2])))
+        self.assertEqual(translation.translate_numeric_list('3-3'), (True, array('l', [3])))
+
+    def test_fractions(self):
+        self.assertEqual(translation.translate_numeric_list('1.5,2'), (True, array('d', [1.5, 2.0])))
+        self.assertEqual(translation.translate_numeric_list('1e3,2'), (True, array('d', [1000.0, 2.0])))
+
+    def test_rejects(self):
+        for text in ('', 'abc', '1,,2', '1.2.3', '5-3', '1-2-3', '1,a', ',1', '1 2', '1-2.5'):
+            self.assertEqual(translation.translate_numeric_list(text), (False, None), text)
+
+    def test_limit(self):
+        self.assertEqual(translation.translate_numeric_list('1-1000000000', 1000), (False, None))
+        self.assertFalse(translation.translate_numeric_list.recognize('1-1000000000', 1000))
+        self.assertEqual(len(translation.translate_numeric_list('1-1000', 1000)[1]), 1000)
+        self.assertEqual(translation.translate_numeric_list('1-1000,5', 1000), (False, None))
+
+    def test_list_to_first_type(self):
+        self.assertEqual(translation.translate_list_to_first_type('1,2.5,x', ['int', 'float', 'str']),
+                         (True, [1, 2.5, 'x']))
+        self.assertEqual(translation.translate_list_to_first_type('1,x', ['int']), (False, None))
+
+
+@hoomanlogic.interface
+class RuleInterface(object):
+
+    @hoomanlogic.translator(synonyms={'rate': ['rate']})
+    def rate(self, stars=None):
+        """Rate the task.
+
+        :param stars: Number of stars.
+        :rules stars: in_range(1, 5)
+        """
+        return stars
+
+    statuses = {'todo': ['todo', 'open'], 'done': ['done', 'finished']}
+
+    @hoomanlogic.translator(synonyms={'status': ['status']})
+    def status(self, value):
+        """Set the status.
+
+        :param value: The status.
+        :rules value: key_in(statuses)
+        """
+        return value
+
+
+class CompileRulesTest(unittest.TestCase):
+
+    def test_in_range_casts_to_int_first(self):
+        rules = translation.compile_rules('in_range(1, 5)')
+        self.assertEqual([rule for rule, description, context in rules],
+                         [translation.translate_to_first_type, translation.validate_int_is_in_range])
+
+    def test_in_range_after_numeric_rules(self):
+        int_rule = (translation.translate_to_first_type, '', [translation.resolve_type_cast('int')])
+        rules = translation.compile_rules('in_range(1, 5)', (int_rule,))
+        self.assertEqual([rule for rule, description, context in rules], [translation.validate_int_is_in_range])
+
+        rules = translation.compile_rules('duration, in_range(1, 600)')
+        self.assertEqual([rule for rule, description, context in rules],
+                         [translation.translate_duration_to_minutes, translation.validate_int_is_in_range])
+
+    def test_key_in_takes_an_attribute(self):
+        rules = translation.compile_rules('key_in(statuses)')
+        self.assertEqual(len(rules), 1)
+        self.assertIsInstance(rules[0][2], translation.ObjectAttribute)
+
+        operator = hoomanlogic.Operator(headless=True)
+        operator.register_interface(RuleInterface())
+        self.assertEqual(operator.listen_and_respond('status finished').result, 'done')
+        self.assertEqual(operator.listen_and_respond('status lost').unrecognized, ['lost'])
+
+    def test_key_in_rejects_values(self):
+        for text in ('key_in(a, b)', "key_in('a')", 'key_in()', 'key_in(1)'):
+            self.assertRaises(ValueError, translation.compile_rules, text)
+
+        def status(self, value):
+            """:rules value: key_in(todo, done)"""
+
+        self.assertRaises(ValueError, hoomanlogic.translator(synonyms={'status': ['status']}), status)
+
+    def test_in_range_without_type(self):
+        operator = hoomanlogic.Operator(headless=True)
+        operator.register_interface(RuleInterface())
+        self.assertEqual(operator.listen_and_respond('rate 3').result, 3)
+        resolution = operator.listen_and_respond('rate 9')
+        self.assertEqual(resolution.unrecognized, ['9'])
+
+
+
+class DateTest(unittest.TestCase):
+
+    def test_words_containing_date_words_are_rejected(self):
+        for word in ('market', 'lemon', 'snow', 'decide', 'geode', 'satisfy', 'holiday', 'room'):
+            self.assertFalse(translation.could_be_datetime(word), word)
+            self.assertIsNone(translation.parse_datetime(word), word)
+
+    def test_date_words_are_accepted(self):
+        for text in ('tomorrow', 'next week', 'jan 5', 'January 5', 'friday', 'in 3 days', '2 hours ago', 'eod'):
+            self.assertTrue(translation.could_be_datetime(text), text)
+
+    def test_fast_path(self):
+        self.assertEqual(translation.parse_datetime('2030-01-02'), datetime(2030, 1, 2))
+        self.assertEqual(translation.parse_datetime('2030-01-02T17:30:05'), datetime(2030, 1, 2, 17, 30, 5))
+        self.assertEqual(translation.parse_datetime('01/02/2030'), datetime(2030, 1, 2))
+        self.assertEqual(translation.parse_datetime('Jan 2, 2030'), datetime(2030, 1, 2))
+        self.assertEqual(translation.parse_datetime('5:30pm').time(), time(17, 30))
+        self.assertIsNone(translation.parse_fast_datetime('2030-02-30'))
+        self.assertIsNone(translation.parse_fast_datetime('13:00pm'))
+
+    def test_recognizer_rejects_words(self):
+        self.assertEqual(translation.translate_datetime('lemon'), (False, None))
+
+
+
+@hoomanlogic.interface
+class AgendaInterface(object):
+
+    @hoomanlogic.translator(synonyms={'book': ['book']},
+                            arg_mediators=[hoomanlogic.ArgumentMediator('notes', max_count=None),
+                                           hoomanlogic.ArgumentMediator('when', required=True, rules=(
+                                               translation.translate_datetime, 'a date', None))])
+    def book(self, notes=None, when=None):
+        return when, notes
+
+
+class DeferredTranslationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.operator = hoomanlogic.Operator(headless=True)
+        self.operator.register_interface(AgendaInterface())
+
+    def test_rejected_match_is_not_counted(self):
+        # 'room5' has a digit, so it is recognized as a date until the rule rejects it
+        resolution = self.operator.listen_and_respond('book room5 2030-01-02')
+        self.assertEqual(resolution.status, hoomanlogic.Resolution.COMPLETE)
+        self.assertEqual(resolution.result, (datetime(2030, 1, 2), ['room5']))
+
+        resolution = self.operator.listen_and_respond('book 2030-01-02 room5')
+        self.assertEqual(resolution.result, (datetime(2030, 1, 2), ['room5']))
+
+    def test_resume(self):
+        resolution = self.operator.listen_and_respond('book room5')
+        self.assertEqual(resolution.status, hoomanlogic.Resolution.INCOMPLETE)
+        self.assertEqual(resolution.missing, ['when'])
+
+        resolution.resume(answers={'when': 'room6'})
+        self.assertEqual(resolution.rejected, {'when': 'room6'})
+        self.assertEqual(resolution.status, hoomanlogic.Resolution.INCOMPLETE)
+
+        resolution.resume(answers={'when': '2030-01-02'})
+        self.assertEqual(resolution.status, hoomanlogic.Resolution.COMPLETE)
+        self.assertEqual(resolution.result, (datetime(2030, 1, 2), ['room5']))
+
+
+if __name__ == '__main__':
+    unittest.main()
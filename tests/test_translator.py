@@ -0,0 +1,198 @@
+import threading
+import unittest
+
+import hoomanlogic
+import hoomanlogic.metrics
+from hoomanlogic import translation
+
+
+@hoomanlogic.interface
+class CounterInterface(object):
+
+    def __init__(self, name='counter'):
+        self.name = name
+
+    @hoomanlogic.translator(synonyms={'add': ['add', 'plus']})
+    def add(self, amount, times=None):
+        """Add to the counter.
+
+        :param amount: Amount to add.
+        :rules amount: type(int)
+        :param times: Number of times to add it.
+        :rules times: type(int)
+        """
+        return self.name, amount * (times or 1)
+
+
+@hoomanlogic.interface
+class TallyInterface(object):
+
+    def __init__(self, name='tally'):
+        self.name = name
+
+    @hoomanlogic.translator(synonyms={'tally': ['tally']},
+                            arg_mediators=[
+                                hoomanlogic.ArgumentMediator('count', required=True, rules=(
+                                    (translation.translate_to_first_type, 'a number', ['int']),
+                                    (translation.validate_int_is_in_range, 'up to 100', (0, 100)))),
+                                hoomanlogic.ArgumentMediator('labels', max_count=None)])
+    def tally(self, count, labels=None):
+        return self.name, count, labels
+
+
+calls = []
+
+
+def translate_word(text, context=None):
+    calls.append(text)
+    return text.isalpha(), text.lower()
+
+
+@translation.rule_traits(memoize=False)
+def translate_word_each_time(text, context=None):
+    calls.append(text)
+    return text.isalpha(), text.lower()
+
+
+@hoomanlogic.interface
+class MemoInterface(object):
+
+    @hoomanlogic.translator(synonyms={'words': ['words']},
+                            arg_mediators=[hoomanlogic.ArgumentMediator('first', rules=(translate_word, '', None)),
+                                           hoomanlogic.ArgumentMediator('rest', max_count=None, rules=(
+                                               (translate_word, '', None),
+                                               (translation.validate_lcase_is_in_list, '', ['a', 'b'])))])
+    def words(self, first=None, rest=None):
+        return first, rest
+
+    @hoomanlogic.translator(synonyms={'each': ['each']},
+                            arg_mediators=[
+                                hoomanlogic.ArgumentMediator('first', rules=(translate_word_each_time, '', None)),
+                                hoomanlogic.ArgumentMediator('second', rules=(translate_word_each_time, '', None))])
+    def each(self, first=None, second=None):
+        return first, second
+
+
+class MemoTest(unittest.TestCase):
+
+    def setUp(self):
+        del calls[:]
+        self.metrics = hoomanlogic.metrics.Metrics()
+        self.operator = hoomanlogic.Operator(headless=True, metrics=self.metrics)
+        self.operator.register_interface(MemoInterface())
+
+    def test_shared_within_a_dispatch(self):
+        resolution = self.operator.listen_and_respond('words X A B')
+        self.assertEqual(resolution.result, ('x', ['a', 'b']))
+        # each input is translated once, for both arguments
+        self.assertEqual(sorted(calls), ['A', 'B', 'X'])
+        self.assertEqual(self.metrics.rule_memo_hits.get(('words', 'rest', 'translate_word')), 3)
+
+        # but not across dispatches
+        self.operator.listen_and_respond('words X A B')
+        self.assertEqual(len(calls), 6)
+
+    def test_opt_out(self):
+        self.assertEqual(self.operator.listen_and_respond('each x y').result, ('x', 'y'))
+        self.assertEqual(sorted(calls), ['x', 'x', 'y', 'y'])
+        self.assertEqual(self.metrics.rule_memo_hits.get(('each', 'second', 'translate_word_each_time')), 0)
+
+
+class FreezeTest(unittest.TestCase):
+
+    def test_translator_is_frozen(self):
+        translator = CounterInterface.add.translator
+        self.assertTrue(translator.frozen)
+        self.assertIsInstance(translator.arg_mediators, tuple)
+        self.assertRaises(AttributeError, setattr, translator, 'description', 'changed')
+        self.assertRaises(AttributeError, setattr, translator, 'arg_mediators', [])
+        self.assertIsNotNone(translator.usage)
+
+    def test_mediators_are_frozen(self):
+        for arg_mediator in CounterInterface.add.translator.arg_mediators:
+            self.assertTrue(arg_mediator.frozen)
+            self.assertRaises(AttributeError, setattr, arg_mediator, 'required', True)
+            self.assertRaises(AttributeError, setattr, arg_mediator, 'rules', None)
+
+    def test_cacheable_is_found_once(self):
+        self.assertTrue(CounterInterface.add.translator.cacheable)
+        # translate_word isn't declared pure
+        translator = MemoInterface.words.translator
+        self.assertFalse(translator.cacheable)
+        self.assertFalse(translator.is_cacheable())
+        self.assertRaises(AttributeError, setattr, translator, 'cacheable', True)
+
+    def test_learned_attributes_can_be_replaced(self):
+        translator = TallyInterface.tally.translator
+        for name in type(translator).LEARNED:
+            setattr(translator, name, getattr(translator, name))
+        arg_mediator = translator.get_arg_mediator('count')
+        for name in hoomanlogic.ArgumentMediator.LEARNED:
+            setattr(arg_mediator, name, getattr(arg_mediator, name))
+
+
+class PerCallStateTest(unittest.TestCase):
+
+    def test_instances_share_the_translator(self):
+        first = hoomanlogic.Operator(headless=True)
+        first.register_interface(CounterInterface('first'))
+        second = hoomanlogic.Operator(headless=True)
+        second.register_interface(CounterInterface('second'))
+
+        first_resolution = first.listen_and_respond('add 2 3')
+        second_resolution = second.listen_and_respond('plus 5')
+        self.assertEqual(first_resolution.result, ('first', 6))
+        self.assertEqual(second_resolution.result, ('second', 5))
+        self.assertEqual(first_resolution.managed_args, {'amount': 2, 'times': 3})
+        self.assertIsNot(first_resolution.translator, None)
+        self.assertIs(first_resolution.translator, second_resolution.translator)
+        self.assertFalse(hasattr(first_resolution.translator, 'obj'))
+
+    def test_pending_resolutions_are_independent(self):
+        operator = hoomanlogic.Operator(headless=True)
+        operator.register_interface(TallyInterface())
+        first = operator.listen_and_respond('tally apples')
+        second = operator.listen_and_respond('tally pears')
+        self.assertEqual(first.missing, ['count'])
+        self.assertEqual(second.missing, ['count'])
+
+        second.resume(answers={'count': '7'}, confirm=True)
+        first.resume(answers={'count': '3'}, confirm=True)
+        self.assertEqual(first.result, ('tally', 3, ['apples']))
+        self.assertEqual(second.result, ('tally', 7, ['pears']))
+
+    def test_concurrent_dispatches(self):
+        lines = ['tally {} label{}'.format(n, n % 7) for n in range(101)] + ['tally 101', 'tally many']
+        operator = hoomanlogic.Operator(headless=True)
+        operator.register_interface(TallyInterface())
+
+        def get_result(resolution):
+            return resolution.status, resolution.managed_args, resolution.unrecognized
+
+        expected = dict((line, get_result(operator.listen_and_respond(line))) for line in lines)
+        TallyInterface.tally.translator.enable_adaptive(20)
+        mismatches = []
+        errors = []
+
+        def run():
+            operator = hoomanlogic.Operator(headless=True)
+            operator.register_interface(TallyInterface())
+            try:
+                for round_ in range(3):
+                    for line in lines:
+                        if get_result(operator.listen_and_respond(line)) != expected[line]:
+                            mismatches.append(line)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(mismatches, [])
+
+
+if __name__ == '__main__':
+    unittest.main()